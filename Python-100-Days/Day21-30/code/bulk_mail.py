@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+批次傳送郵件（對應 29.Python傳送郵件和簡訊 中的 send_email）
+
+原來的 send_email 每傳送一封郵件都要建立一個新的 SMTP_SSL 連線並登入，附件每次都要完整讀入再做 base64 編碼，
+而且參數 filenames=[] 用了可變的預設值。這裡的做法是：
+- SMTPPool：保持若干個已經登入的連線，用完放回池中給下一封郵件使用，連線斷開時自動重新連線
+- 每個連線可以設定每秒最多傳送的郵件數量（很多郵件服務商會限制傳送頻率）
+- load_attachment：附件只讀取和編碼一次，同一個附件物件可以加到多封郵件中
+- send_bulk：用多個執行緒同時傳送，執行緒數量跟連線數量相同
+可以用 aiosmtpd 在本機啟動一個測試用的郵件伺服器，main 函式中比較了兩種做法每秒傳送的郵件數量。
+"""
+import mimetypes
+import os
+import queue
+import smtplib
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+
+def load_attachment(filename, display_filename=None):
+    """
+    讀取並編碼附件（傳回的物件可以重複加到多封郵件中）
+    :param filename: 附件的檔案路徑
+    :param display_filename: 郵件中顯示的檔名（預設為檔案的名字）
+    :return: MIMEBase物件
+    """
+    maintype, subtype = (mimetypes.guess_type(filename)[0] or 'application/octet-stream').split('/', 1)
+    attachment = MIMEBase(maintype, subtype)
+    with open(filename, 'rb') as file:
+        attachment.set_payload(file.read())
+    # 只在這裡做一次base64編碼，之後生成郵件時直接輸出編碼好的內容
+    encoders.encode_base64(attachment)
+    attachment.add_header(
+        'Content-Disposition', 'attachment', filename=display_filename or os.path.basename(filename)
+    )
+    return attachment
+
+
+def build_message(*, from_user, to_users, subject='', content='', attachments=()):
+    """
+    建立郵件
+    :param from_user: 發件人
+    :param to_users: 收件人，多個收件人用英文分號進行分隔
+    :param subject: 郵件的主題
+    :param content: 郵件正文內容
+    :param attachments: load_attachment傳回的附件物件
+    :return: MIMEMultipart物件
+    """
+    email = MIMEMultipart()
+    email['From'] = from_user
+    email['To'] = to_users
+    email['Subject'] = subject
+    email.attach(MIMEText(content, 'plain', 'utf-8'))
+    for attachment in attachments:
+        email.attach(attachment)
+    return email
+
+
+class _Connection:
+    """帶傳送頻率限制的SMTP連線"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.smtp = None
+        self.next_time = 0.0
+
+    def connect(self):
+        pool = self.pool
+        smtp_class = smtplib.SMTP_SSL if pool.use_ssl else smtplib.SMTP
+        self.smtp = smtp_class(pool.host, pool.port, timeout=pool.timeout)
+        if pool.starttls:
+            self.smtp.starttls()
+        if pool.user:
+            self.smtp.login(pool.user, pool.password)
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self.smtp.close()
+            self.smtp = None
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if self.pool.rate:
+            now = time.monotonic()
+            if now < self.next_time:
+                time.sleep(self.next_time - now)
+            self.next_time = max(now, self.next_time) + 1 / self.pool.rate
+        if self.smtp is None:
+            self.connect()
+        try:
+            return self.smtp.sendmail(from_addr, to_addrs, msg)
+        except smtplib.SMTPServerDisconnected:
+            # 伺服器會關閉閒置太久的連線，關閉舊的socket，重新連線後再傳送一次
+            self.close()
+            self.connect()
+            return self.smtp.sendmail(from_addr, to_addrs, msg)
+
+
+class SMTPPool:
+    """SMTP連線池"""
+
+    def __init__(self, host, port, user=None, password=None, *, size=4, rate=None,
+                 use_ssl=True, starttls=False, timeout=30):
+        """
+        :param host: 郵件伺服器域名
+        :param port: 郵件服務埠
+        :param user: 登入郵件伺服器的賬號（為None時不登入）
+        :param password: 開通SMTP服務的授權碼
+        :param size: 連線的數量
+        :param rate: 每個連線每秒最多傳送的郵件數量（為None時不限制）
+        :param use_ssl: 是否使用SMTP_SSL
+        :param starttls: 是否在連線後執行STARTTLS（使用587埠時）
+        :param timeout: 網路操作的超時時間（秒）
+        """
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.size = size
+        self.rate = rate
+        self.use_ssl, self.starttls = use_ssl, starttls
+        self.timeout = timeout
+        # 連線在第一次使用時才建立
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(_Connection(self))
+
+    @contextmanager
+    def connection(self):
+        """從池中取出一個連線，用完後放回"""
+        conn = self.idle.get()
+        try:
+            yield conn
+        except (smtplib.SMTPException, OSError):
+            # 出錯的連線（包括超時、被重置）先關閉，放回池中後下次使用時重新連線
+            conn.close()
+            raise
+        finally:
+            self.idle.put(conn)
+
+    def send(self, message, from_addr=None, to_addrs=None):
+        """
+        傳送一封郵件
+        :param message: email.message.Message物件
+        :param from_addr: 發件人（預設使用郵件的From）
+        :param to_addrs: 收件人的列表（預設使用郵件的To，多個收件人用英文分號進行分隔）
+        :return: 被伺服器拒絕的收件人構成的字典
+        """
+        from_addr = from_addr or message['From']
+        to_addrs = to_addrs or message['To'].split(';')
+        with self.connection() as conn:
+            return conn.sendmail(from_addr, to_addrs, message.as_string())
+
+    def close(self):
+        """關閉所有連線"""
+        for _ in range(self.size):
+            self.idle.get().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def send_bulk(pool, messages):
+    """
+    同時使用連線池中的所有連線傳送多封郵件
+    :param pool: SMTPPool物件
+    :param messages: 郵件的可迭代物件
+    :return: 二元組 - (成功傳送的數量, (郵件, 異常)構成的列表)
+    """
+    sent, failures = 0, []
+    lock = threading.Lock()
+
+    def send(message):
+        nonlocal sent
+        try:
+            pool.send(message)
+        except (smtplib.SMTPException, OSError) as err:
+            with lock:
+                failures.append((message, err))
+        else:
+            with lock:
+                sent += 1
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        # 消耗map傳回的迭代器，等待所有郵件傳送完成
+        for _ in executor.map(send, messages):
+            pass
+    return sent, failures
+
+
+def send_email(*, from_user, to_users, subject='', content='', filenames=(), pool):
+    """
+    傳送郵件（跟原來的send_email參數相同，多了一個連線池參數）
+    :param from_user: 發件人
+    :param to_users: 收件人，多個收件人用英文分號進行分隔
+    :param subject: 郵件的主題
+    :param content: 郵件正文內容
+    :param filenames: 附件要傳送的檔案路徑
+    :param pool: SMTPPool物件
+    """
+    attachments = [load_attachment(filename) for filename in filenames]
+    email = build_message(from_user=from_user, to_users=to_users, subject=subject,
+                          content=content, attachments=attachments)
+    return pool.send(email)
+
+
+def send_one_by_one(host, port, messages):
+    """原來的做法：每封郵件建立一個新的連線（用於比較）"""
+    for message in messages:
+        smtp = smtplib.SMTP(host, port)
+        smtp.sendmail(message['From'], message['To'].split(';'), message.as_string())
+        smtp.quit()
+
+
+def start_debug_server(host='127.0.0.1'):
+    """
+    用aiosmtpd在背景執行緒中啟動測試用的郵件伺服器（只計數，不真正投遞）
+    :return: 二元組 - (Controller物件, 已經收到的郵件數量的列表（只有一個元素）)
+    """
+    import socket
+
+    from aiosmtpd.controller import Controller
+
+    received = [0]
+
+    class CountingHandler:
+        async def handle_DATA(self, server, session, envelope):
+            received[0] += 1
+            return '250 Message accepted for delivery'
+
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    controller = Controller(CountingHandler(), hostname=host, port=port)
+    controller.start()
+    return controller, received
+
+
+def main():
+    import tempfile
+
+    controller, received = start_debug_server()
+    host, port = controller.hostname, controller.port
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, '報告.pdf')
+            with open(filename, 'wb') as file:
+                file.write(os.urandom(200 * 1024))
+            n = 300
+            start = time.perf_counter()
+            messages = (
+                build_message(from_user='admin@example.com', to_users=f'user{i}@example.com',
+                              subject='月度報告', content='請查收附件', attachments=[load_attachment(filename)])
+                for i in range(n)
+            )
+            send_one_by_one(host, port, messages)
+            elapsed = time.perf_counter() - start
+            print(f'每封郵件一個連線、每次重新編碼附件: {n / elapsed:.1f}封/秒')
+
+            attachment = load_attachment(filename)
+            messages = [
+                build_message(from_user='admin@example.com', to_users=f'user{i}@example.com',
+                              subject='月度報告', content='請查收附件', attachments=[attachment])
+                for i in range(n)
+            ]
+            with SMTPPool(host, port, size=4, use_ssl=False) as pool:
+                start = time.perf_counter()
+                sent, failures = send_bulk(pool, messages)
+                elapsed = time.perf_counter() - start
+            print(f'連線池（4個連線）、附件只編碼一次: {sent / elapsed:.1f}封/秒, 失敗{len(failures)}封')
+            with SMTPPool(host, port, size=2, rate=50, use_ssl=False) as pool:
+                start = time.perf_counter()
+                sent, _ = send_bulk(pool, messages[:100])
+                elapsed = time.perf_counter() - start
+            print(f'限制每個連線每秒50封（2個連線）: {sent / elapsed:.1f}封/秒')
+            print(f'伺服器共收到{received[0]}封郵件')
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+批次生成Word文件（對應 26.Python操作Word和PowerPoint檔案 中的離職證明範例）
+
+原來的範例每生成一份文件都要重新開啟模板，再遍歷所有段落和所有 run 尋找 {佔位符}。這裡的做法是：
+- DocxTemplate：只解析一次模板，記下每個包含佔位符的 w:t 元素在 XML 樹中的位置（從根節點開始的子節點序號）；
+  Word 經常把一個佔位符拆到好幾個 run 中，解析時會把它們合併到第一個 run 裡
+- render：深複製解析好的 document.xml，按記下的位置直接找到要修改的元素替換文字；
+  docx 套件中的其他檔案（樣式、字型、圖片等）在解析模板時就壓縮好，生成文件時只追加 document.xml，
+  不需要 python-docx 重新載入和儲存
+- render_many：在行程池中生成（每個行程只解析一次模板），可以直接寫入一個 zip 檔案
+"""
+import copy
+import io
+import os
+import re
+import time
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+DOCUMENT_XML = 'word/document.xml'
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+def _path_of(element):
+    """元素從根節點開始的子節點序號"""
+    path = []
+    parent = element.getparent()
+    while parent is not None:
+        path.append(parent.index(element))
+        element, parent = parent, parent.getparent()
+    return path[::-1]
+
+
+def _merge_split_placeholders(paragraph):
+    """把段落中跨越多個w:t元素的佔位符合併到第一個w:t中"""
+    texts = paragraph.findall(f'.//{{{W_NS}}}t')
+    if len(texts) < 2:
+        return
+    full = ''.join(t.text or '' for t in texts)
+    # 每個w:t元素的文字在整個段落文字中的起始位置
+    starts, offset = [], 0
+    for t in texts:
+        starts.append(offset)
+        offset += len(t.text or '')
+    for match in reversed(list(PLACEHOLDER.finditer(full))):
+        first = max(i for i, start in enumerate(starts) if start <= match.start())
+        last = max(i for i, start in enumerate(starts) if start < match.end())
+        if first == last:
+            continue
+        # 第一個w:t保留佔位符之前的文字和整個佔位符，後面的w:t只保留佔位符之後的文字
+        first_text = texts[first].text or ''
+        texts[first].text = first_text[:match.start() - starts[first]] + match.group()
+        last_text = texts[last].text or ''
+        for i in range(first + 1, last):
+            texts[i].text = ''
+        texts[last].text = last_text[match.end() - starts[last]:]
+
+
+class DocxTemplate:
+    """預先解析好的docx模板"""
+
+    def __init__(self, path):
+        """
+        :param path: 模板檔案的路徑（佔位符的格式為{key}）
+        """
+        # 除了document.xml之外的檔案只壓縮一次，放進一個不完整的docx（base）中
+        base = io.BytesIO()
+        with zipfile.ZipFile(path) as zf, zipfile.ZipFile(base, 'w') as out:
+            for info in zf.infolist():
+                if info.filename != DOCUMENT_XML:
+                    out.writestr(info, zf.read(info.filename))
+            self.root = etree.fromstring(zf.read(DOCUMENT_XML))
+        self.base = base.getvalue()
+        for paragraph in self.root.iter(f'{{{W_NS}}}p'):
+            _merge_split_placeholders(paragraph)
+        # (子節點序號路徑, 模板文字) 構成的列表
+        self.slots = [
+            (_path_of(t), t.text)
+            for t in self.root.iter(f'{{{W_NS}}}t')
+            if t.text and PLACEHOLDER.search(t.text)
+        ]
+        self.keys = sorted({key for _, text in self.slots for key in PLACEHOLDER.findall(text)})
+
+    def render_xml(self, values):
+        """生成替換了佔位符的document.xml（位元組串）"""
+        root = copy.deepcopy(self.root)
+        for path, text in self.slots:
+            element = root
+            for index in path:
+                element = element[index]
+            element.text = PLACEHOLDER.sub(lambda m: str(values[m.group(1)]), text)
+            # 文字開頭或結尾有空白字元時，Word需要xml:space="preserve"才會保留
+            element.set(XML_SPACE, 'preserve')
+        return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+    def render(self, values):
+        """
+        生成一份文件
+        :param values: 佔位符名字到內容的字典
+        :return: docx檔案的內容（位元組串）
+        """
+        # 複製base再以追加模式寫入document.xml，其他檔案不需要重新壓縮
+        buffer = io.BytesIO(self.base)
+        with zipfile.ZipFile(buffer, 'a') as zf:
+            zf.writestr(DOCUMENT_XML, self.render_xml(values), zipfile.ZIP_DEFLATED)
+        return buffer.getvalue()
+
+    def save(self, values, path):
+        with open(path, 'wb') as file:
+            file.write(self.render(values))
+
+
+_template = None
+
+
+def _init_worker(template_path):
+    """行程池的初始化函式：每個行程只解析一次模板"""
+    global _template
+    _template = DocxTemplate(template_path)
+
+
+def _render_batch(batch):
+    """在子行程中生成一批文件，傳回(檔名, 內容)的列表"""
+    return [(name, _template.render(values)) for name, values in batch]
+
+
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def render_many(template_path, records, *, name='{name}.docx', outdir=None, zip_path=None,
+                workers=None, batch_size=50):
+    """
+    批次生成文件
+    :param template_path: 模板檔案的路徑
+    :param records: 字典的列表，每個字典是一份文件的佔位符內容
+    :param name: 生成的檔名（可以使用佔位符）
+    :param outdir: 儲存文件的目錄（跟zip_path二選一）
+    :param zip_path: 把所有文件寫入這個zip檔案
+    :param workers: 行程數量（預設為CPU核數）
+    :param batch_size: 每次交給一個行程的文件數量
+    :return: 生成的文件數量
+    """
+    if (outdir is None) == (zip_path is None):
+        raise ValueError('outdir和zip_path必須指定一個')
+    tasks = [(name.format(**values), values) for values in records]
+    if outdir is not None:
+        os.makedirs(outdir, exist_ok=True)
+        archive = None
+    else:
+        # docx本身已經是壓縮過的，放進zip時不再壓縮
+        archive = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED)
+    count = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(template_path, )) as pool:
+            for results in pool.map(_render_batch, _batched(tasks, batch_size)):
+                for filename, content in results:
+                    if archive is not None:
+                        archive.writestr(filename, content)
+                    else:
+                        with open(os.path.join(outdir, filename), 'wb') as file:
+                            file.write(content)
+                count += len(results)
+    finally:
+        if archive is not None:
+            archive.close()
+    return count
+
+
+def render_by_scanning(template_path, emp_dict, path):
+    """原來範例的做法：每份文件都重新開啟模板並遍歷所有段落和run（用於比較）"""
+    from docx import Document
+
+    doc = Document(template_path)
+    for p in doc.paragraphs:
+        if '{' not in p.text:
+            continue
+        for run in p.runs:
+            if '{' not in run.text:
+                continue
+            start, end = run.text.find('{'), run.text.find('}')
+            key, place_holder = run.text[start + 1:end], run.text[start:end + 1]
+            run.text = run.text.replace(place_holder, emp_dict[key])
+    doc.save(path)
+
+
+def make_template(path, split_placeholder=False):
+    """
+    建立一個跟離職證明模板類似的docx檔案
+    :param split_placeholder: 是否加入一個被拆到兩個run中的佔位符（原來範例的做法處理不了這種情況）
+    """
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading('離職證明', 0)
+    p = doc.add_paragraph('茲證明')
+    p.add_run('{name}').bold = True
+    p.add_run('（身份證號碼：{id}）於')
+    p.add_run('{sdate}').bold = True
+    p.add_run('至')
+    p.add_run('{edate}').bold = True
+    p.add_run('在我公司')
+    p.add_run('{department}').underline = True
+    p.add_run('部門擔任')
+    p.add_run('{position}').underline = True
+    p.add_run('職務，現已正式離職。')
+    for _ in range(30):
+        doc.add_paragraph('特此證明。' * 10)
+    if split_placeholder:
+        p = doc.add_paragraph('公司：')
+        p.add_run('{comp')
+        p.add_run('any}')
+    doc.save(path)
+
+
+def main():
+    import tempfile
+
+    employees = [
+        {
+            'name': f'員工{i:05d}', 'id': f'5102101990{i:08d}', 'sdate': '2019年1月1日',
+            'edate': '2021年4月30日', 'department': '產品研發', 'position': 'Python開發工程師',
+            'company': '成都穀道科技有限公司',
+        }
+        for i in range(2000)
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        template_path = os.path.join(tmpdir, '離職證明模板.docx')
+        # 比較速度用的模板不含被拆開的佔位符，因為render_by_scanning處理不了那種情況
+        make_template(template_path)
+        n = 200
+        start = time.perf_counter()
+        for emp_dict in employees[:n]:
+            render_by_scanning(template_path, emp_dict, os.path.join(tmpdir, f'{emp_dict["name"]}離職證明.docx'))
+        elapsed = time.perf_counter() - start
+        print(f'每次開啟模板並遍歷段落: {n / elapsed:.1f}份/秒')
+        template = DocxTemplate(template_path)
+        start = time.perf_counter()
+        for emp_dict in employees[:n]:
+            template.save(emp_dict, os.path.join(tmpdir, f'{emp_dict["name"]}.docx'))
+        elapsed = time.perf_counter() - start
+        print(f'預先解析模板（單行程）: {n / elapsed:.1f}份/秒')
+        start = time.perf_counter()
+        count = render_many(template_path, employees, name='{name}離職證明.docx',
+                            zip_path=os.path.join(tmpdir, '離職證明.zip'))
+        elapsed = time.perf_counter() - start
+        print(f'預先解析模板（行程池，寫入zip）: {count / elapsed:.1f}份/秒')
+
+        from docx import Document
+
+        # 被拆到兩個run中的佔位符只用DocxTemplate單獨示範
+        split_path = os.path.join(tmpdir, 'split.docx')
+        make_template(split_path, split_placeholder=True)
+        DocxTemplate(split_path).save(employees[0], os.path.join(tmpdir, 'result.docx'))
+        doc = Document(os.path.join(tmpdir, 'result.docx'))
+        print(doc.paragraphs[1].text)
+        print(doc.paragraphs[-1].text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+串流式的Excel讀寫工具（對應 24.Python讀寫Excel檔案-1 和 25.Python讀寫Excel檔案-2）
+
+原來的範例用 sheet[f'{col_ch}{row_ch}'].value 逐個讀取單元格，每個單元格都要解析一次座標字串，
+寫入時也是一個單元格一個單元格的寫。這裡的做法是：
+- 讀取：openpyxl 以 read_only 模式開啟工作簿，用 iter_rows(values_only=True) 逐行取得值構成的元組，
+  每 chunk_size 行交給呼叫者一次，整個工作表不會同時在記憶體中
+- 每一塊可以是元組的列表、NumPy陣列或pandas的DataFrame，型別轉換按列一次完成
+- 寫入：write_only 模式的工作簿，一次 append 一整行，寫過的行直接寫到暫存檔中
+- .xls 檔案用 xlrd 的 row_values 按行讀取（xlwt 沒有按行寫入的介面，新檔案建議直接寫 .xlsx）
+"""
+import time
+
+from itertools import islice
+
+import numpy as np
+import openpyxl
+
+
+def _chunked(rows, chunk_size):
+    """把行的迭代器切分成列表"""
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def _iter_xlsx_rows(path, sheet=0, skip_rows=0):
+    """逐行讀取xlsx檔案，產生每一行的值構成的元組"""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        yield from ws.iter_rows(min_row=skip_rows + 1, values_only=True)
+    finally:
+        # read_only模式會一直開著檔案，要手動關閉
+        wb.close()
+
+
+def _iter_xls_rows(path, sheet=0, skip_rows=0):
+    """逐行讀取xls檔案，產生每一行的值構成的元組（日期是Excel的序號）"""
+    import xlrd
+
+    wb = xlrd.open_workbook(path, on_demand=True)
+    try:
+        ws = wb.sheet_by_index(sheet) if isinstance(sheet, int) else wb.sheet_by_name(sheet)
+        for i in range(skip_rows, ws.nrows):
+            yield tuple(ws.row_values(i))
+    finally:
+        wb.release_resources()
+
+
+def iter_row_chunks(path, sheet=0, *, skip_rows=0, chunk_size=10000):
+    """
+    按塊讀取xlsx檔案中的行
+    :param path: 檔案路徑
+    :param sheet: 工作表的序號或名字
+    :param skip_rows: 跳過開頭的行數（例如表頭）
+    :param chunk_size: 每一塊的行數
+    :return: 生成器，每次產生一個元組的列表
+    """
+    yield from _chunked(_iter_xlsx_rows(path, sheet, skip_rows), chunk_size)
+
+
+def iter_xls_row_chunks(path, sheet=0, *, skip_rows=0, chunk_size=10000):
+    """按塊讀取xls檔案中的行（參數跟iter_row_chunks相同，日期是Excel的序號）"""
+    yield from _chunked(_iter_xls_rows(path, sheet, skip_rows), chunk_size)
+
+
+def read_header(path, sheet=0):
+    """讀取工作表的第一行（表頭）"""
+    return next(iter_row_chunks(path, sheet, chunk_size=1))[0]
+
+
+def to_numpy(chunk, dtypes=None):
+    """
+    把一塊行轉換成NumPy陣列
+    :param chunk: 元組的列表
+    :param dtypes: 每一列的型別（例如[np.float64, ...]），為None時傳回object型別的二維陣列
+    :return: 二維陣列，或每一列一個陣列構成的列表（指定了dtypes時）
+    """
+    block = np.array(chunk, dtype=object)
+    if dtypes is None:
+        return block
+    # 按列一次轉換型別，不需要逐個判斷單元格的型別
+    return [block[:, i].astype(dtype) for i, dtype in enumerate(dtypes)]
+
+
+def to_frame(chunk, columns, dtypes=None):
+    """
+    把一塊行轉換成DataFrame
+    :param chunk: 元組的列表
+    :param columns: 列名
+    :param dtypes: 列名到型別的字典（例如{'Date': 'datetime64[ns]', 'Close': 'f8'}）
+    :return: DataFrame
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(chunk, columns=columns)
+    return df.astype(dtypes) if dtypes else df
+
+
+def read_chunks(path, sheet=0, *, chunk_size=10000, kind='tuples', dtypes=None, header=True):
+    """
+    按塊讀取工作表
+    :param path: 檔案路徑（.xlsx或.xls）
+    :param sheet: 工作表的序號或名字
+    :param chunk_size: 每一塊的行數
+    :param kind: 每一塊的形式 - tuples（元組的列表）、numpy或pandas
+    :param dtypes: 型別轉換（numpy時是每一列型別的列表，pandas時是列名到型別的字典）
+    :param header: 第一行是否為表頭（pandas時用作列名）
+    :return: 生成器
+    """
+    reader = _iter_xls_rows if str(path).endswith('.xls') else _iter_xlsx_rows
+    rows = reader(path, sheet)
+    # 先從行的迭代器中取出表頭再切分，每一塊都正好是chunk_size行
+    columns = next(rows, None) if header else None
+    for chunk in _chunked(rows, chunk_size):
+        if kind == 'numpy':
+            yield to_numpy(chunk, dtypes)
+        elif kind == 'pandas':
+            yield to_frame(chunk, columns, dtypes)
+        else:
+            yield chunk
+
+
+def read_frame(path, sheet=0, *, chunk_size=50000, dtypes=None):
+    """把整個工作表讀成一個DataFrame（第一行是表頭）"""
+    import pandas as pd
+
+    frames = list(read_chunks(path, sheet, chunk_size=chunk_size, kind='pandas', dtypes=dtypes))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def write_rows(path, rows, *, title=None, header=None):
+    """
+    用write_only模式寫入xlsx檔案
+    :param path: 檔案路徑
+    :param rows: 行的可迭代物件，也可以是DataFrame或產生DataFrame的可迭代物件
+    :param title: 工作表的名字
+    :param header: 表頭（rows是DataFrame時預設使用它的列名）
+    :return: 寫入的行數（不含表頭）
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    # 用有沒有itertuples方法判斷是不是DataFrame，寫入普通的行時不需要匯入pandas
+    if hasattr(rows, 'itertuples'):
+        rows = [rows]
+    count = 0
+    for item in rows:
+        if hasattr(item, 'itertuples'):
+            if header is None:
+                header = list(item.columns)
+            if header:
+                ws.append(header)
+                header = False
+            # itertuples(name=None)傳回普通元組，比iterrows快很多
+            for row in item.itertuples(index=False, name=None):
+                ws.append(row)
+            count += len(item)
+        else:
+            if header:
+                ws.append(header)
+                header = False
+            ws.append(item)
+            count += 1
+    wb.save(path)
+    return count
+
+
+def write_cells(path, rows, header=None):
+    """逐個單元格寫入（原來範例的寫法，用於比較）"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    offset = 1
+    if header:
+        for col, value in enumerate(header, 1):
+            ws.cell(1, col, value)
+        offset = 2
+    for row_index, row in enumerate(rows):
+        for col, value in enumerate(row, 1):
+            ws.cell(row_index + offset, col, value)
+    wb.save(path)
+
+
+def read_cells(path, columns='ABCDEFG'):
+    """用座標字串逐個讀取單元格（原來範例的讀法，用於比較）"""
+    wb = openpyxl.load_workbook(path)
+    sheet = wb.worksheets[0]
+    rows = []
+    for row_ch in range(2, sheet.max_row + 1):
+        rows.append(tuple(sheet[f'{col_ch}{row_ch}'].value for col_ch in columns))
+    return rows
+
+
+def make_rows(n_rows, random_state=None, batch_size=10000):
+    """逐行產生跟股票資料格式相同的行（日期和6個數值列）"""
+    import datetime
+
+    rng = np.random.default_rng(random_state)
+    day = datetime.datetime(2020, 1, 2)
+    for start in range(0, n_rows, batch_size):
+        values = rng.uniform(100, 300, size=(min(batch_size, n_rows - start), 6)).round(2).tolist()
+        for i, row in enumerate(values, start):
+            yield (day + datetime.timedelta(days=i), *row)
+
+
+def sum_column(path, column):
+    """按塊讀取並轉換型別，傳回某一列的總和"""
+    total = 0.0
+    for chunk in read_chunks(path, kind='numpy', dtypes=['datetime64[s]'] + ['f8'] * 6):
+        total += chunk[column].sum()
+    return total
+
+
+def sum_column_by_cells(path, column):
+    """逐個單元格讀取，傳回某一列的總和"""
+    return sum(row[column] for row in read_cells(path))
+
+
+def _measure(func, *args):
+    """在子行程中執行，傳回(結果, 耗時, 記憶體峰值MB)"""
+    import resource
+
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(func, *args):
+    """用一個全新的行程執行函式（記憶體峰值不受之前測試的影響），傳回(結果, 耗時, 記憶體峰值MB)"""
+    import multiprocessing
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure, func, *args).result()
+
+
+def write_cells_bench(path, n_rows, header):
+    write_cells(path, make_rows(n_rows, random_state=3), header)
+
+
+def write_rows_bench(path, n_rows, header):
+    write_rows(path, make_rows(n_rows, random_state=3), header=header)
+
+
+def main():
+    import os
+    import sys
+    import tempfile
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    header = ('Date', 'High', 'Low', 'Open', 'Close', 'Volume', 'Adj Close')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cell_path, stream_path = os.path.join(tmpdir, 'cells.xlsx'), os.path.join(tmpdir, 'stream.xlsx')
+        _, elapsed, peak = measure(write_cells_bench, cell_path, n_rows, header)
+        print(f'逐個單元格寫入{n_rows}行: {elapsed:.3f}秒, 記憶體峰值{peak:.1f}MB')
+        _, elapsed, peak = measure(write_rows_bench, stream_path, n_rows, header)
+        print(f'write_only按行寫入{n_rows}行: {elapsed:.3f}秒, 記憶體峰值{peak:.1f}MB')
+        total, elapsed, peak = measure(sum_column_by_cells, cell_path, 4)
+        print(f'逐個單元格讀取: {elapsed:.3f}秒, 記憶體峰值{peak:.1f}MB, 收盤價總和{total:.2f}')
+        total, elapsed, peak = measure(sum_column, stream_path, 4)
+        print(f'read_only按塊讀取: {elapsed:.3f}秒, 記憶體峰值{peak:.1f}MB, 收盤價總和{total:.2f}')
+        df = read_frame(stream_path, dtypes={'Date': 'datetime64[s]', 'Close': 'f8'})
+        print(df.head(3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+大檔案的讀寫工具（對應 21.檔案讀寫和異常處理）
+
+範例8用 file1.read() 把整個 guido.jpg 讀進記憶體再寫出去，範例2用 readlines() 一次讀入所有的行，
+檔案有幾個GB時這兩種做法都會佔用跟檔案一樣大的記憶體。這裡的做法是：
+- copy_file：用 os.sendfile 在作業系統核心中直接複製（資料不經過Python），
+  不支援時退回到 shutil.copyfileobj 並使用較大的緩衝區
+- iter_lines：用 mmap 把檔案對映到記憶體，按換行符切分，只有用到的頁面才會被讀入
+- count_lines / grep：把檔案在換行符的位置切成幾塊，在行程池中同時處理，
+  統計行數時每次對一大塊資料呼叫 bytes.count，不需要逐行迴圈
+"""
+import mmap
+import os
+import re
+import shutil
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+BUFFER_SIZE = 1024 * 1024
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def copy_file(src, dst, buffer_size=BUFFER_SIZE):
+    """
+    複製檔案
+    :param src: 原始檔路徑
+    :param dst: 目標檔案路徑
+    :param buffer_size: 不能使用sendfile時每次讀寫的位元組數
+    :return: 複製的位元組數
+    """
+    with open(src, 'rb') as infile, open(dst, 'wb') as outfile:
+        size = os.fstat(infile.fileno()).st_size
+        if hasattr(os, 'sendfile'):
+            try:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(outfile.fileno(), infile.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return offset
+            except OSError:
+                # 有些平臺或檔案系統不支援在兩個普通檔案之間使用sendfile
+                infile.seek(0)
+                outfile.seek(0)
+                outfile.truncate()
+        shutil.copyfileobj(infile, outfile, buffer_size)
+        return size
+
+
+def _map(path):
+    """唯讀的方式對映整個檔案（空檔案傳回None，因為mmap不能對映長度為0的檔案）"""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_lines(path, encoding=None):
+    """
+    逐行讀取檔案
+    :param path: 檔案路徑
+    :param encoding: 編碼（為None時產生位元組串）
+    :return: 生成器，產生每一行（包含結尾的換行符）
+    """
+    mm = _map(path)
+    if mm is None:
+        return
+    with mm:
+        start, size, rest = 0, len(mm), b''
+        while start < size:
+            # 每次取一塊資料一起切分，最後不完整的一行留到下一塊
+            block = rest + mm[start:start + BUFFER_SIZE]
+            start += BUFFER_SIZE
+            lines = block.split(b'\n')
+            rest = lines.pop()
+            for line in lines:
+                line += b'\n'
+                yield line.decode(encoding) if encoding else line
+        if rest:
+            yield rest.decode(encoding) if encoding else rest
+
+
+def split_chunks(path, n_chunks):
+    """
+    在換行符的位置把檔案切成大約相同大小的幾塊
+    :return: (起始位置, 結束位置)的列表
+    """
+    mm = _map(path)
+    if mm is None:
+        return []
+    with mm:
+        size = len(mm)
+        bounds = [0]
+        for i in range(1, n_chunks):
+            pos = mm.find(b'\n', max(size * i // n_chunks, bounds[-1])) + 1
+            if pos == 0:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        if bounds[-1] < size:
+            bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _count_newlines(mm, start, end):
+    """每次取一大塊資料統計換行符的數量"""
+    count = 0
+    for pos in range(start, end, BLOCK_SIZE):
+        count += mm[pos:min(pos + BLOCK_SIZE, end)].count(b'\n')
+    return count
+
+
+def _count_chunk(path, start, end):
+    with _map(path) as mm:
+        return _count_newlines(mm, start, end)
+
+
+def _grep_chunk(path, pattern, flags, start, end):
+    """在一塊資料中查詢，傳回(這一塊的換行符數量, [(塊中的行號, 行的內容)])"""
+    regex = re.compile(pattern, flags)
+    results = []
+    with _map(path) as mm:
+        pos, line_no, counted = start, 0, start
+        while pos < end:
+            # 正規表示式可以直接在mmap物件上查詢，不需要複製資料
+            match = regex.search(mm, pos, end)
+            if match is None:
+                break
+            if match.start() == end and mm[end - 1:end] == b'\n':
+                # 在MULTILINE模式下^和$可以匹配最後一個換行符之後的空位置，但那裡並沒有一行
+                break
+            line_start = mm.rfind(b'\n', start, match.start()) + 1 or start
+            line_end = mm.find(b'\n', match.start(), end)
+            line_end = end if line_end == -1 else line_end
+            # 在整塊資料上找到的匹配可能跨過換行符（例如\s、[^x]），只在匹配開始的那一行中再查詢一次確認
+            if regex.search(mm, line_start, line_end):
+                line_no += _count_newlines(mm, counted, line_start)
+                counted = line_start
+                results.append((line_no, mm[line_start:line_end]))
+            # 同一行中的其他匹配不再重複報告，從下一行繼續查詢
+            pos = line_end + 1
+        return _count_newlines(mm, start, end), results
+
+
+def count_lines(path, workers=None):
+    """
+    統計檔案的行數（最後一行沒有換行符也算一行）
+    :param path: 檔案路徑
+    :param workers: 行程數量（預設為CPU核數，為1時不建立行程池）
+    :return: 行數
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = split_chunks(path, workers)
+    if not chunks:
+        return 0
+    if workers == 1:
+        count = sum(_count_chunk(path, start, end) for start, end in chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            starts, ends = zip(*chunks)
+            count = sum(pool.map(_count_chunk, [path] * len(chunks), starts, ends))
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return count if file.read(1) == b'\n' else count + 1
+
+
+def grep(path, pattern, *, flags=0, encoding='utf-8', workers=None):
+    """
+    查詢檔案中匹配正規表示式的行
+    :param path: 檔案路徑
+    :param pattern: 正規表示式（字串或位元組串）
+    :param flags: 正規表示式的標誌
+    :param encoding: 檔案的編碼（用於轉換字串形式的pattern和匹配的行）
+    :param workers: 行程數量（預設為CPU核數，為1時不建立行程池）
+    :return: (行號, 行的內容)的列表，行號從1開始
+    """
+    if isinstance(pattern, str):
+        pattern = pattern.encode(encoding)
+    # 讓^和$匹配每一行的開頭和結尾
+    flags |= re.MULTILINE
+    workers = workers or os.cpu_count() or 1
+    chunks = split_chunks(path, workers)
+    if workers == 1:
+        results = [_grep_chunk(path, pattern, flags, start, end) for start, end in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_grep_chunk, path, pattern, flags, start, end) for start, end in chunks]
+            results = [future.result() for future in futures]
+    lines, offset = [], 1
+    for newlines, matches in results:
+        lines.extend((offset + line_no, line.decode(encoding)) for line_no, line in matches)
+        offset += newlines
+    return lines
+
+
+def make_text_file(path, size, seed=None):
+    """產生大約size位元組的文字檔案（重複致橡樹的內容並加上行號）"""
+    import random
+
+    rng = random.Random(seed)
+    poem = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '致橡樹.txt')
+    with open(poem, 'r', encoding='utf-8') as file:
+        lines = [line.strip() for line in file if line.strip()]
+    written, i = 0, 0
+    with open(path, 'wb') as file:
+        while written < size:
+            block = ''.join(f'{i + j}\t{rng.choice(lines)}\n' for j in range(10000))
+            written += file.write(block.encode('utf-8'))
+            i += 10000
+    return i
+
+
+def _timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    import sys
+    import tempfile
+
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 200 * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, 'big.txt')
+        make_text_file(src, size, seed=1)
+        size = os.path.getsize(src)
+        print(f'檔案大小: {size / 1024 / 1024:.1f}MB')
+
+        def read_write(src, dst):
+            with open(src, 'rb') as file1:
+                data = file1.read()
+            with open(dst, 'wb') as file2:
+                file2.write(data)
+
+        def copyfileobj(src, dst):
+            with open(src, 'rb') as file1, open(dst, 'wb') as file2:
+                shutil.copyfileobj(file1, file2, BUFFER_SIZE)
+
+        dst = os.path.join(tmpdir, 'copy.txt')
+        for name, func in (('read()整個檔案', read_write), ('copyfileobj', copyfileobj), ('copy_file', copy_file)):
+            _, elapsed = _timeit(func, src, dst)
+            print(f'{name}複製: {size / 1024 / 1024 / elapsed:.1f}MB/秒')
+
+        def count_readlines(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                return len(file.readlines())
+
+        def count_iterate(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                return sum(1 for _ in file)
+
+        for name, func in (('readlines()', count_readlines), ('逐行迭代', count_iterate),
+                           ('mmap逐行', lambda path: sum(1 for _ in iter_lines(path))),
+                           ('count_lines', count_lines)):
+            count, elapsed = _timeit(func, src)
+            print(f'{name}統計行數: {size / 1024 / 1024 / elapsed:.1f}MB/秒, {count}行')
+
+        def naive_grep(path, pattern):
+            regex = re.compile(pattern)
+            with open(path, 'r', encoding='utf-8') as file:
+                return [(line_no, line.rstrip('\n')) for line_no, line in enumerate(file, 1) if regex.search(line)]
+
+        expected, elapsed = _timeit(naive_grep, src, r'^\d*7777\t.*木棉')
+        print(f'逐行查詢: {size / 1024 / 1024 / elapsed:.1f}MB/秒, {len(expected)}行')
+        found, elapsed = _timeit(grep, src, r'^\d*7777\t.*木棉')
+        print(f'grep查詢: {size / 1024 / 1024 / elapsed:.1f}MB/秒, 結果相同: {found == expected}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+批次的影象處理工具（對應 28.Python處理影象）
+
+原來的範例6用兩層迴圈呼叫 putpixel 把一個矩形區域塗成灰色，230 * 340 個畫素就是 78200 次函式呼叫。
+這裡的做法是：
+- 填充區域和遮罩交給 PIL 的批次操作（Image.paste、Image.composite）一次完成，迴圈在 C 語言層面執行
+- 雜點和顏色變換把圖片轉成 NumPy 陣列：雜點一次產生所有座標和顏色，用花式索引一次寫入；
+  顏色變換是整個陣列和 3x3 矩陣的一次矩陣乘法
+- captcha：雜點同樣一次寫入陣列，不再逐點繪製
+- process_directory：用行程池批次處理整個目錄中的圖片
+"""
+import functools
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from PIL import Image, ImageDraw, ImageFont
+
+# 計算灰度的係數（ITU-R 601-2，跟Image.convert('L')相同）
+GRAY_MATRIX = np.array([[0.299, 0.587, 0.114]] * 3)
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131],
+])
+
+
+def fill_region(image, box, color):
+    """
+    用指定的顏色填充矩形區域（直接修改image）
+    :param image: Image物件
+    :param box: 區域 - (左, 上, 右, 下)，不包含右邊界和下邊界
+    :param color: 顏色
+    :return: image本身
+    """
+    image.paste(color, box)
+    return image
+
+
+def fill_region_numpy(image, box, color):
+    """用NumPy陣列的切片填充矩形區域，傳回新的Image物件"""
+    left, top, right, bottom = box
+    pixels = np.array(image)
+    pixels[top:bottom, left:right] = color
+    return Image.fromarray(pixels)
+
+
+def apply_mask(image, mask, color):
+    """
+    把遮罩為True的畫素替換成指定的顏色
+    :param image: Image物件
+    :param mask: 跟影象大小相同的布林陣列（形狀為(高, 寬)）
+    :param color: 顏色
+    :return: 新的Image物件
+    """
+    mask_image = Image.fromarray(np.asarray(mask, dtype=np.uint8) * 255, mode='L')
+    return Image.composite(Image.new(image.mode, image.size, color), image, mask_image)
+
+
+def add_noise(image, density=0.05, rng=None):
+    """
+    隨機雜點（椒鹽雜訊）：一次產生所有雜點的位置和顏色
+    :param image: Image物件（不是RGB模式時先轉換成RGB模式）
+    :param density: 雜點佔所有畫素的比例
+    :param rng: 隨機數產生器
+    :return: 新的Image物件
+    """
+    rng = rng or np.random.default_rng()
+    pixels = np.array(image if image.mode == 'RGB' else image.convert('RGB'))
+    height, width = pixels.shape[:2]
+    count = int(width * height * density)
+    ys, xs = rng.integers(height, size=count), rng.integers(width, size=count)
+    pixels[ys, xs] = rng.integers(256, size=(count, pixels.shape[2]), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def color_transform(image, matrix):
+    """
+    顏色變換：每個畫素的(R, G, B)乘以3x3的矩陣
+    :param image: Image物件（不是RGB模式時先轉換成RGB模式）
+    :param matrix: 3x3的矩陣（例如GRAY_MATRIX、SEPIA_MATRIX）
+    :return: 新的Image物件
+    """
+    pixels = np.asarray(image if image.mode == 'RGB' else image.convert('RGB'), dtype=np.float32)
+    transformed = pixels @ np.asarray(matrix, dtype=np.float32).T
+    return Image.fromarray(np.clip(transformed, 0, 255).astype(np.uint8))
+
+
+def random_color(rng):
+    return tuple(int(c) for c in rng.integers(256, size=3))
+
+
+def captcha(code, size=(160, 60), *, font=None, n_points=600, n_lines=4, rng=None):
+    """
+    生成驗證碼圖片
+    :param code: 驗證碼字串
+    :param size: 圖片的寬度和高度
+    :param font: ImageFont物件（預設使用PIL內建的字型）
+    :param n_points: 雜點的數量
+    :param n_lines: 干擾線的數量
+    :param rng: 隨機數產生器
+    :return: Image物件
+    """
+    rng = rng or np.random.default_rng()
+    width, height = size
+    image = Image.new('RGB', size, (255, 255, 255))
+    drawer = ImageDraw.Draw(image)
+    font = font or ImageFont.load_default(size=height // 2)
+    step = width // (len(code) + 1)
+    for i, ch in enumerate(code):
+        drawer.text((step * (i + 0.6), height // 5), ch, fill=random_color(rng), font=font)
+    for _ in range(n_lines):
+        drawer.line(tuple(int(v) for v in rng.integers(0, (width, height, width, height))),
+                    fill=random_color(rng), width=2)
+    # 雜點：一次產生座標和顏色，直接寫入陣列
+    pixels = np.array(image)
+    ys, xs = rng.integers(height, size=n_points), rng.integers(width, size=n_points)
+    pixels[ys, xs] = rng.integers(256, size=(n_points, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def grey_out(image, box=(80, 20, 310, 360), color=(128, 128, 128)):
+    """範例6的批次版本：把指定區域塗成灰色"""
+    return fill_region(image.convert('RGB'), box, color)
+
+
+def process_file(src, dst, func):
+    """處理一個圖片檔案並儲存（目錄中可能有灰度圖或帶透明通道的PNG，統一轉換成RGB模式再處理）"""
+    with Image.open(src) as image:
+        func(image.convert('RGB')).save(dst)
+    return dst
+
+
+def process_directory(indir, outdir, func, *, suffixes=('.jpg', '.jpeg', '.png'), workers=None):
+    """
+    用行程池處理目錄中的所有圖片
+    :param indir: 圖片所在的目錄
+    :param outdir: 儲存結果的目錄
+    :param func: 處理函式（接收並傳回Image物件，需要能夠被pickle，可以用functools.partial指定參數）
+    :param suffixes: 要處理的副檔名
+    :param workers: 行程數量（預設為CPU核數）
+    :return: 處理後的檔案路徑的列表
+    """
+    os.makedirs(outdir, exist_ok=True)
+    names = [name for name in sorted(os.listdir(indir)) if name.lower().endswith(suffixes)]
+    srcs = [os.path.join(indir, name) for name in names]
+    dsts = [os.path.join(outdir, name) for name in names]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(len(names) // (workers * 4), 1)
+        return list(pool.map(process_file, srcs, dsts, [func] * len(names), chunksize=chunksize))
+
+
+def putpixel_fill(image, box, color):
+    """原來範例6的做法：逐個畫素呼叫putpixel（用於比較）"""
+    left, top, right, bottom = box
+    for x in range(left, right):
+        for y in range(top, bottom):
+            image.putpixel((x, y), color)
+    return image
+
+
+def putpixel_noise(image, count, rng):
+    """逐點繪製雜點（用於比較）"""
+    width, height = image.size
+    for _ in range(count):
+        xy = int(rng.integers(width)), int(rng.integers(height))
+        image.putpixel(xy, random_color(rng))
+    return image
+
+
+def main():
+    import tempfile
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'guido.jpg')
+    image = Image.open(path).convert('RGB')
+    box, gray = (80, 20, 310, 360), (128, 128, 128)
+    results = {}
+    for name, func in (('putpixel', putpixel_fill), ('Image.paste', fill_region), ('NumPy', fill_region_numpy)):
+        start = time.perf_counter()
+        for _ in range(10):
+            results[name] = func(image.copy(), box, gray)
+        print(f'{name}填充區域: {(time.perf_counter() - start) / 10 * 1000:.2f}毫秒')
+    print('結果相同:', all(np.array_equal(np.asarray(results['putpixel']), np.asarray(result))
+                          for result in results.values()))
+
+    rng = np.random.default_rng(3)
+    count = image.width * image.height // 20
+    start = time.perf_counter()
+    putpixel_noise(image.copy(), count, rng)
+    print(f'putpixel繪製{count}個雜點: {(time.perf_counter() - start) * 1000:.2f}毫秒')
+    start = time.perf_counter()
+    add_noise(image, 0.05, rng)
+    print(f'NumPy繪製{count}個雜點: {(time.perf_counter() - start) * 1000:.2f}毫秒')
+    start = time.perf_counter()
+    codes = [captcha('Ab3x', rng=rng) for _ in range(100)]
+    print(f'生成{len(codes)}張驗證碼: {(time.perf_counter() - start) * 1000:.2f}毫秒')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        indir = os.path.join(tmpdir, 'in')
+        os.makedirs(indir)
+        for i in range(40):
+            image.save(os.path.join(indir, f'{i:03d}.png'))
+        func = functools.partial(color_transform, matrix=SEPIA_MATRIX)
+        start = time.perf_counter()
+        files = process_directory(indir, os.path.join(tmpdir, 'out'), func)
+        print(f'行程池處理{len(files)}張圖片: {time.perf_counter() - start:.3f}秒')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+串流式的序列化工具（對應 22.物件的序列化和反序列化 和 23.Python讀寫CSV檔案）
+
+範例用 json.load 把整個檔案讀成一個物件，檔案中有幾百萬筆記錄時記憶體要同時裝下所有的記錄；
+寫CSV時每一行呼叫一次 writerow。這裡的做法是：
+- iter_json_array：每次讀入一塊文字，用 JSONDecoder.raw_decode 解析出陣列中的一個元素就交給呼叫者，
+  也可以指定鍵的路徑（例如 ['newslist']）解析物件裡面的陣列，整個檔案不會同時在記憶體中
+- write_json_array / write_jsonl / iter_jsonl：逐筆寫入或讀取 JSON（JSON Lines 每行一筆記錄）
+- write_csv：每 batch_size 行呼叫一次 writerows
+- 有安裝 orjson 時用它編碼和解碼 JSON，msgpack 格式需要安裝 msgpack（都是在用到時才匯入）
+"""
+import csv
+import json
+import time
+
+from itertools import islice
+
+BUFFER_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+def _orjson():
+    """有安裝orjson時傳回這個模組，否則傳回None"""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+class _JSONStream:
+    """在一個不斷從檔案補充的緩衝區上逐個解析JSON值"""
+
+    def __init__(self, file, buffer_size):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer, self.pos, self.eof = '', 0, False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """丟掉已經解析過的部分，再讀入一塊文字，傳回是否讀到了新的內容"""
+        if self.eof:
+            return False
+        data = self.file.read(self.buffer_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳過空白字元，傳回下一個字元（檔案結束時傳回空字串）"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f'位置{self.pos}應該是{chars!r}，實際是{ch!r}')
+        self.pos += 1
+        return ch
+
+    def decode(self):
+        """解析下一個完整的JSON值"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # 值被緩衝區截斷了，讀入更多內容再試一次
+                if self.fill():
+                    continue
+                raise
+            # 數字在緩衝區結尾時可能還沒有結束（例如1.5e-3被截成1.5e和-3，會先解析出1.5）
+            if (isinstance(value, (int, float)) and not self.buffer[end:].strip('0123456789.eE+-')
+                    and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """逐個產生陣列中的元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.expect(',]') == ']':
+                return
+
+    def find_key(self, key):
+        """在物件中找到指定的鍵（其他鍵的值解析後丟掉），停在這個鍵的值之前"""
+        self.expect('{')
+        if self.peek() == '}':
+            raise KeyError(key)
+        while True:
+            name = self.decode()
+            self.expect(':')
+            if name == key:
+                return
+            self.decode()
+            if self.expect(',}') == '}':
+                raise KeyError(key)
+
+
+def iter_json_array(file, path=(), buffer_size=BUFFER_SIZE):
+    """
+    逐個讀取JSON陣列中的元素
+    :param file: 以文字模式開啟的檔案物件（或者檔案路徑）
+    :param path: 陣列在物件中的鍵的路徑，例如['newslist']表示最外層物件中newslist對應的陣列
+    :param buffer_size: 每次讀取的字元數
+    :return: 生成器
+    """
+    if isinstance(file, str):
+        with open(file, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f, path, buffer_size)
+        return
+    stream = _JSONStream(file, buffer_size)
+    for key in path:
+        stream.find_key(key)
+    yield from stream.iter_array()
+
+
+def _dumps_func():
+    """傳回把一筆記錄編碼成str的函式（優先使用orjson）"""
+    orjson = _orjson()
+    if orjson is not None:
+        return lambda obj: orjson.dumps(obj).decode('utf-8')
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return encoder.encode
+
+
+def write_json_array(path, records, batch_size=1000):
+    """
+    逐筆把記錄寫成一個JSON陣列
+    :param path: 檔案路徑
+    :param records: 記錄的可迭代物件
+    :param batch_size: 每次寫入檔案的記錄數量
+    :return: 寫入的記錄數量
+    """
+    dumps, count = _dumps_func(), 0
+    records = iter(records)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[')
+        while batch := list(islice(records, batch_size)):
+            file.write((',\n' if count else '\n') + ',\n'.join(map(dumps, batch)))
+            count += len(batch)
+        file.write('\n]\n')
+    return count
+
+
+def write_jsonl(path, records, batch_size=1000):
+    """逐筆把記錄寫成JSON Lines檔案（每行一筆記錄），傳回寫入的記錄數量"""
+    dumps, count = _dumps_func(), 0
+    records = iter(records)
+    with open(path, 'w', encoding='utf-8') as file:
+        while batch := list(islice(records, batch_size)):
+            file.write('\n'.join(map(dumps, batch)) + '\n')
+            count += len(batch)
+    return count
+
+
+def iter_jsonl(path):
+    """逐行讀取JSON Lines檔案（優先使用orjson解碼）"""
+    orjson = _orjson()
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, 'rb') as file:
+        for line in file:
+            if line.strip():
+                yield loads(line)
+
+
+def write_csv(path, rows, header=None, batch_size=1000, **fmtparams):
+    """
+    寫入CSV檔案
+    :param path: 檔案路徑
+    :param rows: 行的可迭代物件
+    :param header: 表頭
+    :param batch_size: 每次呼叫writerows的行數
+    :param fmtparams: 傳給csv.writer的參數（例如delimiter、quoting）
+    :return: 寫入的行數（不含表頭）
+    """
+    count = 0
+    rows = iter(rows)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, **fmtparams)
+        if header:
+            writer.writerow(header)
+        while batch := list(islice(rows, batch_size)):
+            writer.writerows(batch)
+            count += len(batch)
+    return count
+
+
+def iter_csv(path, skip_header=True, **fmtparams):
+    """逐行讀取CSV檔案"""
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file, **fmtparams)
+        if skip_header:
+            next(reader, None)
+        yield from reader
+
+
+def write_msgpack(path, records):
+    """逐筆把記錄寫成MessagePack格式（需要安裝msgpack），傳回寫入的記錄數量"""
+    import msgpack
+
+    packer, count = msgpack.Packer(), 0
+    with open(path, 'wb') as file:
+        for record in records:
+            file.write(packer.pack(record))
+            count += 1
+    return count
+
+
+def iter_msgpack(path):
+    """逐筆讀取MessagePack格式的檔案"""
+    import msgpack
+
+    with open(path, 'rb') as file:
+        yield from msgpack.Unpacker(file, raw=False)
+
+
+def make_records(n, seed=None):
+    """逐筆產生跟範例格式類似的記錄"""
+    import random
+
+    rng = random.Random(seed)
+    names = ['關羽', '張飛', '趙雲', '馬超', '黃忠']
+    for i in range(n):
+        yield {
+            'id': i,
+            'name': rng.choice(names),
+            'scores': [rng.randrange(50, 101) for _ in range(3)],
+            'ratio': rng.random(),
+            'cars': [{'brand': rng.choice(['BMW', 'Audi', 'Benz']), 'max_speed': rng.randrange(200, 300)}],
+        }
+
+
+def make_rows(n, seed=None):
+    """逐行產生範例1格式的CSV資料"""
+    for record in make_records(n, seed):
+        yield [record['name'], *record['scores']]
+
+
+def _measure(func, *args):
+    """在子行程中執行，傳回(結果, 耗時, 記憶體峰值MB)"""
+    import resource
+
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(func, *args):
+    """用一個全新的行程執行函式，記憶體峰值不受其他測試影響"""
+    import multiprocessing
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure, func, *args).result()
+
+
+def json_dump_bench(path, n):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(list(make_records(n, seed=1)), file, ensure_ascii=False)
+    return n
+
+
+def json_load_bench(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return sum(record['scores'][0] for record in json.load(file))
+
+
+def json_array_write_bench(path, n):
+    return write_json_array(path, make_records(n, seed=1))
+
+
+def json_array_read_bench(path):
+    return sum(record['scores'][0] for record in iter_json_array(path))
+
+
+def jsonl_write_bench(path, n):
+    return write_jsonl(path, make_records(n, seed=1))
+
+
+def jsonl_read_bench(path):
+    return sum(record['scores'][0] for record in iter_jsonl(path))
+
+
+def msgpack_write_bench(path, n):
+    return write_msgpack(path, make_records(n, seed=1))
+
+
+def msgpack_read_bench(path):
+    return sum(record['scores'][0] for record in iter_msgpack(path))
+
+
+def csv_writerow_bench(path, n):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['姓名', '語文', '數學', '英語'])
+        for row in make_rows(n, seed=1):
+            writer.writerow(row)
+    return n
+
+
+def csv_write_bench(path, n):
+    return write_csv(path, make_rows(n, seed=1), header=['姓名', '語文', '數學', '英語'])
+
+
+def csv_read_bench(path):
+    return sum(int(row[1]) for row in iter_csv(path))
+
+
+def main():
+    import io
+    import os
+    import sys
+    import tempfile
+
+    news = '{"code": 200, "msg": "success", "newslist": [{"title": "新聞1", "url": "http://a"}, {"title": "新聞2"}]}'
+    for item in iter_json_array(io.StringIO(news), ['newslist'], buffer_size=7):
+        print(item)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    print(f'orjson: {"已安裝" if _orjson() else "未安裝"}')
+    benches = [
+        ('json.dump / json.load', 'data.json', json_dump_bench, json_load_bench),
+        ('JSON陣列（串流）', 'stream.json', json_array_write_bench, json_array_read_bench),
+        ('JSON Lines', 'data.jsonl', jsonl_write_bench, jsonl_read_bench),
+        ('MessagePack', 'data.msgpack', msgpack_write_bench, msgpack_read_bench),
+        ('CSV（writerow）', 'rows.csv', csv_writerow_bench, csv_read_bench),
+        ('CSV（writerows）', 'batch.csv', csv_write_bench, csv_read_bench),
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, filename, write, read in benches:
+            path = os.path.join(tmpdir, filename)
+            try:
+                _, write_time, write_peak = measure(write, path, n)
+            except ImportError as err:
+                print(f'{name}: 略過（{err}）')
+                continue
+            total, read_time, read_peak = measure(read, path)
+            print(f'{name}: 寫入{n / write_time:,.0f}筆/秒（記憶體峰值{write_peak:.1f}MB）, '
+                  f'讀取{n / read_time:,.0f}筆/秒（記憶體峰值{read_peak:.1f}MB）, '
+                  f'檔案{os.path.getsize(path) / 1024 / 1024:.1f}MB, 總和{total}')
+
+
+if __name__ == '__main__':
+    main()
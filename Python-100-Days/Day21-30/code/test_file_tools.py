@@ -0,0 +1,57 @@
+import os
+import random
+import re
+import tempfile
+
+from unittest import TestCase
+
+from file_tools import copy_file, count_lines, grep, iter_lines
+
+
+def naive_grep(data, pattern):
+    """逐行查詢（用來核對grep的結果）"""
+    regex = re.compile(pattern.encode())
+    lines = data.split(b'\n') if data else []
+    if data.endswith(b'\n'):
+        lines.pop()
+    return [(line_no, line.decode()) for line_no, line in enumerate(lines, 1) if regex.search(line)]
+
+
+class TestFileTools(TestCase):
+    """測試大檔案讀寫工具的測試用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'data.txt')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as file:
+            file.write(data)
+
+    def test_copy_file(self):
+        data = os.urandom(3 * 1024 * 1024 + 7)
+        self.write(data)
+        dst = os.path.join(self.tmpdir.name, 'copy.bin')
+        self.assertEqual(len(data), copy_file(self.path, dst))
+        with open(dst, 'rb') as file:
+            self.assertEqual(data, file.read())
+
+    def test_count_and_grep_match_naive_scan(self):
+        rng = random.Random(5)
+        patterns = ['^$', '^', '$', 'a', '^a', 'b$', 'ab+', '^a*$', '中', r'a\s+b', '[^x]+b', r'\s', 'a(?=\n)']
+        samples = [b'', b'\n', b'\n\n', b'a', b'a\n', b'\na', b'ab\n\nb\n\n']
+        for _ in range(60):
+            lines = [''.join(rng.choices('ab中 ', k=rng.randint(0, 4))) for _ in range(rng.randint(1, 30))]
+            samples.append(('\n'.join(lines) + rng.choice(['', '\n'])).encode())
+        for data in samples:
+            self.write(data)
+            expected_count = len(data.decode().splitlines())
+            self.assertEqual(data.splitlines(True), list(iter_lines(self.path)))
+            for workers in (1, 3):
+                self.assertEqual(expected_count, count_lines(self.path, workers=workers), data)
+                for pattern in patterns:
+                    self.assertEqual(naive_grep(data, pattern), grep(self.path, pattern, workers=workers),
+                                     (data, pattern, workers))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+多關鍵字的文字掃描工具（對應 30.正規表示式的應用 中的範例2和範例3）
+
+範例3把所有不良內容寫成一個 fuck|shit|... 的多選一正規表示式，re 模組會在文字的每個位置依次嘗試每一個分支，
+關鍵字有幾萬個時，掃描時間跟關鍵字的數量成正比。這裡的做法是：
+- AhoCorasick：用所有關鍵字建立 Aho–Corasick 自動機，掃描時每個字元只走一步（加上失敗連結），
+  時間跟關鍵字的數量無關，可以一次找出所有匹配的位置，或者一次完成替換
+- trie_regex：把關鍵字放進字首樹再轉換成正規表示式（共同字首只匹配一次），可以直接交給 re.sub 使用
+- scan_file / replace_file：逐行讀取檔案，大檔案也不需要一次讀入記憶體
+自動機只處理固定的字串，範例3中的 [傻煞沙][比筆逼叉缺吊碉雕] 需要先展開成所有的組合（見 expand_classes）。
+"""
+import itertools
+import re
+import time
+
+from collections import deque
+
+
+class AhoCorasick:
+    """Aho–Corasick自動機"""
+
+    def __init__(self, words, ignore_case=False):
+        """
+        :param words: 關鍵字的可迭代物件
+        :param ignore_case: 是否忽略大小寫（會把關鍵字和文字轉成小寫，轉換後長度改變的少數字元可能導致位置不準確）
+        """
+        self.ignore_case = ignore_case
+        # 去掉重複和空的關鍵字，保留原來的順序
+        self.words = list(dict.fromkeys(
+            word.lower() if ignore_case else word for word in words if word
+        ))
+        # 每個狀態的轉移表、失敗連結和在這個狀態結束的關鍵字長度
+        self.goto, self.fail, self.out = [{}], [0], [()]
+        for word in self.words:
+            state = 0
+            for ch in word:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = next_state
+            self.out[state] = (len(word), )
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        """廣度優先計算失敗連結，並把失敗連結指向的狀態的輸出合併進來"""
+        goto, fail, out = self.goto, self.fail, self.out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0) if state else 0
+                if out[fail[child]]:
+                    out[child] = out[child] + out[fail[child]]
+
+    def __len__(self):
+        return len(self.words)
+
+    def iter_all(self, text):
+        """
+        找出所有的匹配（包括互相重疊的）
+        :param text: 要掃描的字串
+        :return: 生成器，產生(起始位置, 結束位置)，按結束位置排列
+        """
+        if self.ignore_case:
+            text = text.lower()
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = index + 1
+                for length in out[state]:
+                    yield end - length, end
+
+    def finditer(self, text):
+        """
+        找出互不重疊的匹配（同一個位置取最長的關鍵字，跟re的結果相同）
+        :param text: 要掃描的字串
+        :return: 生成器，產生(起始位置, 結束位置, 匹配的文字)
+        """
+        last_end = 0
+        for start, end in sorted(self.iter_all(text), key=lambda span: (span[0], -span[1])):
+            if start >= last_end:
+                last_end = end
+                yield start, end, text[start:end]
+
+    def subn(self, repl, text):
+        """
+        一次替換所有匹配
+        :param repl: 替換成的字串，或者接收匹配的文字傳回替換字串的函式
+        :param text: 原來的字串
+        :return: 二元組 - (替換後的字串, 替換的次數)
+        """
+        parts, pos, count = [], 0, 0
+        for start, end, word in self.finditer(text):
+            parts.append(text[pos:start])
+            parts.append(repl(word) if callable(repl) else repl)
+            pos = end
+            count += 1
+        if not count:
+            return text, 0
+        parts.append(text[pos:])
+        return ''.join(parts), count
+
+    def sub(self, repl, text):
+        return self.subn(repl, text)[0]
+
+
+def _trie_pattern(node):
+    """把字首樹的一個節點轉換成正規表示式，沒有子節點時傳回None"""
+    alternatives, chars = [], []
+    for ch in sorted(key for key in node if key):
+        pattern = _trie_pattern(node[ch])
+        if pattern is None:
+            chars.append(re.escape(ch))
+        else:
+            alternatives.append(re.escape(ch) + pattern)
+    if not alternatives and not chars:
+        return None
+    # 只有一個字元的分支合併成字元集合
+    if chars:
+        alternatives.append(chars[0] if len(chars) == 1 else f'[{"".join(chars)}]')
+    pattern = alternatives[0] if len(alternatives) == 1 else f'(?:{"|".join(alternatives)})'
+    if '' in node:
+        # 到這個節點已經是一個完整的關鍵字，後面的部分可有可無（貪婪匹配，優先匹配更長的關鍵字）
+        pattern = f'(?:{pattern})?'
+    return pattern
+
+
+def trie_regex(words, flags=0):
+    """
+    用字首樹建立匹配多個關鍵字的正規表示式
+    :param words: 關鍵字的可迭代物件
+    :param flags: 編譯正規表示式的標誌（例如re.IGNORECASE）
+    :return: 正規表示式物件
+    """
+    trie = {}
+    for word in words:
+        if word:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            # 用空字串表示一個關鍵字在這裡結束
+            node[''] = {}
+    return re.compile(_trie_pattern(trie) or '(?!)', flags)
+
+
+def alternation_regex(words, flags=0):
+    """範例3的做法：所有關鍵字用|連線起來（長的排在前面，保證優先匹配最長的關鍵字）"""
+    words = sorted(set(word for word in words if word), key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, words)) or '(?!)', flags)
+
+
+def expand_classes(pattern):
+    """
+    把只包含字元集合的簡單模式展開成所有的字串，例如'[傻煞]逼'展開成['傻逼', '煞逼']
+    :param pattern: 由普通字元和不含範圍的[...]構成的模式
+    :return: 字串的列表
+    """
+    parts = [group[1:-1] if group.startswith('[') else group
+             for group in re.findall(r'\[[^\]]+\]|.', pattern)]
+    return [''.join(chars) for chars in itertools.product(*parts)]
+
+
+def scan_file(path, scanner, encoding='utf-8'):
+    """
+    逐行掃描文字檔案
+    :param path: 檔案路徑
+    :param scanner: AhoCorasick物件
+    :param encoding: 檔案的編碼
+    :return: 生成器，產生(行號, 起始位置, 結束位置, 匹配的文字)，行號從1開始，位置是在這一行中的位置
+    """
+    with open(path, 'r', encoding=encoding) as file:
+        for line_no, line in enumerate(file, 1):
+            for start, end, word in scanner.finditer(line):
+                yield line_no, start, end, word
+
+
+def replace_file(src, dst, scanner, repl='*', encoding='utf-8'):
+    """
+    逐行替換文字檔案中的關鍵字並寫入另一個檔案
+    :return: 替換的次數
+    """
+    total = 0
+    with open(src, 'r', encoding=encoding) as infile, open(dst, 'w', encoding=encoding) as outfile:
+        for line in infile:
+            line, count = scanner.subn(repl, line)
+            outfile.write(line)
+            total += count
+    return total
+
+
+def make_words(n, rng, min_len=4, max_len=10):
+    """產生n個不重複的隨機小寫英文單詞"""
+    words = set()
+    while len(words) < n:
+        length = rng.randint(min_len, max_len)
+        words.add(''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=length)))
+    return list(words)
+
+
+def _timeit(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    import random
+
+    sentence = 'Oh, shit! 你是傻逼嗎? Fuck you.'
+    words = ['fuck', 'shit'] + expand_classes('[傻煞沙][比筆逼叉缺吊碉雕]')
+    print(AhoCorasick(words, ignore_case=True).sub('*', sentence))
+    print(trie_regex(words, re.IGNORECASE).sub('*', sentence))
+
+    rng = random.Random(7)
+    vocabulary = make_words(100000, rng)
+    # 大約1MB的文字，其中一部分是關鍵字
+    text = ' '.join(rng.choice(vocabulary) if rng.random() < 0.1 else 'lorem' for _ in range(150000))
+    print(f'文字長度: {len(text)}個字元')
+    for n in (10, 100, 1000, 10000, 100000):
+        banned = vocabulary[:n]
+        automaton, build = _timeit(AhoCorasick, banned)
+        result, elapsed = _timeit(automaton.sub, '*', text)
+        print(f'{n:>6}個關鍵字 Aho–Corasick: 建立{build:.3f}秒, 替換{elapsed:.3f}秒')
+        regex, build = _timeit(trie_regex, banned)
+        trie_result, elapsed = _timeit(regex.sub, '*', text)
+        print(f'{n:>6}個關鍵字 字首樹正規表示式: 編譯{build:.3f}秒, 替換{elapsed:.3f}秒, '
+              f'結果相同: {trie_result == result}')
+        # 多選一的正規表示式太慢，關鍵字多的時候只掃描文字的一部分再換算
+        size = len(text) if n <= 1000 else len(text) * 1000 // n
+        regex, build = _timeit(alternation_regex, banned)
+        alt_result, elapsed = _timeit(regex.sub, '*', text[:size])
+        print(f'{n:>6}個關鍵字 多選一正規表示式: 編譯{build:.3f}秒, '
+              f'替換{elapsed * len(text) / size:.3f}秒{"（換算）" if size < len(text) else ""}, '
+              f'結果相同: {alt_result == automaton.sub("*", text[:size])}')
+
+
+if __name__ == '__main__':
+    main()
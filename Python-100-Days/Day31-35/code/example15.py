@@ -4,15 +4,7 @@ itertools - 生成可迭代序列的工具模块
 """
 import itertools
 
-from math import sqrt
-
-
-def is_prime(num):
-    """判断素数"""
-    for factor in range(2, int(sqrt(num)) + 1):
-        if num % factor == 0:
-            return False
-    return True
+from example25 import primes_in_range
 
 
 class PrimeIter(object):
@@ -20,19 +12,14 @@ class PrimeIter(object):
 
     def __init__(self, min_value, max_value):
         assert 2 <= min_value <= max_value
-        self.min_value = min_value - 1
-        self.max_value = max_value
+        # 用分段筛法一段一段的找出素数 不再对每个数字逐一判定
+        self.primes = primes_in_range(min_value, max_value)
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        self.min_value += 1
-        while self.min_value <= self.max_value:
-            if is_prime(self.min_value):
-                return self.min_value
-            self.min_value += 1
-        raise StopIteration()
+        return next(self.primes)
 
 
 class FibIter(object):
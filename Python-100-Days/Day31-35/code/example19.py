@@ -11,17 +11,22 @@
 第3种方式可以通过Future对象的result方法在将来获得线程的执行结果
 也可以通过done方法判定线程是否执行结束
 - 多进程
+生成缩略图是计算密集型任务（解码和缩放都要占用CPU）
+因为GIL的存在多线程并不能让它变快，应该使用进程池并让进程数和CPU核数保持一致
 - 异步I/O
 """
 import glob
 import os
 import time
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 from threading import Thread
 
 from PIL import Image
 
+# 缩略图的尺寸（从大到小）
+SIZES = (128, 64, 32)
+
 
 # class ThumbnailThread(Thread):
 
@@ -39,14 +44,33 @@ from PIL import Image
 #             image.save(outfile, format='PNG')
 
 
-def gen_thumbnail(infile):
-    file, ext = os.path.splitext(infile)
-    filename = file[file.rfind('/') + 1:]
-    for size in (32, 64, 128):
-        outfile = f'thumbnails/{filename}_{size}_{size}.png'
-        image = Image.open(infile)
-        image.thumbnail((size, size))
-        image.save(outfile, format='PNG')
+def gen_thumbnail(infile, outdir='thumbnails', sizes=SIZES):
+    """生成缩略图
+    @params:
+        infile - 原始图片的路径
+        outdir - 保存缩略图的目录
+        sizes - 缩略图的尺寸
+    @return:
+        生成了缩略图返回True，缩略图已经是最新的返回False
+    """
+    filename, _ = os.path.splitext(os.path.basename(infile))
+    sizes = sorted(sizes, reverse=True)
+    outfiles = [os.path.join(outdir, f'{filename}_{size}_{size}.png')
+                for size in sizes]
+    # 缩略图都比原始图片新就不用再生成一次
+    mtime = os.path.getmtime(infile)
+    if all(os.path.exists(outfile) and os.path.getmtime(outfile) >= mtime
+           for outfile in outfiles):
+        return False
+    with Image.open(infile) as image:
+        # draft方法让JPEG解码器在解码时直接按1/2、1/4、1/8缩小
+        # 这样只需要解码一次而且解码的数据量也大大减少了
+        image.draft(None, (sizes[0], sizes[0]))
+        # 从最大的缩略图开始 每个较小的缩略图都在上一个的基础上生成
+        for size, outfile in zip(sizes, outfiles):
+            image.thumbnail((size, size))
+            image.save(outfile, format='PNG')
+    return True
 
 
 # def main():
@@ -63,32 +87,40 @@ def gen_thumbnail(infile):
 #     print(f'耗时: {end - start}秒')
 
 
+# def main():
+#     pool = ThreadPoolExecutor(max_workers=30)
+#     futures = []
+#     start = time.time()
+#     for infile in glob.glob('images/*'):
+#         # submit方法是非阻塞式的方法
+#         # 即便工作线程数已经用完，submit方法也会接受提交的任务
+#         future = pool.submit(gen_thumbnail, infile)
+#         futures.append(future)
+#     for future in futures:
+#         # result方法是一个阻塞式的方法 如果线程还没有结束
+#         # 暂时取不到线程的执行结果 代码就会在此处阻塞
+#         future.result()
+#     end = time.time()
+#     print(f'耗时: {end - start}秒')
+#     # shutdown也是非阻塞式的方法 但是如果已经提交的任务还没有执行完
+#     # 线程池是不会停止工作的 shutdown之后再提交任务就不会执行而且会产生异常
+#     pool.shutdown()
+
+
 def main():
-    pool = ThreadPoolExecutor(max_workers=30)
-    futures = []
+    os.makedirs('thumbnails', exist_ok=True)
+    infiles = glob.glob('images/*')
+    workers = os.cpu_count() or 1
     start = time.time()
-    for infile in glob.glob('images/*'):
-        # submit方法是非阻塞式的方法 
-        # 即便工作线程数已经用完，submit方法也会接受提交的任务 
-        future = pool.submit(gen_thumbnail, infile)
-        futures.append(future)
-    for future in futures:
-        # result方法是一个阻塞式的方法 如果线程还没有结束
-        # 暂时取不到线程的执行结果 代码就会在此处阻塞
-        future.result()
+    # 进程数和CPU核数一致 map的chunksize让每次进程间通信处理一批图片
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(infiles) // (workers * 4))
+        results = list(pool.map(gen_thumbnail, infiles, chunksize=chunksize))
     end = time.time()
-    print(f'耗时: {end - start}秒')
-    # shutdown也是非阻塞式的方法 但是如果已经提交的任务还没有执行完
-    # 线程池是不会停止工作的 shutdown之后再提交任务就不会执行而且会产生异常
-    pool.shutdown()
+    done = sum(results)
+    print(f'处理: {done}张 跳过: {len(results) - done}张')
+    print(f'耗时: {end - start:.3f}秒 速度: {len(infiles) / (end - start):.1f}张/秒')
 
 
 if __name__ == '__main__':
     main()
-
-
-
-
-
-
-
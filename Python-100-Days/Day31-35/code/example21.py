@@ -2,6 +2,7 @@
 多个线程竞争一个资源 - 保护临界资源 - 锁（Lock/RLock）
 多个线程竞争多个资源（线程数>资源数） - 信号量（Semaphore）
 多个线程的调度 - 暂停线程执行/唤醒等待中的线程 - Condition
+多个线程竞争大量的资源（账户） - 锁分段 - 参考example28
 """
 from concurrent.futures import ThreadPoolExecutor
 from random import randint
@@ -6,9 +6,9 @@ time python3 example22.py
 real    0m11.512s
 user    0m39.319s
 sys     0m0.169s
+素数判断改用example25中的Miller-Rabin测试 并按批次提交任务
 """
-import concurrent.futures
-import math
+from example25 import check_primes
 
 PRIMES = [
     1116281,
@@ -27,23 +27,11 @@ PRIMES = [
 ] * 5
 
 
-def is_prime(n):
-    """判断素数"""
-    if n % 2 == 0:
-        return False
-
-    sqrt_n = int(math.floor(math.sqrt(n)))
-    for i in range(3, sqrt_n + 1, 2):
-        if n % i == 0:
-            return False
-    return True
-
-
 def main():
     """主函数"""
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        for number, prime in zip(PRIMES, executor.map(is_prime, PRIMES)):
-            print('%d is prime: %s' % (number, prime))
+    # 判定素数改用Miller-Rabin测试 并且以批次为单位提交给进程池
+    for number, prime in zip(PRIMES, check_primes(PRIMES)):
+        print('%d is prime: %s' % (number, prime))
 
 
 if __name__ == '__main__':
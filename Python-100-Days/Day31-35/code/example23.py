@@ -1,9 +1,15 @@
 """
 协程（coroutine）- 可以在需要时进行切换的相互协作的子程序
+用协程实现生产者/消费者流水线：
+- 协程之间通过有界队列传递数据 不需要用asyncio.sleep来主动让出CPU
+- 计算密集型的任务放到进程池中执行 事件循环不会被阻塞
 """
 import asyncio
+import os
+import time
 
-from example15 import is_prime
+from example25 import is_prime
+from example27 import Pipeline
 
 
 def num_generator(m, n):
@@ -11,36 +17,26 @@ def num_generator(m, n):
     yield from range(m, n + 1)
 
 
-async def prime_filter(m, n):
+def prime_filter(nums):
     """素数过滤器"""
-    primes = []
-    for i in num_generator(m, n):
-        if is_prime(i):
-            print('Prime =>', i)
-            primes.append(i)
+    return [num for num in nums if is_prime(num)]
 
-        await asyncio.sleep(0.001)
-    return tuple(primes)
 
-
-async def square_mapper(m, n):
+def square_mapper(nums):
     """平方映射器"""
-    squares = []
-    for i in num_generator(m, n):
-        print('Square =>', i * i)
-        squares.append(i * i)
-
-        await asyncio.sleep(0.001)
-    return squares
+    return [num * num for num in nums]
 
 
 def main():
     """主函数"""
-    loop = asyncio.get_event_loop()
-    future = asyncio.gather(prime_filter(2, 100), square_mapper(1, 100))
-    future.add_done_callback(lambda x: print(x.result()))
-    loop.run_until_complete(future)
-    loop.close()
+    pipeline = Pipeline(batch_size=20000)
+    pipeline.add_stage('素数过滤', prime_filter,
+                       cpu_bound=True, workers=os.cpu_count() or 1)
+    pipeline.add_stage('平方映射', square_mapper)
+    start = time.perf_counter()
+    squares = asyncio.run(pipeline.run(num_generator(1, 5000000)))
+    print(f'{len(squares)}个结果 耗时{time.perf_counter() - start:.3f}秒')
+    pipeline.report()
 
 
 if __name__ == '__main__':
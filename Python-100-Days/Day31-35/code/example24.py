@@ -8,27 +8,19 @@ Celery - 将要执行的耗时间的任务异步化处理
 异步I/O事件循环 - uvloop
 """
 import asyncio
-import re
 
-import aiohttp
-
-
-async def fetch(session, url):
-    async with session.get(url, ssl=False) as resp:
-        return await resp.text()
+from example26 import fetch_titles
 
 
 async def main():
-    pattern = re.compile(r'\<title\>(?P<title>.*)\<\/title\>')
     urls = ('https://www.python.org/',
             'https://git-scm.com/',
             'https://www.jd.com/',
             'https://www.taobao.com/',
             'https://www.douban.com/')
-    async with aiohttp.ClientSession() as session:
-        for url in urls:
-            html = await fetch(session, url)
-            print(pattern.search(html).group('title'))
+    # 所有请求并发执行 读到</title>就停止读取响应体
+    for url, title in zip(urls, await fetch_titles(urls)):
+        print(url, title)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+"""
+素数判定引擎
+- 判定单个数字 - 确定性的Miller-Rabin测试
+  试除法要做√n次除法，Miller-Rabin只需要做几十次模幂运算
+  以前12个素数作为底数时，对小于3.3 * 10 ** 24的整数（包括所有64位整数）不会误判
+- 找出区间内的素数 - 分段筛法
+  先筛出√n以内的素数，再一段一段的用NumPy切片赋值划掉合数
+  每段的大小固定，所以内存开销跟区间的长度无关
+- 批量判定 - 进程池
+  map方法默认的chunksize是1，每个数字都要做一次进程间通信
+  把数字分成批次提交给进程池可以大大减少通信的开销
+"""
+import math
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# 前12个素数（同时也是Miller-Rabin测试的底数）
+SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+# 分段筛法每段的大小
+SEGMENT_SIZE = 1 << 18
+
+
+def is_prime(num):
+    """判断素数（确定性的Miller-Rabin测试）"""
+    if num < 2:
+        return False
+    for prime in SMALL_PRIMES:
+        if num % prime == 0:
+            return num == prime
+    # 将num - 1写成d * 2 ** s的形式（d是奇数）
+    d, s = num - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for base in SMALL_PRIMES:
+        x = pow(base, d, num)
+        if x == 1 or x == num - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % num
+            if x == num - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def base_primes(limit):
+    """用埃拉托斯特尼筛法找出不超过limit的素数"""
+    sieve = np.ones(limit + 1, dtype=bool)
+    sieve[:2] = False
+    for i in range(2, math.isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = False
+    return np.flatnonzero(sieve)
+
+
+def primes_in_range(m, n, segment_size=SEGMENT_SIZE):
+    """生成[m, n]区间内的素数（分段筛法）"""
+    m = max(m, 2)
+    if m > n:
+        return
+    primes = base_primes(math.isqrt(n)).tolist()
+    for low in range(m, n + 1, segment_size):
+        high = min(low + segment_size, n + 1)
+        segment = np.ones(high - low, dtype=bool)
+        for prime in primes:
+            if prime * prime >= high:
+                break
+            # 从该段中第一个prime的倍数开始划掉（不能划掉prime本身）
+            start = max(prime * prime, (low + prime - 1) // prime * prime)
+            segment[start - low::prime] = False
+        yield from (np.flatnonzero(segment) + low).tolist()
+
+
+def check_primes(nums, workers=None, chunksize=None):
+    """用进程池批量判定素数
+    @params:
+        nums - 要判定的数字
+        workers - 进程数（默认为CPU核数）
+        chunksize - 每次提交给进程的数字个数（默认让每个进程分到4批）
+    @return:
+        跟nums一一对应的判定结果构成的列表
+    """
+    nums = list(nums)
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(nums) / (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(is_prime, nums, chunksize=chunksize))
+
+
+def main():
+    """主函数"""
+    print(is_prime(1099726899285419))
+    print(is_prime(18446744073709551557))
+    print(sum(1 for _ in primes_in_range(2, 10000000)))
+    print(check_primes(range(1000000007, 1000000107)).count(True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+并发获取网页标题 - aiohttp
+- 并发 - 把所有的请求都创建成任务再通过gather一起等待 而不是在循环中逐个await
+- 连接限制 - TCPConnector的limit和limit_per_host控制总连接数和每个主机的连接数
+- 超时和重试 - ClientTimeout限制每次请求的时间 失败之后按指数退避的方式重试
+- 流式读取 - 一块一块的读取响应体 读到</title>就不再读剩下的内容
+python3 example26.py - 启动本地测试服务器并比较顺序获取和并发获取的速度
+"""
+import asyncio
+import re
+import time
+
+import aiohttp
+
+from aiohttp import web
+
+TITLE_PATTERN = re.compile(rb'<title[^>]*>(.*?)</title', re.IGNORECASE | re.DOTALL)
+
+
+async def fetch_title(session, url, *, retries=2, backoff=0.2,
+                      chunk_size=4096, max_bytes=1 << 20):
+    """获取网页标题
+    @params:
+        session - aiohttp的ClientSession对象
+        url - 网页的地址
+        retries - 失败后重试的次数
+        backoff - 第一次重试前等待的秒数（之后每次翻倍）
+        chunk_size - 每次读取的字节数
+        max_bytes - 最多读取的字节数（超过之后放弃寻找标题）
+    @return:
+        网页标题（没有标题返回None）
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                buffer, scanned = bytearray(), 0
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    buffer += chunk
+                    # 只在新读到的部分（加上可能被截断的标签长度）中查找结束标签
+                    if b'</title' in buffer[max(0, scanned - 7):].lower():
+                        break
+                    scanned = len(buffer)
+                    if scanned >= max_bytes:
+                        break
+                matcher = TITLE_PATTERN.search(buffer)
+                if matcher is None:
+                    return None
+                encoding = resp.charset or 'utf-8'
+                return matcher.group(1).decode(encoding, 'replace').strip()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+
+async def fetch_titles(urls, *, limit=100, limit_per_host=8, timeout=10,
+                       **kwargs):
+    """并发获取多个网页的标题
+    @params:
+        urls - 网页地址构成的序列
+        limit - 最大连接数
+        limit_per_host - 每个主机的最大连接数
+        timeout - 每次请求的超时时间（秒）
+        kwargs - 传给fetch_title的其他参数
+    @return:
+        跟urls一一对应的标题构成的列表（获取失败的位置是对应的异常对象）
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit, limit_per_host=limit_per_host, ssl=False)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(
+            connector=connector, timeout=client_timeout) as session:
+        # return_exceptions=True让一个网站出错时不会影响其他任务
+        return await asyncio.gather(
+            *(fetch_title(session, url, **kwargs) for url in urls),
+            return_exceptions=True)
+
+
+async def fetch_titles_one_by_one(urls):
+    """顺序获取网页标题（读取完整的响应体再用正则表达式查找）"""
+    pattern = re.compile(r'\<title\>(?P<title>.*)\<\/title\>')
+    titles = []
+    async with aiohttp.ClientSession() as session:
+        for url in urls:
+            async with session.get(url) as resp:
+                html = await resp.text()
+            titles.append(pattern.search(html).group('title'))
+    return titles
+
+
+def make_test_app(delay=0.05, body_size=256 * 1024):
+    """创建用于测试的Web应用（每个页面都有标题并且带有很大的响应体）"""
+    filler = b'<p>' + b'x' * body_size + b'</p>'
+
+    async def page(request):
+        await asyncio.sleep(delay)
+        resp = web.StreamResponse(headers={'Content-Type': 'text/html; charset=utf-8'})
+        await resp.prepare(request)
+        name = request.match_info['name'].encode()
+        await resp.write(b'<html><head><title>Page ' + name + b'</title></head><body>')
+        await resp.write(filler)
+        await resp.write(b'</body></html>')
+        return resp
+
+    app = web.Application()
+    app.router.add_get('/pages/{name}', page)
+    return app
+
+
+async def start_test_server(app, host='127.0.0.1'):
+    """在随机端口上启动测试服务器 返回runner对象和服务器的基础地址"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://{host}:{port}'
+
+
+async def benchmark(num_pages=200):
+    """用本地测试服务器比较顺序获取和并发获取"""
+    runner, base_url = await start_test_server(make_test_app())
+    try:
+        urls = [f'{base_url}/pages/{i}' for i in range(num_pages)]
+        for name, func in (('顺序获取', fetch_titles_one_by_one),
+                           ('并发获取', fetch_titles)):
+            start = time.perf_counter()
+            titles = await func(urls)
+            elapsed = time.perf_counter() - start
+            assert titles[-1] == f'Page {num_pages - 1}'
+            print(f'{name}: {elapsed:.3f}秒 {num_pages / elapsed:.1f}页/秒')
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(benchmark())
@@ -0,0 +1,180 @@
+"""
+异步流水线 - 生产者/消费者
+- 每个阶段（stage）从上游的队列中取数据 处理之后放到下游的队列中
+- 队列是有界的（maxsize），下游处理不过来时上游的put会被阻塞 - 背压（backpressure）
+- 数据按批次（batch）在阶段之间传递 避免每个元素都要切换一次协程
+- 计算密集型的阶段通过run_in_executor交给进程池执行 不会阻塞事件循环
+- 每个阶段都会记录处理的元素个数和耗时 用来找出流水线的瓶颈
+"""
+import asyncio
+import inspect
+import itertools
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+# 表示数据已经全部处理完的标记
+DONE = object()
+
+
+class StageMetrics():
+    """阶段的运行指标"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+
+    def record(self, items_in, items_out, duration):
+        """记录一个批次的处理结果"""
+        self.items_in += items_in
+        self.items_out += items_out
+        self.batches += 1
+        self.busy += duration
+
+    @property
+    def elapsed(self):
+        """阶段从开始到结束的时间"""
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def throughput(self):
+        """吞吐量（每秒处理的元素个数）"""
+        return self.items_in / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f'{self.name}: 输入{self.items_in}个 输出{self.items_out}个 '
+                f'批次{self.batches}个 处理{self.busy:.3f}秒 '
+                f'耗时{self.elapsed:.3f}秒 '
+                f'吞吐量{self.throughput:.0f}个/秒')
+
+
+class Stage():
+    """流水线的阶段"""
+
+    def __init__(self, name, func, cpu_bound=False, workers=1):
+        """初始化方法
+        @params:
+            name - 阶段的名字
+            func - 处理一个批次的函数（接收列表返回列表，可以是协程函数）
+            cpu_bound - 是否为计算密集型（是则交给进程池执行）
+            workers - 同时处理的批次数量
+        """
+        self.name = name
+        self.func = func
+        self.cpu_bound = cpu_bound
+        self.workers = workers
+        self.metrics = StageMetrics(name)
+
+    async def process(self, batch, executor):
+        """处理一个批次"""
+        if self.cpu_bound:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self.func, batch)
+        result = self.func(batch)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+class Pipeline():
+    """异步流水线"""
+
+    def __init__(self, maxsize=8, batch_size=10000, executor=None):
+        """初始化方法
+        @params:
+            maxsize - 阶段之间的队列最多能放多少个批次
+            batch_size - 每个批次的元素个数
+            executor - 计算密集型阶段使用的执行器（默认创建进程池）
+        """
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.executor = executor
+        self.stages = []
+
+    def add_stage(self, name, func, cpu_bound=False, workers=1):
+        """添加阶段（支持链式调用）"""
+        self.stages.append(Stage(name, func, cpu_bound, workers))
+        return self
+
+    async def _produce(self, items, outbox):
+        """生产者 - 将数据切分成批次放到第一个队列中"""
+        iterator = iter(items)
+        while batch := list(itertools.islice(iterator, self.batch_size)):
+            await outbox.put(batch)
+        await outbox.put(DONE)
+
+    async def _work(self, stage, inbox, outbox, executor):
+        """消费者 - 处理上游的批次并将结果放到下游"""
+        while True:
+            batch = await inbox.get()
+            if batch is DONE:
+                # 把结束标记放回去让同一阶段的其他工作者也能看到
+                await inbox.put(DONE)
+                return
+            start = time.perf_counter()
+            result = await stage.process(batch, executor)
+            stage.metrics.record(
+                len(batch), len(result), time.perf_counter() - start)
+            if result:
+                await outbox.put(result)
+
+    async def _run_stage(self, stage, inbox, outbox, executor):
+        """启动阶段的所有工作者 全部结束后通知下游"""
+        stage.metrics.started = time.perf_counter()
+        await asyncio.gather(*(
+            self._work(stage, inbox, outbox, executor)
+            for _ in range(stage.workers)))
+        stage.metrics.finished = time.perf_counter()
+        await outbox.put(DONE)
+
+    async def _consume(self, inbox, sink):
+        """最终的消费者 - 收集结果"""
+        while (batch := await inbox.get()) is not DONE:
+            sink(batch)
+
+    async def run(self, items, sink=None):
+        """运行流水线
+        @params:
+            items - 输入的数据（可迭代对象）
+            sink - 接收每个输出批次的函数（默认收集到列表中返回）
+        @return:
+            没有指定sink时返回所有输出构成的列表
+            如果阶段的workers大于1，输出的顺序跟输入的顺序可能不同
+        """
+        results = []
+        sink = sink or results.extend
+        executor, own_executor = self.executor, False
+        if executor is None and any(stage.cpu_bound for stage in self.stages):
+            executor, own_executor = ProcessPoolExecutor(), True
+        queues = [asyncio.Queue(self.maxsize)
+                  for _ in range(len(self.stages) + 1)]
+        tasks = [
+            asyncio.create_task(self._produce(items, queues[0])),
+            *(asyncio.create_task(
+                self._run_stage(stage, queues[i], queues[i + 1], executor))
+              for i, stage in enumerate(self.stages)),
+            asyncio.create_task(self._consume(queues[-1], sink)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 任何一个阶段出错都要取消其他阶段 否则它们会一直阻塞在队列上
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if own_executor:
+                executor.shutdown()
+        return results
+
+    def report(self):
+        """输出每个阶段的运行指标"""
+        for stage in self.stages:
+            print(stage.metrics)
@@ -0,0 +1,144 @@
+"""
+并发账本 - 锁分段（lock striping）
+example21中所有的存取款都在同一把锁上排队，而且在持有锁的时候还要休眠
+线程越多排队的线程就越多，吞吐量反而会下降
+- 锁分段 - 准备若干把锁，账户按编号对锁的数量取模决定用哪一把
+  操作不同账户的线程大多数时候拿的是不同的锁，不需要互相等待
+- 避免死锁 - 一次转账要锁住多个账户时，总是按照锁的编号从小到大加锁
+  所有线程加锁的顺序都一致，就不会出现互相等待对方释放锁的情况
+- 无锁读 - 余额保存在列表中，修改列表元素是一个原子操作
+  读取余额的线程看到的要么是修改前的值要么是修改后的值，所以读取不需要加锁
+python3 example28.py - 比较1到64个线程时单锁和分段锁的吞吐量
+"""
+import threading
+import time
+
+from random import Random
+
+
+class Ledger():
+    """账本"""
+
+    def __init__(self, num_accounts, balance=0, stripes=64):
+        """初始化方法
+        @params:
+            num_accounts - 账户的数量
+            balance - 每个账户的初始余额
+            stripes - 锁的数量（为1时就是所有账户共用一把锁）
+        """
+        self.balances = [balance] * num_accounts
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripes(self, *accounts):
+        """账户对应的锁的编号（去重并从小到大排序）"""
+        return sorted({account % len(self.locks) for account in accounts})
+
+    def balance(self, account):
+        """查询余额（不加锁）"""
+        return self.balances[account]
+
+    def total(self):
+        """所有账户余额的总和（锁住所有账户得到一致的快照）"""
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            return sum(self.balances)
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
+    @staticmethod
+    def _check_money(money):
+        """金额必须是正数（负数的存款/转账相当于反方向的操作，会绕过余额检查）"""
+        if money <= 0:
+            raise ValueError('金额必须大于0')
+
+    def deposit(self, account, money):
+        """存钱"""
+        self._check_money(money)
+        with self.locks[account % len(self.locks)]:
+            self.balances[account] += money
+
+    def withdraw(self, account, money):
+        """取钱（余额不足返回False）"""
+        self._check_money(money)
+        with self.locks[account % len(self.locks)]:
+            if money > self.balances[account]:
+                return False
+            self.balances[account] -= money
+            return True
+
+    def transfer(self, src, dst, money):
+        """转账（余额不足返回False）"""
+        return self.transfer_many([(src, dst, money)])
+
+    def transfer_many(self, transfers):
+        """批量转账（要么全部成功要么全部失败）
+        @params:
+            transfers - 由(转出账户, 转入账户, 金额)构成的可迭代对象
+        @return:
+            全部成功返回True，有任何一笔余额不足返回False
+        """
+        # 下面要遍历三次 传入生成器时先转成列表
+        transfers = list(transfers)
+        for _, _, money in transfers:
+            self._check_money(money)
+        accounts = [account for src, dst, _ in transfers for account in (src, dst)]
+        locks = [self.locks[index] for index in self._stripes(*accounts)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            # 先在副本上按顺序计算出每个账户的变化 确认整批转账都能完成
+            changes = {}
+            for src, dst, money in transfers:
+                if self.balances[src] + changes.get(src, 0) < money:
+                    return False
+                changes[src] = changes.get(src, 0) - money
+                changes[dst] = changes.get(dst, 0) + money
+            for account, change in changes.items():
+                self.balances[account] += change
+            return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+def run_transfers(ledger, num_ops, seed):
+    """随机的在账户之间转账并穿插查询余额"""
+    rand = Random(seed)
+    num_accounts = len(ledger.balances)
+    for _ in range(num_ops):
+        src, dst = rand.randrange(num_accounts), rand.randrange(num_accounts)
+        ledger.transfer(src, dst, rand.randint(1, 10))
+        ledger.balance(dst)
+
+
+def benchmark(stripes, num_threads, num_ops=200000, num_accounts=1000):
+    """多个线程竞争账本 返回每秒完成的操作次数"""
+    ledger = Ledger(num_accounts, 1000, stripes)
+    ops_per_thread = num_ops // num_threads
+    threads = [
+        threading.Thread(target=run_transfers, args=(ledger, ops_per_thread, i))
+        for i in range(num_threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    assert ledger.total() == num_accounts * 1000
+    return ops_per_thread * num_threads / elapsed
+
+
+def main():
+    """主函数"""
+    print(f'{"线程数":>6}{"单锁(次/秒)":>16}{"分段锁(次/秒)":>16}')
+    for num_threads in (1, 2, 4, 8, 16, 32, 64):
+        single = benchmark(1, num_threads)
+        striped = benchmark(64, num_threads)
+        print(f'{num_threads:>9}{single:>20.0f}{striped:>19.0f}')
+
+
+if __name__ == '__main__':
+    main()
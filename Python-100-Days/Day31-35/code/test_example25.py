@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from example25 import is_prime, primes_in_range, check_primes
+
+
+def trial_division(num):
+    """用试除法判断素数（作为参照）"""
+    if num < 2:
+        return False
+    factor = 2
+    while factor * factor <= num:
+        if num % factor == 0:
+            return False
+        factor += 1
+    return True
+
+
+class TestExample25(TestCase):
+    """测试素数判定引擎的测试用例"""
+
+    def test_is_prime(self):
+        """测试Miller-Rabin测试"""
+        for num in range(-5, 5000):
+            self.assertEqual(trial_division(num), is_prime(num))
+        self.assertTrue(is_prime(982451653))
+        self.assertTrue(is_prime(115797848077099))
+        self.assertTrue(is_prime(18446744073709551557))
+        self.assertFalse(is_prime(1099726899285419))
+        # 卡迈克尔数和强伪素数
+        self.assertFalse(is_prime(561))
+        self.assertFalse(is_prime(3215031751))
+        self.assertFalse(is_prime(3825123056546413051))
+
+    def test_primes_in_range(self):
+        """测试分段筛法"""
+        expected = [num for num in range(9000, 12000) if trial_division(num)]
+        self.assertEqual(expected, list(primes_in_range(9000, 11999, 256)))
+        self.assertEqual([2, 3, 5, 7], list(primes_in_range(0, 10)))
+        self.assertEqual([], list(primes_in_range(24, 28)))
+        self.assertEqual([], list(primes_in_range(10, 5)))
+
+    def test_check_primes(self):
+        """测试批量判定"""
+        nums = [1116281, 1297337, 112272535095293, 1099726899285419]
+        self.assertEqual([True, True, True, False], check_primes(nums, 2))
@@ -0,0 +1,40 @@
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+
+from example26 import fetch_titles, make_test_app, start_test_server
+
+
+class TestExample26(IsolatedAsyncioTestCase):
+    """测试并发获取网页标题的测试用例"""
+
+    async def asyncSetUp(self):
+        self.failures = 0
+        app = make_test_app(delay=0, body_size=64 * 1024)
+
+        async def flaky(request):
+            # 前两次请求返回503 之后正常返回
+            self.failures += 1
+            if self.failures <= 2:
+                raise web.HTTPServiceUnavailable()
+            return web.Response(text='<TITLE>\n Flaky </TITLE>',
+                                content_type='text/html')
+
+        app.router.add_get('/flaky', flaky)
+        self.runner, self.base_url = await start_test_server(app)
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def test_fetch_titles(self):
+        urls = [f'{self.base_url}/pages/{i}' for i in range(20)]
+        titles = await fetch_titles(urls, limit_per_host=4)
+        self.assertEqual([f'Page {i}' for i in range(20)], titles)
+
+    async def test_retry(self):
+        url = f'{self.base_url}/flaky'
+        titles = await fetch_titles([url], retries=2, backoff=0)
+        self.assertEqual(['Flaky'], titles)
+        self.failures = 0
+        titles = await fetch_titles([url], retries=1, backoff=0)
+        self.assertIsInstance(titles[0], Exception)
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+
+from example23 import prime_filter, square_mapper
+from example27 import Pipeline
+
+
+async def negate(nums):
+    return [-num for num in nums]
+
+
+def explode(nums):
+    raise ValueError('boom')
+
+
+class TestExample27(IsolatedAsyncioTestCase):
+    """测试异步流水线的测试用例"""
+
+    async def test_run(self):
+        pipeline = Pipeline(maxsize=2, batch_size=100)
+        pipeline.add_stage('素数过滤', prime_filter, cpu_bound=True, workers=3)
+        pipeline.add_stage('平方映射', square_mapper)
+        pipeline.add_stage('取相反数', negate)
+        results = await pipeline.run(range(1, 10001))
+        expected = [-num * num for num in prime_filter(range(1, 10001))]
+        self.assertEqual(sorted(expected), sorted(results))
+        metrics = pipeline.stages[0].metrics
+        self.assertEqual(10000, metrics.items_in)
+        self.assertEqual(len(expected), metrics.items_out)
+        self.assertEqual(100, metrics.batches)
+
+    async def test_error(self):
+        with ThreadPoolExecutor() as executor:
+            pipeline = Pipeline(maxsize=1, batch_size=10, executor=executor)
+            pipeline.add_stage('出错', explode, cpu_bound=True)
+            with self.assertRaises(ValueError):
+                await pipeline.run(range(1000))
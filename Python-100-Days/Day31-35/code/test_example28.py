@@ -0,0 +1,56 @@
+import threading
+
+from unittest import TestCase
+
+from example28 import Ledger, run_transfers
+
+
+class TestExample28(TestCase):
+    """测试并发账本的测试用例"""
+
+    def setUp(self):
+        self.ledger = Ledger(100, 50, stripes=8)
+
+    def test_deposit_and_withdraw(self):
+        self.ledger.deposit(3, 20)
+        self.assertEqual(70, self.ledger.balance(3))
+        self.assertTrue(self.ledger.withdraw(3, 70))
+        self.assertFalse(self.ledger.withdraw(3, 1))
+        self.assertEqual(0, self.ledger.balance(3))
+
+    def test_transfer_many(self):
+        # 同一批中后面的转账可以用前面转入的钱
+        self.assertTrue(self.ledger.transfer_many([(1, 2, 50), (2, 9, 100)]))
+        self.assertEqual([0, 0, 150], [self.ledger.balance(i) for i in (1, 2, 9)])
+        # 有一笔余额不足时整批都不执行
+        self.assertFalse(self.ledger.transfer_many([(9, 4, 10), (5, 6, 51)]))
+        self.assertEqual([150, 50, 50], [self.ledger.balance(i) for i in (9, 4, 5)])
+        # 传入生成器也能正常执行
+        self.assertTrue(self.ledger.transfer_many((9, i, 10) for i in (4, 5)))
+        self.assertEqual([130, 60, 60], [self.ledger.balance(i) for i in (9, 4, 5)])
+
+    def test_invalid_money(self):
+        # 金额为0或负数时直接拒绝，不能借此把别的账户的钱转过来
+        for money in (0, -10):
+            with self.assertRaises(ValueError):
+                self.ledger.deposit(1, money)
+            with self.assertRaises(ValueError):
+                self.ledger.withdraw(1, money)
+            with self.assertRaises(ValueError):
+                self.ledger.transfer(1, 2, money)
+        with self.assertRaises(ValueError):
+            self.ledger.transfer_many([(1, 2, 10), (3, 1, -100)])
+        self.assertEqual(5000, self.ledger.total())
+        self.assertEqual([50, 50, 50], [self.ledger.balance(i) for i in (1, 2, 3)])
+
+    def test_concurrent_transfers(self):
+        threads = [
+            threading.Thread(target=run_transfers, args=(self.ledger, 2000, i))
+            for i in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(5000, self.ledger.total())
+        self.assertTrue(all(balance >= 0 for balance in self.ledger.balances))
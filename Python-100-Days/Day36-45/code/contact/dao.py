@@ -0,0 +1,413 @@
+"""
+通讯录的数据访问层
+
+- ConnectionPool：预先创建若干个数据库连接，用完放回池中，不再整个程序共用一个连接
+- 分页使用 where conid > 上一页最后一条记录的编号 order by conid limit n（keyset分页），
+  借助主键索引直接定位，不像 limit n offset m 那样需要先扫描并丢弃前面的m条记录
+- 按姓名搜索使用 tb_contacter_gram 表（姓名中的每个字和每两个相邻的字），
+  先用索引找到包含关键字中一个字/词的联系人，再用 like 核对完整的关键字，不再对整张表执行 like '%...%'
+- SQL语句都是固定的字符串，参数通过占位符传入（SQLite会缓存编译好的语句）
+- 同时支持MySQL（pymysql）和SQLite，在没有MySQL的环境中也可以测试
+
+在MySQL中需要额外创建的表：
+
+-- 姓名索引表（gram是姓名中的一个字或相邻的两个字，统一转成小写，不包含空白字符）
+-- gram使用二进制排序规则，否则在忽略大小写/重音的排序规则下'é'和'e'被认为相同，违反主键约束
+create table tb_contacter_gram
+(
+gram varchar(2) collate utf8mb4_bin not null comment '字/词',
+conid int not null comment '联系人编号',
+primary key (gram, conid),
+key (conid)
+);
+"""
+import queue
+import sqlite3
+import time
+
+from contextlib import contextmanager
+
+INSERT_CONTACTER = """
+insert into tb_contacter (conname, contel, conemail) values (%s, %s, %s)
+"""
+DELETE_CONTACTER = """
+delete from tb_contacter where conid=%s
+"""
+UPDATE_CONTACTER = """
+update tb_contacter set conname=%s, contel=%s, conemail=%s where conid=%s
+"""
+SELECT_CONTACTER = """
+select conid, conname, contel, conemail from tb_contacter where conid=%s
+"""
+SELECT_CONTACTERS_AFTER = """
+select conid, conname, contel, conemail from tb_contacter
+where conid>%s order by conid limit %s
+"""
+SELECT_CONTACTERS_BEFORE = """
+select conid, conname, contel, conemail from tb_contacter
+where conid<%s order by conid desc limit %s
+"""
+SELECT_CONTACTERS_BY_GRAM = """
+select c.conid, c.conname, c.contel, c.conemail
+from tb_contacter_gram g inner join tb_contacter c on c.conid=g.conid
+where g.gram=%s and g.conid>%s and c.conname like %s escape '!'
+order by g.conid limit %s
+"""
+COUNT_CONTACTERS = """
+select count(conid) from tb_contacter
+"""
+MAX_CONTACTER_ID = """
+select coalesce(max(conid), 0) from tb_contacter
+"""
+SELECT_NAMES_AFTER = """
+select conid, conname from tb_contacter where conid>%s order by conid limit %s
+"""
+INSERT_GRAM = """
+insert into tb_contacter_gram (gram, conid) values (%s, %s)
+"""
+DELETE_GRAMS = """
+delete from tb_contacter_gram where conid=%s
+"""
+
+SQLITE_SCHEMA = """
+create table if not exists tb_contacter
+(
+conid integer primary key autoincrement,
+conname varchar(31) not null,
+contel varchar(15) default '',
+conemail varchar(255) default ''
+);
+create table if not exists tb_contacter_gram
+(
+gram varchar(2) not null,
+conid integer not null,
+primary key (gram, conid)
+) without rowid;
+create index if not exists idx_gram_conid on tb_contacter_gram (conid);
+"""
+
+
+class Contacter(object):
+
+    def __init__(self, id, name, tel, email):
+        self.id = id
+        self.name = name
+        self.tel = tel
+        self.email = email
+
+    def __repr__(self):
+        return f'Contacter({self.id!r}, {self.name!r}, {self.tel!r}, {self.email!r})'
+
+
+class ConnectionPool(object):
+    """数据库连接池"""
+
+    def __init__(self, connect, size=5, placeholder='%s'):
+        """
+        :param connect: 创建一个新连接的函数（不需要参数）
+        :param size: 连接的数量
+        :param placeholder: 数据库驱动使用的参数占位符（pymysql是%s，sqlite3是?）
+        """
+        self.size = size
+        self.placeholder = placeholder
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(connect())
+
+    @contextmanager
+    def connection(self):
+        """从池中取出一个连接，用完后放回"""
+        con = self.idle.get()
+        try:
+            yield con
+        finally:
+            self.idle.put(con)
+
+    @contextmanager
+    def transaction(self):
+        """取出一个连接并创建游标，正常结束时提交事务，发生异常时回滚"""
+        with self.connection() as con:
+            cursor = con.cursor()
+            try:
+                yield cursor
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        for _ in range(self.size):
+            self.idle.get().close()
+
+
+def mysql_pool(size=5, **kwargs):
+    """
+    创建MySQL的连接池
+    :param size: 连接的数量
+    :param kwargs: 传给pymysql.connect的参数（host、port、user、passwd、db等）
+    """
+    import pymysql
+
+    kwargs.setdefault('charset', 'utf8mb4')
+    # 事务由ContactDAO自己提交
+    kwargs['autocommit'] = False
+
+    def connect():
+        return pymysql.connect(**kwargs)
+
+    return ConnectionPool(connect, size, '%s')
+
+
+def sqlite_pool(path, size=5):
+    """
+    创建SQLite的连接池（同时创建通讯录需要的表）
+    :param path: 数据库文件的路径
+    :param size: 连接的数量
+    """
+    def connect():
+        con = sqlite3.connect(path, check_same_thread=False)
+        con.execute('pragma journal_mode=wal')
+        return con
+
+    pool = ConnectionPool(connect, size, '?')
+    with pool.connection() as con:
+        con.executescript(SQLITE_SCHEMA)
+    return pool
+
+
+def name_grams(name):
+    """姓名中的每个字和每两个相邻的字（转成小写，去掉包含空白字符的）"""
+    name = name.lower()
+    grams = set(name) | {name[i:i + 2] for i in range(len(name) - 1)}
+    # PAD SPACE的排序规则（包括utf8mb4_bin）认为'n '和'n'相同，空白字符也没有必要索引
+    return {gram for gram in grams if not any(ch.isspace() for ch in gram)}
+
+
+def search_gram(keyword):
+    """在索引表中查找时使用的字/词：关键字中第一个不含空白字符的两个字，没有时用第一个非空白字符"""
+    keyword = keyword.lower()
+    for i in range(len(keyword) - 1):
+        gram = keyword[i:i + 2]
+        if not any(ch.isspace() for ch in gram):
+            return gram
+    return next(ch for ch in keyword if not ch.isspace())
+
+
+def escape_like(text):
+    """转义like模式中的特殊字符（转义字符是!）"""
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+class ContactDAO(object):
+    """通讯录的数据访问对象"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._statements = {}
+
+    def _sql(self, sql):
+        """把语句中的%s换成驱动使用的占位符"""
+        if self.pool.placeholder == '%s':
+            return sql
+        if sql not in self._statements:
+            self._statements[sql] = sql.replace('%s', self.pool.placeholder)
+        return self._statements[sql]
+
+    def _index_name(self, cursor, conid, name):
+        cursor.executemany(self._sql(INSERT_GRAM), [(gram, conid) for gram in name_grams(name)])
+
+    def add(self, name, tel='', email=''):
+        """
+        新建联系人
+        :return: 新联系人的编号
+        """
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(INSERT_CONTACTER), (name, tel, email))
+            conid = cursor.lastrowid
+            self._index_name(cursor, conid, name)
+        return conid
+
+    def add_many(self, rows):
+        """
+        批量新建联系人
+        :param rows: (姓名, 电话, 邮箱)的列表
+        :return: 新建的数量
+        """
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(MAX_CONTACTER_ID))
+            max_id = cursor.fetchone()[0]
+            cursor.executemany(self._sql(INSERT_CONTACTER), rows)
+            self._rebuild_index(cursor, max_id)
+        return len(rows)
+
+    def update(self, contacter):
+        """
+        更新联系人的信息（姓名有变化时同时更新姓名索引）
+        :return: 是否更新成功
+        """
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(SELECT_CONTACTER), (contacter.id, ))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            cursor.execute(self._sql(UPDATE_CONTACTER),
+                           (contacter.name, contacter.tel, contacter.email, contacter.id))
+            if row[1] != contacter.name:
+                cursor.execute(self._sql(DELETE_GRAMS), (contacter.id, ))
+                self._index_name(cursor, contacter.id, contacter.name)
+        return True
+
+    def delete(self, conid):
+        """
+        删除联系人
+        :return: 是否删除成功
+        """
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(DELETE_GRAMS), (conid, ))
+            cursor.execute(self._sql(DELETE_CONTACTER), (conid, ))
+            return cursor.rowcount == 1
+
+    def get(self, conid):
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(SELECT_CONTACTER), (conid, ))
+            row = cursor.fetchone()
+        return Contacter(*row) if row else None
+
+    def count(self):
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(COUNT_CONTACTERS))
+            return cursor.fetchone()[0]
+
+    def page_after(self, last_id=0, size=5):
+        """
+        按编号顺序取得下一页联系人
+        :param last_id: 上一页最后一个联系人的编号（第一页为0）
+        :param size: 每页的数量
+        :return: Contacter对象的列表
+        """
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(SELECT_CONTACTERS_AFTER), (last_id, size))
+            return [Contacter(*row) for row in cursor.fetchall()]
+
+    def page_before(self, first_id, size=5):
+        """
+        取得上一页联系人
+        :param first_id: 当前页第一个联系人的编号
+        :param size: 每页的数量
+        :return: Contacter对象的列表（按编号从小到大排列）
+        """
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(SELECT_CONTACTERS_BEFORE), (first_id, size))
+            return [Contacter(*row) for row in reversed(cursor.fetchall())]
+
+    def search_by_name(self, keyword, last_id=0, size=5):
+        """
+        搜索姓名中包含关键字的联系人（分页方式跟page_after相同）
+        :param keyword: 关键字
+        :param last_id: 上一页最后一个联系人的编号（第一页为0）
+        :param size: 每页的数量
+        :return: Contacter对象的列表
+        """
+        keyword = keyword.strip()
+        if not keyword:
+            return self.page_after(last_id, size)
+        # 用关键字中的两个字（只有一个字时用这个字）在索引表中查找，再用like核对完整的关键字
+        gram = search_gram(keyword)
+        with self.pool.transaction() as cursor:
+            cursor.execute(self._sql(SELECT_CONTACTERS_BY_GRAM),
+                           (gram, last_id, f'%{escape_like(keyword)}%', size))
+            return [Contacter(*row) for row in cursor.fetchall()]
+
+    def _rebuild_index(self, cursor, after_id=0, batch_size=10000):
+        """为编号大于after_id的联系人建立姓名索引"""
+        while True:
+            cursor.execute(self._sql(SELECT_NAMES_AFTER), (after_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(self._sql(INSERT_GRAM),
+                               [(gram, conid) for conid, name in rows for gram in name_grams(name)])
+            after_id = rows[-1][0]
+
+    def rebuild_index(self):
+        """重新建立所有联系人的姓名索引（给已经有数据的tb_contacter表使用）"""
+        with self.pool.transaction() as cursor:
+            cursor.execute('delete from tb_contacter_gram')
+            self._rebuild_index(cursor)
+
+
+def make_contacters(n, seed=None):
+    """生成n个随机的联系人"""
+    import random
+
+    rng = random.Random(seed)
+    surnames = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈'
+    given = '伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华建国志红文斌宇浩然子轩梓涵一诺欣怡雨萱思远'
+    return [
+        (rng.choice(surnames) + ''.join(rng.choices(given, k=rng.randint(1, 2))),
+         f'1{rng.randint(3000000000, 9999999999)}', f'user{i}@example.com')
+        for i in range(n)
+    ]
+
+
+def main():
+    import os
+    import sys
+    import tempfile
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pool = sqlite_pool(os.path.join(tmpdir, 'address.db'))
+        dao = ContactDAO(pool)
+        start = time.perf_counter()
+        dao.add_many(make_contacters(n, seed=1))
+        print(f'插入{n}个联系人并建立姓名索引: {time.perf_counter() - start:.3f}秒')
+
+        size, page = 5, n // 5 // 2
+        with pool.connection() as con:
+            start = time.perf_counter()
+            offset_rows = con.execute('select conid, conname, contel, conemail from tb_contacter '
+                                      'limit ? offset ?', (size, (page - 1) * size)).fetchall()
+            print(f'limit/offset取第{page}页: {(time.perf_counter() - start) * 1000:.3f}毫秒')
+        last_id = offset_rows[0][0] - 1
+        start = time.perf_counter()
+        keyset_rows = dao.page_after(last_id, size)
+        print(f'keyset分页取第{page}页: {(time.perf_counter() - start) * 1000:.3f}毫秒, '
+              f'结果相同: {[c.id for c in keyset_rows] == [row[0] for row in offset_rows]}')
+
+        for keyword in ('王', '子轩', '张梓涵'):
+            with pool.connection() as con:
+                start = time.perf_counter()
+                like_ids = [row[0] for row in con.execute(
+                    'select conid from tb_contacter where conname like ? order by conid limit 20',
+                    (f'%{keyword}%', ))]
+                like_time = time.perf_counter() - start
+            start = time.perf_counter()
+            ids, last_id = [], 0
+            # 一页一页地取，直到取满20个
+            while len(ids) < 20:
+                page_result = dao.search_by_name(keyword, last_id, size)
+                if not page_result:
+                    break
+                ids.extend(c.id for c in page_result)
+                last_id = ids[-1]
+            index_time = time.perf_counter() - start
+            print(f'搜索"{keyword}"的前20个联系人: like {like_time * 1000:.3f}毫秒, '
+                  f'姓名索引 {index_time * 1000:.3f}毫秒, 结果相同: {ids == like_ids}')
+
+        # 很少出现的名字，like需要扫描整张表
+        conid = dao.add('欧阳娜娜', '13800000000', 'nana@example.com')
+        with pool.connection() as con:
+            start = time.perf_counter()
+            con.execute("select conid from tb_contacter where conname like '%阳娜%'").fetchall()
+            print(f'搜索很少出现的名字: like {(time.perf_counter() - start) * 1000:.3f}毫秒', end=', ')
+        start = time.perf_counter()
+        found = dao.search_by_name('阳娜')
+        print(f'姓名索引 {(time.perf_counter() - start) * 1000:.3f}毫秒, 找到: {[c.id for c in found] == [conid]}')
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,40 +14,12 @@ contel varchar(15) default '' comment '电话',
 conemail varchar(255) default'' comment '邮箱',
 primary key (conid)
 );
-"""
-import pymysql
 
-INSERT_CONTACTER = """
-insert into tb_contacter (conname, contel, conemail) 
-values (%s, %s, %s)
-"""
-DELETE_CONTACTER = """
-delete from tb_contacter where conid=%s
-"""
-UPDATE_CONTACTER = """
-update tb_contacter set conname=%s, contel=%s, conemail=%s 
-where conid=%s
+-- 按姓名搜索使用的索引表tb_contacter_gram见dao.py
 """
-SELECT_CONTACTERS = """
-select conid as id, conname as name, contel as tel, conemail as email 
-from tb_contacter limit %s offset %s
-"""
-SELECT_CONTACTERS_BY_NAME = """
-select conid as id, conname as name, contel as tel, conemail as email 
-from tb_contacter where conname like %s
-"""
-COUNT_CONTACTERS = """
-select count(conid) as total from tb_contacter
-"""
-
-
-class Contacter(object):
+import pymysql
 
-    def __init__(self, id, name, tel, email):
-        self.id = id
-        self.name = name
-        self.tel = tel
-        self.email = email
+from dao import ContactDAO, mysql_pool
 
 
 def input_contacter_info():
@@ -57,125 +29,116 @@ def input_contacter_info():
     return name, tel, email
 
 
-def add_new_contacter(con):
+def add_new_contacter(dao):
     name, tel, email = input_contacter_info()
     try:
-        with con.cursor() as cursor:
-            if cursor.execute(INSERT_CONTACTER,
-                              (name, tel, email)) == 1:
-                print('添加联系人成功!')
+        dao.add(name, tel, email)
+        print('添加联系人成功!')
     except pymysql.MySQLError as err:
         print(err)
         print('添加联系人失败!')
 
 
-def delete_contacter(con, contacter):
+def delete_contacter(dao, contacter):
     try:
-        with con.cursor() as cursor:
-            if cursor.execute(DELETE_CONTACTER, (contacter.id, )) == 1:
-                print('联系人已经删除!')
+        if dao.delete(contacter.id):
+            print('联系人已经删除!')
     except pymysql.MySQLError as err:
         print(err)
         print('删除联系人失败!')
 
 
-def edit_contacter_info(con, contacter):
+def edit_contacter_info(dao, contacter):
     name, tel, email = input_contacter_info()
     contacter.name = name or contacter.name
     contacter.tel = tel or contacter.tel
     contacter.email = email or contacter.email
     try:
-        with con.cursor() as cursor:
-            if cursor.execute(UPDATE_CONTACTER,
-                              (contacter.name, contacter.tel,
-                               contacter.email, contacter.id)) == 1:
-                print('联系人信息已经更新!')
+        if dao.update(contacter):
+            print('联系人信息已经更新!')
     except pymysql.MySQLError as err:
         print(err)
         print('更新联系人信息失败!')
 
 
-def show_contacter_detail(con, contacter):
+def show_contacter_detail(dao, contacter):
     print('姓名:', contacter.name)
     print('手机号:', contacter.tel)
     print('邮箱:', contacter.email)
     choice = input('是否编辑联系人信息?(yes|no)')
     if choice == 'yes':
-        edit_contacter_info(con, contacter)
+        edit_contacter_info(dao, contacter)
     else:
         choice = input('是否删除联系人信息?(yes|no)')
         if choice == 'yes':
-            delete_contacter(con, contacter)
+            delete_contacter(dao, contacter)
 
 
-def show_search_result(con, cursor):
-    contacters_list = []
-    for index, row in enumerate(cursor.fetchall()):
-        contacter = Contacter(**row)
-        contacters_list.append(contacter)
+def show_search_result(dao, contacters_list):
+    for index, contacter in enumerate(contacters_list):
         print('[%d]: %s' % (index, contacter.name))
     if len(contacters_list) > 0:
         choice = input('是否查看联系人详情?(yes|no)')
         if choice.lower() == 'yes':
             index = int(input('请输入编号: '))
-            if 0 <= index < cursor.rowcount:
-                show_contacter_detail(con, contacters_list[index])
+            if 0 <= index < len(contacters_list):
+                show_contacter_detail(dao, contacters_list[index])
 
 
-def find_all_contacters(con):
-    page, size = 1, 5
+def show_pages(dao, fetch_page, size=5):
+    """
+    逐页显示联系人
+    :param fetch_page: 根据上一页最后一个联系人的编号取得下一页的函数
+    """
+    last_id = 0
     try:
-        with con.cursor() as cursor:
-            cursor.execute(COUNT_CONTACTERS)
-            total = cursor.fetchone()['total']
-            while True:
-                cursor.execute(SELECT_CONTACTERS,
-                               (size, (page - 1) * size))
-                show_search_result(con, cursor)
-                if page * size < total:
-                    choice = input('继续查看下一页?(yes|no)')
-                    if choice.lower() == 'yes':
-                        page += 1
-                    else:
-                        break
+        while True:
+            # 多取一条记录用来判断还有没有下一页
+            contacters_list = fetch_page(last_id, size + 1)
+            has_next = len(contacters_list) > size
+            contacters_list = contacters_list[:size]
+            show_search_result(dao, contacters_list)
+            if has_next:
+                choice = input('继续查看下一页?(yes|no)')
+                if choice.lower() == 'yes':
+                    last_id = contacters_list[-1].id
                 else:
-                    print('没有下一页记录!')
                     break
+            else:
+                print('没有下一页记录!')
+                break
     except pymysql.MySQLError as err:
         print(err)
 
 
-def find_contacters_by_name(con):
+def find_all_contacters(dao):
+    show_pages(dao, dao.page_after)
+
+
+def find_contacters_by_name(dao):
     name = input('联系人姓名: ')
-    try:
-        with con.cursor() as cursor:
-            cursor.execute(SELECT_CONTACTERS_BY_NAME,
-                           ('%' + name + '%', ))
-            show_search_result(con, cursor)
-    except pymysql.MySQLError as err:
-        print(err)
+    show_pages(dao, lambda last_id, size: dao.search_by_name(name, last_id, size))
 
 
-def find_contacters(con):
+def find_contacters(dao):
     while True:
         print('1. 查看所有联系人')
         print('2. 搜索联系人')
         print('3. 退出查找')
         choice = int(input('请输入: '))
         if choice == 1:
-            find_all_contacters(con)
+            find_all_contacters(dao)
         elif choice == 2:
-            find_contacters_by_name(con)
+            find_contacters_by_name(dao)
         elif choice == 3:
             break
 
 
 def main():
-    con = pymysql.connect(host='1.2.3.4', port=3306,
-                          user='yourname', passwd='yourpass',
-                          db='address', charset='utf8',
-                          autocommit=True,
-                          cursorclass=pymysql.cursors.DictCursor)
+    pool = mysql_pool(size=2, host='1.2.3.4', port=3306,
+                      user='yourname', passwd='yourpass',
+                      db='address')
+    dao = ContactDAO(pool)
     while True:
         print('=====通讯录=====')
         print('1. 新建联系人')
@@ -184,11 +147,11 @@ def main():
         print('===============')
         choice = int(input('请选择: '))
         if choice == 1:
-            add_new_contacter(con)
+            add_new_contacter(dao)
         elif choice == 2:
-            find_contacters(con)
+            find_contacters(dao)
         elif choice == 3:
-            con.close()
+            pool.close()
             print('谢谢使用, 再见！')
             break
 
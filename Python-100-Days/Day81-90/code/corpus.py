@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+串流式的語料預處理（對應 89.自然語言處理入門 中的 Word2Vec 和詞袋模型範例）
+
+原來的範例把 50000 條評論、清洗後的評論和分詞結果三份資料同時放在記憶體中，然後才交給 Word2Vec。
+這裡的做法是：
+- tokenize / JiebaTokenizer：正規表示式只編譯一次，停用詞放在集合中查詢
+- StreamingCorpus：第一次遍歷時用多個行程按批次分詞，結果寫入磁碟快取（每行一個句子，單詞之間用空格分隔），
+  之後每次遍歷都重新開啟快取檔案逐行讀取，可以重複遍歷多輪，記憶體用量不隨語料大小增加；
+  快取的格式就是 gensim 的 LineSentence 格式，也可以用 Word2Vec(corpus_file=...) 直接讀取
+- count_vectorize：用已經分好詞的語料建立詞袋模型，不需要再逐條呼叫分詞函式
+- WordVectors / top_k_similar：先把向量按行歸一化，按批次用矩陣乘法一次算出一批查詢跟整個詞彙表的餘弦相似度，
+  稠密陣列和稀疏矩陣（例如詞頻向量）都可以使用
+"""
+import os
+import re
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def tokenize(text):
+    """英文分詞：去掉標點符號、轉成小寫之後按空白字元拆分"""
+    return PUNCTUATION.sub('', text).lower().split()
+
+
+class JiebaTokenizer:
+    """中文分詞（可以指定停用詞）"""
+
+    def __init__(self, stop_words=()):
+        self.stop_words = frozenset(stop_words)
+
+    def __call__(self, text):
+        import jieba
+
+        return [word for word in jieba.lcut(text) if word.strip() and word not in self.stop_words]
+
+
+def _tokenize_batch(tokenizer, texts):
+    """對一批文字分詞，傳回寫入快取的文字（每行一個句子）"""
+    return ''.join(' '.join(tokens) + '\n' for tokens in map(tokenizer, texts))
+
+
+def _batched(iterable, size):
+    """把可迭代物件切分成指定大小的批次"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class StreamingCorpus:
+    """可以重複遍歷的分詞語料"""
+
+    def __init__(self, texts, cache_path, tokenizer=tokenize, *, workers=None, batch_size=1000):
+        """
+        :param texts: 原始文字的可迭代物件（只在建立快取的時候遍歷一次）
+        :param cache_path: 分詞結果的快取檔案路徑（檔案已經存在就直接使用）
+        :param tokenizer: 分詞函式（需要能夠被pickle，例如模組層級的函式或JiebaTokenizer物件）
+        :param workers: 分詞的行程數量（預設為CPU核數，為1時不建立行程池）
+        :param batch_size: 每次交給一個行程的文字數量
+        """
+        self.texts = texts
+        self.path = cache_path
+        self.tokenizer = tokenizer
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    def build(self, force=False):
+        """
+        建立分詞快取
+        :param force: 快取已經存在時是否重新建立
+        :return: 快取檔案的路徑
+        """
+        if os.path.exists(self.path) and not force:
+            return self.path
+        batches = _batched(self.texts, self.batch_size)
+        # 先寫入暫存檔再改名，中途失敗不會留下不完整的快取
+        temp_path = f'{self.path}.part'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            if self.workers == 1:
+                file.writelines(_tokenize_batch(self.tokenizer, batch) for batch in batches)
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    # map會先把所有批次提交給行程池，所以按視窗分段提交，避免一次把所有文字讀進記憶體
+                    window = self.workers * 4
+                    while chunk := list(islice(batches, window)):
+                        file.writelines(pool.map(_tokenize_batch, [self.tokenizer] * len(chunk), chunk))
+        os.replace(temp_path, self.path)
+        return self.path
+
+    def __iter__(self):
+        self.build()
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                yield line.split()
+
+    def __len__(self):
+        self.build()
+        with open(self.path, 'rb') as file:
+            return sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(1 << 20), b''))
+
+
+def _identity(tokens):
+    return tokens
+
+
+def count_vectorize(corpus, **kwargs):
+    """
+    用分好詞的語料建立詞袋模型
+    :param corpus: 分好詞的語料（每個元素是一個單詞的列表，例如StreamingCorpus物件）
+    :param kwargs: 傳給CountVectorizer的其他參數
+    :return: 二元組 - (CountVectorizer物件, 詞頻矩陣（稀疏矩陣）)
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    cv = CountVectorizer(analyzer=_identity, **kwargs)
+    return cv, cv.fit_transform(corpus)
+
+
+def normalize_rows(X):
+    """
+    將每一行歸一化成單位向量（全零的行保持不變）
+    :param X: 二維陣列或稀疏矩陣
+    :return: 歸一化之後的陣列或CSR格式的稀疏矩陣
+    """
+    from scipy import sparse
+
+    if sparse.issparse(X):
+        X = sparse.csr_matrix(X, dtype=np.float64)
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ X
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return X / norms
+
+
+def top_k_similar(queries, candidates, topn=10, *, exclude=None, batch_size=1024, normalized=False):
+    """
+    按批次計算餘弦相似度，找出每個查詢最相似的topn個候選
+    :param queries: 查詢向量（二維陣列或稀疏矩陣）
+    :param candidates: 候選向量（二維陣列或稀疏矩陣）
+    :param topn: 每個查詢傳回的候選數量
+    :param exclude: 每個查詢要排除的候選的序號（例如查詢詞本身），None表示不排除
+    :param batch_size: 每批的查詢數量（控制相似度矩陣的記憶體用量）
+    :param normalized: 兩組向量是否已經按行歸一化
+    :return: 二元組 - (候選的序號, 相似度)，形狀都是(n_queries, topn)，按相似度從大到小排列
+    """
+    from scipy import sparse
+
+    if not normalized:
+        queries, candidates = normalize_rows(queries), normalize_rows(candidates)
+    topn = min(topn, candidates.shape[0] - (exclude is not None))
+    n_queries = queries.shape[0]
+    indices = np.empty((n_queries, topn), dtype=np.intp)
+    scores = np.empty((n_queries, topn))
+    candidates_t = candidates.T
+    for start in range(0, n_queries, batch_size):
+        sims = queries[start:start + batch_size] @ candidates_t
+        sims = sims.toarray() if sparse.issparse(sims) else np.asarray(sims, dtype=np.float64)
+        rows = np.arange(len(sims))[:, np.newaxis]
+        if exclude is not None:
+            sims[rows[:, 0], exclude[start:start + batch_size]] = -np.inf
+        # 先用argpartition選出topn個，再只對這topn個排序
+        top = np.argpartition(-sims, topn - 1, axis=1)[:, :topn]
+        order = np.argsort(-sims[rows, top], axis=1)
+        indices[start:start + batch_size] = top[rows, order]
+        scores[start:start + batch_size] = sims[rows, indices[start:start + batch_size]]
+    return indices, scores
+
+
+class WordVectors:
+    """詞向量的批次相似度查詢"""
+
+    def __init__(self, vectors, words):
+        """
+        :param vectors: 詞向量構成的二維陣列（例如gensim模型的model.wv.vectors）
+        :param words: 每一行對應的單詞（例如model.wv.index_to_key）
+        """
+        self.words = list(words)
+        self.index = {word: i for i, word in enumerate(self.words)}
+        self.normed = normalize_rows(vectors)
+
+    @classmethod
+    def from_gensim(cls, model):
+        """從gensim的Word2Vec模型建立"""
+        return cls(model.wv.vectors, model.wv.index_to_key)
+
+    def most_similar(self, words, topn=10):
+        """
+        一次查詢多個單詞最相似的詞（結果不包含單詞本身）
+        :param words: 單詞的列表
+        :param topn: 每個單詞傳回的相似詞數量
+        :return: 每個單詞的[(相似詞, 相似度), ...]構成的列表
+        """
+        ids = np.array([self.index[word] for word in words])
+        indices, scores = top_k_similar(self.normed[ids], self.normed, topn, exclude=ids, normalized=True)
+        return self._pairs(indices, scores)
+
+    def similar_by_vector(self, vectors, topn=10):
+        """
+        查詢跟給定向量最相似的詞
+        :param vectors: 一個或多個向量
+        :param topn: 每個向量傳回的相似詞數量
+        :return: 每個向量的[(相似詞, 相似度), ...]構成的列表
+        """
+        queries = normalize_rows(np.atleast_2d(vectors))
+        return self._pairs(*top_k_similar(queries, self.normed, topn, normalized=True))
+
+    def _pairs(self, indices, scores):
+        return [
+            [(self.words[i], float(score)) for i, score in zip(row, row_scores)]
+            for row, row_scores in zip(indices, scores)
+        ]
+
+
+def main():
+    import tempfile
+
+    # 用隨機組合的句子代替IMDB評論（不需要下載資料集）
+    rng = np.random.default_rng(3)
+    vocab = np.array([f'word{i}' for i in range(5000)])
+    texts = (
+        'Review: ' + ' '.join(vocab[rng.zipf(1.3, size=40) % vocab.size]) + '!'
+        for _ in range(100000)
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        corpus = StreamingCorpus(texts, os.path.join(tmpdir, 'tokens.txt'))
+        start = time.perf_counter()
+        corpus.build()
+        print(f'分詞並寫入快取: {time.perf_counter() - start:.3f}秒, {len(corpus)}個句子')
+        start = time.perf_counter()
+        n_tokens = sum(len(sentence) for sentence in corpus)
+        print(f'從快取遍歷一輪: {time.perf_counter() - start:.3f}秒, {n_tokens}個單詞')
+        cv, X = count_vectorize(corpus)
+        # 在詞頻矩陣的轉置上查詢：兩個詞出現在越多相同的句子中就越相似
+        words = WordVectors(X.T.tocsr(), cv.get_feature_names_out())
+        start = time.perf_counter()
+        similar = words.most_similar(list(words.words[:500]), topn=3)
+        print(f'500個單詞的相似詞查詢: {time.perf_counter() - start:.3f}秒')
+        print(words.words[0], similar[0])
+        try:
+            from gensim.models import Word2Vec
+        except ImportError:
+            return
+        model = Word2Vec(corpus, vector_size=100, window=10, min_count=2, workers=4, seed=3)
+        print(WordVectors.from_gensim(model).most_similar(['word1'], topn=5))
+
+
+if __name__ == '__main__':
+    main()
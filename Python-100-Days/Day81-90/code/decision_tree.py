@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+排序掃描式的決策樹和隨機森林（對應 83.決策樹和隨機森林 中的 info_gain / gini_with_feature）
+
+原來的程式碼對特徵的每個不同取值都要用布林索引遍歷一次整個 y，評估一個特徵的代價是 O(n × 取值個數)。
+這裡的做法是：
+- 在根節點把每個特徵排序一次，節點分裂時用穩定的布林篩選把排好序的索引分給子節點，子節點不需要重新排序
+- 沿著排好序的樣本累加類別頻次（cumsum），一次掃描就能算出所有候選閾值左右兩側的不純度
+- 直方圖模式（max_bins）：先把每個特徵按分位數切成最多 max_bins 個箱子，節點上只需要用 bincount
+  統計每個箱子的類別頻次，候選閾值只有箱子的邊界，跟 LightGBM 的做法類似
+- 隨機森林：訓練資料放進共享記憶體，行程池中的每個行程直接在共享記憶體上訓練自己的樹，
+  不需要把整個資料集序列化後傳給每個行程
+"""
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import shared_data
+
+
+def impurity(counts, criterion='gini'):
+    """
+    根據類別頻次計算不純度（可以一次計算很多組頻次）
+    :param counts: 形狀為(..., n_classes)的類別頻次
+    :param criterion: 'gini'（基尼指數）或'entropy'（資訊熵）
+    :return: 形狀為(...)的不純度
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = counts.sum(axis=-1, keepdims=True)
+    probs = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    if criterion == 'gini':
+        return 1 - np.sum(probs ** 2, axis=-1)
+    logs = np.log2(probs, out=np.zeros_like(probs), where=probs > 0)
+    return -np.sum(probs * logs, axis=-1)
+
+
+def _value_class_counts(x, y):
+    """統計特徵每個取值對應的類別頻次，傳回形狀為(取值個數, 類別個數)的陣列"""
+    _, x_index = np.unique(x, return_inverse=True)
+    classes, y_index = np.unique(y, return_inverse=True)
+    n_values, n_classes = x_index.max() + 1, classes.size
+    return np.bincount(
+        x_index * n_classes + y_index, minlength=n_values * n_classes
+    ).reshape(n_values, n_classes)
+
+
+def info_gain(x, y):
+    """
+    計算資訊增益（一次bincount得到所有取值的類別頻次）
+    :param x: 給定的特徵
+    :param y: 資料集的目標值
+    :return: 資訊增益
+    """
+    counts = _value_class_counts(x, y)
+    weights = counts.sum(axis=1) / x.size
+    return impurity(counts.sum(axis=0), 'entropy') - weights @ impurity(counts, 'entropy')
+
+
+def info_gain_ratio(x, y):
+    """
+    計算資訊增益比
+    :param x: 給定的特徵
+    :param y: 資料集的目標值
+    :return: 資訊增益比
+    """
+    _, value_counts = np.unique(x, return_counts=True)
+    return info_gain(x, y) / impurity(value_counts, 'entropy')
+
+
+def gini_with_feature(x, y):
+    """
+    計算給定特徵後的基尼指數
+    :param x: 給定的特徵
+    :param y: 資料集的目標值
+    :return: 給定特徵後的基尼指數
+    """
+    counts = _value_class_counts(x, y)
+    return counts.sum(axis=1) / x.size @ impurity(counts, 'gini')
+
+
+def _best_split_sorted(x_sorted, y_sorted, parent_counts, criterion):
+    """
+    在排好序的特徵上一次掃描找出最佳閾值
+    :return: 二元組 - (加權不純度, 閾值)，沒有可用的閾值時傳回None
+    """
+    n_samples, n_classes = x_sorted.size, parent_counts.size
+    # 在第i個樣本之後切分時，左邊的類別頻次就是前i+1個樣本的累計頻次
+    left = np.cumsum(np.eye(n_classes)[y_sorted][:-1], axis=0)
+    right = parent_counts - left
+    # 只有相鄰兩個值不同的位置才能作為閾值
+    valid = x_sorted[:-1] < x_sorted[1:]
+    if not valid.any():
+        return None
+    n_left = np.arange(1, n_samples)
+    scores = (n_left * impurity(left, criterion) +
+              (n_samples - n_left) * impurity(right, criterion)) / n_samples
+    scores[~valid] = np.inf
+    i = scores.argmin()
+    lower, upper = x_sorted[i], x_sorted[i + 1]
+    threshold = lower / 2 + upper / 2
+    # 相鄰的兩個浮點數取平均值可能會捨入成較小的值，這時用較大的值作為閾值，
+    # 保證lower < 閾值 <= upper（特徵值小於閾值時進入左子樹）
+    if not lower < threshold <= upper:
+        threshold = upper
+    return scores[i], threshold
+
+
+def _best_split_hist(codes, y, edges, parent_counts, criterion):
+    """
+    用直方圖找出最佳閾值（只考慮箱子的邊界）
+    :return: 二元組 - (加權不純度, 閾值)，沒有可用的閾值時傳回None
+    """
+    n_bins, n_classes = edges.size + 1, parent_counts.size
+    hist = np.bincount(codes * n_classes + y, minlength=n_bins * n_classes)
+    left = np.cumsum(hist.reshape(n_bins, n_classes), axis=0)[:-1]
+    right = parent_counts - left
+    n_left, n_samples = left.sum(axis=1), y.size
+    valid = (n_left > 0) & (n_left < n_samples)
+    if not valid.any():
+        return None
+    scores = (n_left * impurity(left, criterion) +
+              (n_samples - n_left) * impurity(right, criterion)) / n_samples
+    scores[~valid] = np.inf
+    i = scores.argmin()
+    return scores[i], edges[i]
+
+
+class DecisionTree:
+    """決策樹分類器（樣本的特徵值小於閾值時進入左子樹）"""
+
+    def __init__(self, *, criterion='gini', max_depth=None, min_samples_split=2,
+                 max_features=None, max_bins=None, random_state=None):
+        """
+        :param criterion: 'gini'（基尼指數）或'entropy'（資訊增益）
+        :param max_depth: 樹的最大深度
+        :param min_samples_split: 節點至少要有多少個樣本才繼續分裂
+        :param max_features: 每次分裂隨機考慮的特徵數量（None、'sqrt'或整數）
+        :param max_bins: 直方圖模式的箱子數量（None表示精確的排序掃描）
+        :param random_state: 隨機數種子
+        """
+        self.criterion = criterion
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.max_features = max_features
+        self.max_bins = max_bins
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        """
+        訓練模型
+        :param X: 樣本特徵
+        :param y: 樣本標籤
+        :return: 模型本身
+        """
+        self.classes_, y_index = np.unique(y, return_inverse=True)
+        return self._fit_encoded(np.asarray(X, dtype=np.float64), y_index, self.classes_.size)
+
+    def _n_candidate_features(self, n_features):
+        if self.max_features is None:
+            return n_features
+        if self.max_features == 'sqrt':
+            return max(1, int(np.sqrt(n_features)))
+        return min(n_features, self.max_features)
+
+    def _fit_encoded(self, X, y, n_classes):
+        """用編碼成0到n_classes-1的標籤訓練模型"""
+        rng = np.random.default_rng(self.random_state)
+        n_samples, n_features = X.shape
+        max_depth = self.max_depth or np.inf
+        n_candidates = self._n_candidate_features(n_features)
+        if self.max_bins:
+            # 按分位數確定每個特徵的箱子邊界，再把特徵值換成箱子的序號
+            quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+            edges = [np.unique(np.quantile(X[:, j], quantiles)) for j in range(n_features)]
+            codes = np.column_stack([
+                np.searchsorted(edges[j], X[:, j], side='right') for j in range(n_features)
+            ])
+        else:
+            # 每個特徵只在根節點排序一次
+            orders = [np.argsort(X[:, j], kind='stable') for j in range(n_features)]
+        self.feature_, self.threshold_, self.left_, self.right_, self.value_ = [], [], [], [], []
+        # 棧中的元素：(節點編號, 深度, 樣本索引, 每個特徵排好序的樣本索引)
+        stack = [(self._add_node(), 0, np.arange(n_samples), None if self.max_bins else orders)]
+        go_left = np.zeros(n_samples, dtype=bool)
+        while stack:
+            node, depth, samples, node_orders = stack.pop()
+            counts = np.bincount(y[samples], minlength=n_classes)
+            self.value_[node] = counts / samples.size
+            if depth >= max_depth or samples.size < self.min_samples_split or \
+                    np.count_nonzero(counts) == 1:
+                continue
+            # 跟scikit-learn一樣，即使不純度沒有下降也要分裂（例如XOR的第一次分裂），
+            # 只在節點是純的、樣本數量太少或者達到最大深度時停止
+            best = (np.inf, None, None)
+            features = rng.permutation(n_features)[:n_candidates] \
+                if n_candidates < n_features else range(n_features)
+            for j in features:
+                if self.max_bins:
+                    result = _best_split_hist(codes[samples, j], y[samples],
+                                              edges[j], counts, self.criterion)
+                else:
+                    order = node_orders[j]
+                    result = _best_split_sorted(X[order, j], y[order], counts, self.criterion)
+                if result is not None and result[0] < best[0]:
+                    best = (result[0], j, result[1])
+            _, feature, threshold = best
+            if feature is None:
+                continue
+            go_left[samples] = X[samples, feature] < threshold
+            n_left = np.count_nonzero(go_left[samples])
+            if n_left == 0 or n_left == samples.size:
+                # 有一邊沒有樣本的分裂沒有意義，而且會讓樹無限地往下長
+                continue
+            left, right = self._add_node(), self._add_node()
+            self.feature_[node], self.threshold_[node] = feature, threshold
+            self.left_[node], self.right_[node] = left, right
+            for child, mask in ((left, go_left), (right, ~go_left)):
+                child_samples = samples[mask[samples]]
+                # 穩定篩選保持了排序，子節點直接沿用父節點的順序
+                child_orders = None if self.max_bins else \
+                    [order[mask[order]] for order in node_orders]
+                stack.append((child, depth + 1, child_samples, child_orders))
+        self.feature_ = np.array(self.feature_)
+        self.threshold_ = np.array(self.threshold_)
+        self.left_, self.right_ = np.array(self.left_), np.array(self.right_)
+        self.value_ = np.array(self.value_)
+        return self
+
+    def _add_node(self):
+        """新增一個節點（預設為葉子節點），傳回節點的編號"""
+        self.feature_.append(-1)
+        self.threshold_.append(0.0)
+        self.left_.append(-1)
+        self.right_.append(-1)
+        self.value_.append(None)
+        return len(self.feature_) - 1
+
+    def apply(self, X):
+        """
+        找出每個樣本所在的葉子節點（所有樣本一起逐層往下走）
+        :param X: 樣本特徵
+        :return: 葉子節點的編號
+        """
+        X = np.asarray(X, dtype=np.float64)
+        nodes = np.zeros(len(X), dtype=np.intp)
+        active = np.flatnonzero(self.feature_[nodes] >= 0)
+        while active.size:
+            current = nodes[active]
+            go_left = X[active, self.feature_[current]] < self.threshold_[current]
+            nodes[active] = np.where(go_left, self.left_[current], self.right_[current])
+            active = active[self.feature_[nodes[active]] >= 0]
+        return nodes
+
+    def predict_proba(self, X):
+        """預測每個類別的機率"""
+        return self.value_[self.apply(X)]
+
+    def predict(self, X):
+        """預測標籤"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _build_tree(params, n_classes, seed):
+    """在共享記憶體中的資料上用自助採樣訓練一棵樹"""
+    X, y = shared_data.shared['X'][1], shared_data.shared['y'][1]
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(len(X), size=len(X))
+    tree = DecisionTree(**params, random_state=rng.integers(2 ** 32))
+    return tree._fit_encoded(X[samples], y[samples], n_classes)
+
+
+class RandomForest:
+    """隨機森林分類器"""
+
+    def __init__(self, n_estimators=100, *, n_jobs=None, random_state=None, **tree_params):
+        """
+        :param n_estimators: 樹的數量
+        :param n_jobs: 同時訓練的行程數量（預設為CPU核數）
+        :param random_state: 隨機數種子
+        :param tree_params: 傳給DecisionTree的參數（max_features預設為'sqrt'）
+        """
+        self.n_estimators = n_estimators
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.tree_params = {'max_features': 'sqrt', **tree_params}
+
+    def fit(self, X, y):
+        """
+        訓練模型
+        :param X: 樣本特徵
+        :param y: 樣本標籤
+        :return: 模型本身
+        """
+        self.classes_, y_index = np.unique(y, return_inverse=True)
+        X_shm, X_spec = shared_data.to_shared(np.ascontiguousarray(X, dtype=np.float64))
+        y_shm, y_spec = shared_data.to_shared(y_index.astype(np.intp))
+        seeds = np.random.SeedSequence(self.random_state).generate_state(self.n_estimators)
+        try:
+            with ProcessPoolExecutor(max_workers=self.n_jobs or os.cpu_count(),
+                                     initializer=shared_data.attach,
+                                     initargs=(X_spec, y_spec)) as pool:
+                self.trees_ = list(pool.map(
+                    _build_tree, [self.tree_params] * self.n_estimators,
+                    [self.classes_.size] * self.n_estimators, seeds))
+        finally:
+            shared_data.release(X_shm, y_shm)
+        return self
+
+    def predict_proba(self, X):
+        """預測每個類別的機率（所有樹的平均值）"""
+        return np.mean([tree.predict_proba(X) for tree in self.trees_], axis=0)
+
+    def predict(self, X):
+        """預測標籤"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def main():
+    """跟scikit-learn比較訓練時間和準確率"""
+    from sklearn.datasets import load_iris, make_classification
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y = load_iris(return_X_y=True)
+    print(f'g(D,A2) = {info_gain(X[:, 2], y):.4f}, G(D,A2) = {gini_with_feature(X[:, 2], y):.4f}')
+
+    X, y = make_classification(n_samples=50000, n_features=20, n_informative=8, random_state=3)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, train_size=0.8, random_state=3)
+    models = (
+        ('DecisionTree', DecisionTree(max_depth=10)),
+        ('DecisionTree(max_bins=64)', DecisionTree(max_depth=10, max_bins=64)),
+        ('DecisionTreeClassifier', DecisionTreeClassifier(max_depth=10)),
+        ('RandomForest', RandomForest(50, max_depth=10, max_bins=64, random_state=3)),
+        ('RandomForestClassifier', RandomForestClassifier(50, max_depth=10, n_jobs=-1)),
+    )
+    for name, model in models:
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        elapsed = time.perf_counter() - start
+        accuracy = np.mean(model.predict(X_test) == y_test)
+        print(f'{name}: 訓練{elapsed:.3f}秒 準確率{accuracy:.4f}')
+
+
+if __name__ == '__main__':
+    main()
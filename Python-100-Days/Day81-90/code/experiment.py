@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+模型實驗工具（對應 82.k最近鄰演算法 和 83.決策樹和隨機森林 中的 GridSearchCV 範例）
+
+原來的範例用預設的 n_jobs 依序嘗試每一組參數，每個範例都重新劃分資料、重新做特徵縮放。這裡的做法是：
+- Experiment：劃分好的訓練集和測試集以及訓練好的前處理器（例如StandardScaler）按資料的雜湊值快取在磁碟上
+- search：訓練集放進共享記憶體，行程池中的行程直接連接共享記憶體，只透過管道傳遞參數和樣本序號；
+  每個(參數組合, 交叉驗證的折)是一個任務
+- 逐次減半（successive halving）：先用少量樣本評估所有參數組合，每一輪只保留得分最高的 1/factor，
+  同時把樣本數量乘以factor，最後一輪才用全部樣本
+- 結果表格記錄每組參數的得分以及訓練、預測的耗時，可以同時比較模型的準確率和成本
+"""
+import hashlib
+import math
+import os
+import pickle
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import shared_data
+
+
+def _evaluate(estimator, params, train_index, val_index):
+    """用共享記憶體中的資料訓練和評估一組參數，傳回(得分, 訓練耗時, 預測耗時)"""
+    from sklearn.base import clone
+
+    X, y = shared_data.shared['X'][1], shared_data.shared['y'][1]
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = model.predict(X[val_index])
+    predict_time = time.perf_counter() - start
+    return np.mean(y_pred == y[val_index]), fit_time, predict_time
+
+
+def _digest(*arrays):
+    """計算陣列內容的雜湊值（用作快取的鍵）"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        hasher.update(str((array.shape, array.dtype)).encode())
+        # object陣列（例如字串標籤）的記憶體中只是指標，每次執行都不一樣，要雜湊序列化之後的內容
+        hasher.update(pickle.dumps(array) if array.dtype.hasobject else array.data)
+    return hasher.hexdigest()
+
+
+def _without_objects(array, numeric=False):
+    """
+    把object陣列（例如pandas中的字串標籤）轉成數值或固定長度的字串陣列，np.savez儲存object陣列時會用pickle，
+    快取就不能用allow_pickle=False讀回來
+    :param array: 陣列
+    :param numeric: 是否先嘗試轉成浮點數（用於特徵）
+    :return: 不是object型別的陣列
+    """
+    array = np.asarray(array)
+    if not array.dtype.hasobject:
+        return array
+    if numeric:
+        try:
+            return array.astype(np.float64)
+        except (TypeError, ValueError):
+            pass
+    return array.astype(str)
+
+
+class Experiment:
+    """帶磁碟快取的資料劃分和超參數搜尋"""
+
+    def __init__(self, X, y, *, preprocessor=None, test_size=0.2, random_state=3,
+                 cache_dir='.experiment_cache', n_jobs=None):
+        """
+        :param X: 樣本特徵
+        :param y: 樣本標籤
+        :param preprocessor: 前處理器（只用訓練集訓練，例如StandardScaler()）
+        :param test_size: 測試集所佔的比例
+        :param random_state: 隨機數種子
+        :param cache_dir: 快取目錄
+        :param n_jobs: 行程池的行程數量（預設為CPU核數）
+        """
+        self.X, self.y = _without_objects(X, numeric=True), _without_objects(y)
+        self.preprocessor = preprocessor
+        self.test_size = test_size
+        self.random_state = random_state
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.results, self.summary = [], []
+        self._split = None
+
+    def split(self):
+        """
+        劃分並前處理訓練集和測試集（結果會快取在磁碟上）
+        :return: 四元組 - (X_train, X_test, y_train, y_test)
+        """
+        if self._split is not None:
+            return self._split
+        key = _digest(self.X, self.y)
+        key += f'-{self.test_size}-{self.random_state}-{self.preprocessor!r}'
+        path = os.path.join(self.cache_dir, hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+        if os.path.exists(f'{path}.npz'):
+            with np.load(f'{path}.npz', allow_pickle=False) as data:
+                self._split = tuple(data[name] for name in ('X_train', 'X_test', 'y_train', 'y_test'))
+            if self.preprocessor is not None:
+                self.preprocessor = joblib.load(f'{path}.pkl')
+            return self._split
+        from sklearn.model_selection import train_test_split
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            self.X, self.y, test_size=self.test_size, random_state=self.random_state, stratify=self.y
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self.preprocessor is not None:
+            X_train = self.preprocessor.fit_transform(X_train)
+            X_test = self.preprocessor.transform(X_test)
+            joblib.dump(self.preprocessor, f'{path}.pkl')
+        np.savez(f'{path}.npz', X_train=X_train, X_test=X_test, y_train=y_train, y_test=y_test)
+        self._split = (X_train, X_test, y_train, y_test)
+        return self._split
+
+    def search(self, name, estimator, param_grid, *, cv=5, halving=False, factor=3, min_resources=None):
+        """
+        超參數搜尋
+        :param name: 模型的名字（寫入結果表格）
+        :param estimator: scikit-learn的模型
+        :param param_grid: 參數網格（跟GridSearchCV的param_grid相同）
+        :param cv: 交叉驗證的折數
+        :param halving: 是否使用逐次減半淘汰參數組合
+        :param factor: 每一輪保留的參數組合比例（1/factor）和樣本數量增加的倍數
+        :param min_resources: 第一輪使用的樣本數量（預設讓最後一輪正好用到全部樣本）
+        :return: 這次搜尋的結果表格（每一輪每組參數一行，最後一輪的結果排在前面，同一輪按得分從高到低排列）
+        """
+        from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+        X_train, X_test, y_train, y_test = self.split()
+        candidates = list(ParameterGrid(param_grid))
+        folds = list(StratifiedKFold(cv, shuffle=True, random_state=self.random_state).split(X_train, y_train))
+        rng = np.random.default_rng(self.random_state)
+        # 每一折的訓練樣本預先打亂，逐次減半時取前n_resources個就是一個隨機子集
+        folds = [(rng.permutation(train_index), val_index) for train_index, val_index in folds]
+        n_samples = min(len(train_index) for train_index, _ in folds)
+        if halving:
+            n_rounds = 1 + math.floor(math.log(len(candidates), factor)) if len(candidates) > 1 else 1
+            min_resources = min_resources or max(n_samples // factor ** (n_rounds - 1), cv * 2)
+        else:
+            n_rounds, min_resources = 1, n_samples
+        X_shm, X_spec = shared_data.to_shared(np.ascontiguousarray(X_train))
+        # 標籤編碼成整數再放進共享記憶體（字串標籤是object陣列，不能放進共享記憶體）
+        y_shm, y_spec = shared_data.to_shared(np.unique(y_train, return_inverse=True)[1].astype(np.intp))
+        rows = []
+        try:
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=shared_data.attach,
+                                     initargs=(X_spec, y_spec)) as pool:
+                remaining = list(range(len(candidates)))
+                for round_index in range(n_rounds):
+                    n_resources = n_samples if round_index == n_rounds - 1 else min(
+                        min_resources * factor ** round_index, n_samples)
+                    tasks = [
+                        (estimator, candidates[i], train_index[:n_resources], val_index)
+                        for i in remaining for train_index, val_index in folds
+                    ]
+                    outcomes = np.array(list(pool.map(_evaluate, *zip(*tasks), chunksize=max(
+                        len(tasks) // (self.n_jobs * 4), 1)))).reshape(len(remaining), cv, 3)
+                    for i, outcome in zip(remaining, outcomes):
+                        rows.append({
+                            'model': name, 'params': candidates[i], 'round': round_index,
+                            'n_resources': n_resources, 'mean_score': outcome[:, 0].mean(),
+                            'std_score': outcome[:, 0].std(), 'fit_time': outcome[:, 1].mean(),
+                            'predict_time': outcome[:, 2].mean(),
+                        })
+                    scores = outcomes[:, :, 0].mean(axis=1)
+                    keep = max(math.ceil(len(remaining) / factor), 1)
+                    remaining = [remaining[i] for i in np.argsort(-scores, kind='stable')[:keep]]
+        finally:
+            shared_data.release(X_shm, y_shm)
+        table = pd.DataFrame(rows)
+        table = table.sort_values(['round', 'mean_score'], ascending=False, ignore_index=True)
+        self.best_model_ = self._refit(name, estimator, table.at[0, 'params'], X_train, X_test, y_train, y_test)
+        self.results.append(table)
+        return table
+
+    def _refit(self, name, estimator, params, X_train, X_test, y_train, y_test):
+        """用全部訓練集訓練最佳參數的模型，記錄測試集上的得分和耗時"""
+        from sklearn.base import clone
+
+        model = clone(estimator).set_params(**params)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        predict_time = time.perf_counter() - start
+        self.summary.append({
+            'model': name, 'params': params, 'test_score': np.mean(y_pred == y_test),
+            'fit_time': fit_time, 'predict_time': predict_time,
+        })
+        return model
+
+    def report(self, path=None):
+        """
+        所有模型最佳參數在測試集上的結果
+        :param path: 結果表格的儲存路徑（CSV檔案，為None時不儲存）
+        :return: 結果表格
+        """
+        summary = pd.DataFrame(self.summary)
+        if path is not None:
+            summary.to_csv(path, index=False)
+        return summary
+
+
+def main():
+    import tempfile
+
+    from sklearn.datasets import make_classification
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y = make_classification(n_samples=5000, n_features=20, n_informative=8, random_state=3)
+    knn_grid = {'n_neighbors': [1, 3, 5, 7, 9, 11, 13, 15], 'weights': ['uniform', 'distance'], 'p': [1, 2]}
+    tree_grid = {
+        'criterion': ['gini', 'entropy'], 'max_depth': np.arange(5, 10),
+        'min_samples_leaf': np.arange(1, 11, 3), 'max_leaf_nodes': np.arange(5, 15, 3),
+    }
+    with tempfile.TemporaryDirectory() as cache_dir:
+        experiment = Experiment(X, y, preprocessor=StandardScaler(), cache_dir=cache_dir)
+        X_train, *_ = experiment.split()
+        start = time.perf_counter()
+        gs = GridSearchCV(DecisionTreeClassifier(), tree_grid, cv=5).fit(X_train, experiment.split()[2])
+        print(f'GridSearchCV（決策樹）: {time.perf_counter() - start:.3f}秒, 最優引數: {gs.best_params_}')
+        for name, estimator, grid in (('kNN', KNeighborsClassifier(), knn_grid),
+                                      ('決策樹', DecisionTreeClassifier(random_state=3), tree_grid)):
+            for halving in (False, True):
+                start = time.perf_counter()
+                table = experiment.search(name, estimator, grid, halving=halving)
+                print(f'{name}（逐次減半: {halving}）: {time.perf_counter() - start:.3f}秒, '
+                      f'最優引數: {table.at[0, "params"]}, 評分: {table.at[0, "mean_score"]:.4f}')
+        print(experiment.report(os.path.join(cache_dir, 'results.csv')).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+向量化的K-Means聚類（對應 86.K-Means聚類演算法 中的 kmeans）
+
+- 分配樣本：一次算出所有樣本到所有質心的距離矩陣，用 argmin 得到每個樣本所屬的簇
+- 更新質心：用 np.add.at 按標籤累加樣本、用 bincount 統計每個簇的樣本數量
+- 初始質心：k-means++，離已選質心越遠的樣本被選中的機率越大
+- 多次初始化（n_init）：在多個行程中同時執行，保留距離平方和（inertia）最小的結果
+- 小批次模式：每次只讀入一批資料更新質心，適用於無法全部載入記憶體的資料集
+"""
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from knn import squared_distances
+
+
+def init_centroids(X, k, rng):
+    """
+    用k-means++選擇k個初始質心
+    每一步抽出幾個候選樣本，保留能讓距離平方和下降最多的那一個（greedy k-means++）
+    :param X: 樣本
+    :param k: 簇的數量
+    :param rng: 隨機數產生器
+    :return: 初始質心構成的陣列
+    """
+    X_sq = np.einsum('ij,ij->i', X, X)
+    n_trials = 2 + int(np.log(k))
+    centroids = np.empty((k, X.shape[1]))
+    centroids[0] = X[rng.integers(len(X))]
+    # 每個樣本到最近的已選質心的距離平方
+    closest = squared_distances(centroids[:1], X, Y_sq=X_sq)[0]
+    for i in range(1, k):
+        total = closest.sum()
+        if total == 0:
+            candidates = rng.integers(len(X), size=n_trials)
+        else:
+            candidates = rng.choice(len(X), size=n_trials, p=closest / total)
+        # 每個候選樣本被選為質心之後的距離平方（一次算出所有候選）
+        candidate_closest = np.minimum(
+            closest, squared_distances(X[candidates], X, X_sq=X_sq[candidates], Y_sq=X_sq))
+        best = candidate_closest.sum(axis=1).argmin()
+        centroids[i] = X[candidates[best]]
+        closest = candidate_closest[best]
+    return centroids
+
+
+def assign_labels(X, centroids, X_sq=None):
+    """
+    將樣本分配給最近的質心
+    :param X: 樣本
+    :param centroids: 質心
+    :param X_sq: X每一行的平方和（可以預先計算好傳入）
+    :return: 二元組 - (標籤, 每個樣本到所屬質心的距離平方)
+    """
+    dists = squared_distances(X, centroids, X_sq=X_sq)
+    labels = dists.argmin(axis=1)
+    return labels, dists[np.arange(len(X)), labels]
+
+
+def update_centroids(X, labels, k):
+    """
+    重新計算質心的位置
+    :param X: 樣本
+    :param labels: 樣本的標籤
+    :param k: 簇的數量
+    :return: 二元組 - (每個簇的樣本之和, 每個簇的樣本數量)
+    """
+    sums = np.zeros((k, X.shape[1]))
+    np.add.at(sums, labels, X)
+    counts = np.bincount(labels, minlength=k)
+    return sums, counts
+
+
+def _kmeans_single(X, k, max_iter, tol, seed):
+    """執行一次K-Means聚類，傳回(標籤, 質心, 距離平方和)"""
+    rng = np.random.default_rng(seed)
+    X_sq = np.einsum('ij,ij->i', X, X)
+    variance = np.var(X, axis=0).mean()
+    centroids = init_centroids(X, k, rng)
+    for _ in range(max_iter):
+        labels, dists = assign_labels(X, centroids, X_sq)
+        sums, counts = update_centroids(X, labels, k)
+        new_centroids = centroids.copy()
+        nonempty = counts > 0
+        new_centroids[nonempty] = sums[nonempty] / counts[nonempty, np.newaxis]
+        # 空的簇用離自己質心最遠的樣本重新初始化
+        for i, index in zip(np.flatnonzero(~nonempty), np.argsort(dists)[::-1]):
+            new_centroids[i] = X[index]
+        # 質心移動距離的平方和小於容忍度（按資料的方差縮放）就提前終止迭代
+        shift = np.sum((new_centroids - centroids) ** 2)
+        centroids = new_centroids
+        if shift <= tol * variance:
+            break
+    labels, dists = assign_labels(X, centroids, X_sq)
+    return labels, centroids, dists.sum()
+
+
+def kmeans(X, *, k, max_iter=300, tol=1e-4, n_init=1, n_jobs=None, random_state=None):
+    """
+    KMeans聚類
+    :param X: 樣本
+    :param k: 簇的數量
+    :param max_iter: 最大迭代次數
+    :param tol: 質心變化容忍度
+    :param n_init: 初始質心選擇嘗試次數
+    :param n_jobs: 同時執行的行程數量（預設為CPU核數，為1時不建立行程池）
+    :param random_state: 隨機數種子
+    :return: 二元組 - (標籤, 質心)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    seeds = np.random.SeedSequence(random_state).spawn(n_init)
+    n_jobs = min(n_jobs or os.cpu_count() or 1, n_init)
+    args = ([X] * n_init, [k] * n_init, [max_iter] * n_init, [tol] * n_init, seeds)
+    if n_jobs == 1:
+        results = list(map(_kmeans_single, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_kmeans_single, *args))
+    labels, centroids, _ = min(results, key=lambda result: result[2])
+    return labels, centroids
+
+
+def mini_batch_kmeans(make_batches, *, k, n_epochs=3, random_state=None):
+    """
+    小批次KMeans聚類（每次只需要一批資料在記憶體中）
+    :param make_batches: 呼叫後傳回批次迭代器的函式（每個批次是一個二維陣列，每輪會呼叫一次）
+    :param k: 簇的數量
+    :param n_epochs: 遍歷資料的輪數
+    :param random_state: 隨機數種子
+    :return: 質心
+    """
+    rng = np.random.default_rng(random_state)
+    centroids, counts = None, np.zeros(k, dtype=np.int64)
+    for _ in range(n_epochs):
+        for batch in make_batches():
+            batch = np.asarray(batch, dtype=np.float64)
+            if centroids is None:
+                centroids = init_centroids(batch, k, rng)
+            labels, _ = assign_labels(batch, centroids)
+            sums, batch_counts = update_centroids(batch, labels, k)
+            counts += batch_counts
+            # 質心是所屬樣本的累計平均值：c += (本批樣本之和 - 本批數量 * c) / 累計數量
+            updated = batch_counts > 0
+            centroids[updated] += (
+                sums[updated] - batch_counts[updated, np.newaxis] * centroids[updated]
+            ) / counts[updated, np.newaxis]
+    return centroids
+
+
+def predict(X, centroids, batch_size=65536):
+    """
+    按批次為樣本生成標籤
+    :param X: 樣本（可以是np.load(..., mmap_mode='r')傳回的陣列）
+    :param centroids: 質心
+    :param batch_size: 每批的樣本數量
+    :return: 標籤
+    """
+    return np.concatenate([
+        assign_labels(np.asarray(X[i:i + batch_size], dtype=np.float64), centroids)[0]
+        for i in range(0, len(X), batch_size)
+    ])
+
+
+def main():
+    """跟scikit-learn的KMeans比較速度和結果"""
+    from sklearn.cluster import KMeans
+    from sklearn.datasets import load_iris, make_blobs
+
+    X, _ = load_iris(return_X_y=True)
+    labels, centers = kmeans(X, k=3, n_init=4, random_state=3)
+    print(np.round(centers, 3))
+
+    X, _ = make_blobs(n_samples=200000, n_features=10, centers=8, random_state=3)
+    start = time.perf_counter()
+    _, centers = kmeans(X, k=8, n_init=4, random_state=3)
+    print(f'kmeans: {time.perf_counter() - start:.3f}秒')
+    start = time.perf_counter()
+    model = KMeans(n_clusters=8, n_init=4, random_state=3).fit(X)
+    print(f'sklearn KMeans: {time.perf_counter() - start:.3f}秒')
+    start = time.perf_counter()
+    batches = lambda: (X[i:i + 10000] for i in range(0, len(X), 10000))
+    mb_centers = mini_batch_kmeans(batches, k=8, random_state=3)
+    print(f'mini_batch_kmeans: {time.perf_counter() - start:.3f}秒')
+    for name, result in (('kmeans', centers), ('mini_batch_kmeans', mb_centers)):
+        inertia = assign_labels(X, result)[1].sum()
+        print(f'{name} inertia: {inertia:.1f} (sklearn: {model.inertia_:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+向量化的k最近鄰演算法（對應 82.k最近鄰演算法 中的 make_label / predict_by_knn）
+
+make_label 對每個待預測樣本都要呼叫 n_train 次 euclidean_distance，
+這裡改成一次算出一整塊樣本到所有訓練樣本的距離矩陣：
+    ‖a - b‖² = ‖a‖² + ‖b‖² - 2a·b
+其中 a·b 就是一次矩陣乘法。為了讓記憶體用量有上限，待預測樣本會按塊（block）處理，
+每一塊用 argpartition 找出 k 個最近鄰，再用 bincount 一次完成（加權）投票。
+低維資料可以改用 KD 樹或球樹索引（需要 scipy 或 scikit-learn）。
+"""
+import time
+
+import numpy as np
+
+
+def squared_distances(X, Y, X_sq=None, Y_sq=None):
+    """
+    計算兩組樣本之間的歐式距離平方矩陣
+    :param X: 形狀為(m, n)的樣本
+    :param Y: 形狀為(p, n)的樣本
+    :param X_sq: X每一行的平方和（可以預先計算好傳入）
+    :param Y_sq: Y每一行的平方和（可以預先計算好傳入）
+    :return: 形狀為(m, p)的距離平方矩陣
+    """
+    if X_sq is None:
+        X_sq = np.einsum('ij,ij->i', X, X)
+    if Y_sq is None:
+        Y_sq = np.einsum('ij,ij->i', Y, Y)
+    dists = X @ Y.T
+    dists *= -2
+    dists += X_sq[:, np.newaxis]
+    dists += Y_sq
+    # 浮點數誤差可能讓距離變成很小的負數
+    np.maximum(dists, 0, out=dists)
+    return dists
+
+
+class KNNClassifier:
+    """k最近鄰分類器"""
+
+    def __init__(self, k=5, *, weights='uniform', algorithm='brute',
+                 max_block_bytes=64 * 1024 * 1024, dtype=np.float64):
+        """
+        :param k: 鄰居的數量
+        :param weights: 投票的權重 - 'uniform'（眾數）或'distance'（距離的倒數）
+        :param algorithm: 'brute'（矩陣運算）、'kd_tree' 或 'ball_tree'
+        :param max_block_bytes: 每一塊距離矩陣最多佔用的位元組數
+        :param dtype: 計算距離時使用的浮點數型別（float32更快但精度較低）
+        """
+        if weights not in ('uniform', 'distance'):
+            raise ValueError(f'不支援的權重: {weights}')
+        if algorithm not in ('brute', 'kd_tree', 'ball_tree'):
+            raise ValueError(f'不支援的演算法: {algorithm}')
+        self.k = k
+        self.weights = weights
+        self.algorithm = algorithm
+        self.max_block_bytes = max_block_bytes
+        self.dtype = dtype
+
+    def fit(self, X, y):
+        """
+        訓練模型（記住訓練資料並建立索引）
+        :param X: 訓練集中的特徵
+        :param y: 訓練集中的標籤
+        :return: 模型本身
+        """
+        self.X_ = np.asarray(X, dtype=self.dtype)
+        # 將標籤編碼為0到n_classes-1的整數，投票時可以直接當作下標
+        self.classes_, self.y_ = np.unique(y, return_inverse=True)
+        if self.k > self.X_.shape[0]:
+            raise ValueError('鄰居的數量不能超過訓練樣本的數量')
+        if self.algorithm == 'kd_tree':
+            from scipy.spatial import cKDTree
+            self.index_ = cKDTree(self.X_)
+        elif self.algorithm == 'ball_tree':
+            from sklearn.neighbors import BallTree
+            self.index_ = BallTree(self.X_)
+        else:
+            self.X_sq_ = np.einsum('ij,ij->i', self.X_, self.X_)
+        return self
+
+    def kneighbors(self, X):
+        """
+        找出k個最近鄰
+        :param X: 待預測的樣本
+        :return: 二元組 - (距離, 鄰居在訓練集中的索引)，形狀都是(m, k)
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        if self.algorithm == 'kd_tree':
+            dists, indices = self.index_.query(X, k=self.k)
+            return dists.reshape(-1, self.k), indices.reshape(-1, self.k)
+        if self.algorithm == 'ball_tree':
+            return self.index_.query(X, k=self.k)
+        dists = np.empty((X.shape[0], self.k), dtype=self.dtype)
+        indices = np.empty((X.shape[0], self.k), dtype=np.intp)
+        itemsize = self.X_.dtype.itemsize
+        block_size = max(1, self.max_block_bytes // (itemsize * self.X_.shape[0]))
+        for start in range(0, X.shape[0], block_size):
+            block = X[start:start + block_size]
+            # ‖a‖²對同一行的所有距離都一樣，不影響排名，所以只計算‖b‖² - 2a·b
+            # 等選出k個最近鄰之後再把‖a‖²加回去，省掉對整個矩陣的兩次運算
+            scores = (block * -2) @ self.X_.T
+            scores += self.X_sq_
+            # 一次劃分找到每一行k個最小距離對應的索引（不需要完整排序）
+            part = np.argpartition(scores, self.k - 1, axis=1)[:, :self.k]
+            block_dists = np.take_along_axis(scores, part, axis=1)
+            block_dists += np.einsum('ij,ij->i', block, block)[:, np.newaxis]
+            dists[start:start + block_size] = block_dists
+            indices[start:start + block_size] = part
+        return np.sqrt(np.maximum(dists, 0)), indices
+
+    def predict(self, X):
+        """
+        預測標籤
+        :param X: 待預測的樣本
+        :return: 預測的標籤構成的陣列
+        """
+        dists, indices = self.kneighbors(X)
+        labels = self.y_[indices]
+        if self.weights == 'distance':
+            # 距離為0的鄰居給一個很大的權重
+            weights = 1 / np.maximum(dists, 1e-12)
+        else:
+            weights = None
+        n_samples, n_classes = labels.shape[0], self.classes_.size
+        # 把(樣本, 類別)編碼成一個整數，用一次bincount完成所有樣本的投票
+        offsets = np.arange(n_samples)[:, np.newaxis] * n_classes
+        votes = np.bincount(
+            (labels + offsets).ravel(),
+            weights=None if weights is None else weights.ravel(),
+            minlength=n_samples * n_classes
+        ).reshape(n_samples, n_classes)
+        # 票數相同時argmax取較小的類別，跟stats.mode的行為一致
+        return self.classes_[votes.argmax(axis=1)]
+
+    def score(self, X, y):
+        """計算準確率"""
+        return np.mean(self.predict(X) == np.asarray(y))
+
+
+def predict_by_knn(X_train, y_train, X_new, k=5):
+    """
+    KNN演算法（向量化版本）
+    :param X_train: 訓練集中的特徵
+    :param y_train: 訓練集中的標籤
+    :param X_new: 待預測的樣本構成的陣列
+    :param k: 鄰居的數量（預設值為5）
+    :return: 儲存預測結果（標籤）的陣列
+    """
+    return KNNClassifier(k).fit(X_train, y_train).predict(X_new)
+
+
+def benchmark(n_train=100000, n_test=2000, n_features=50, k=5):
+    """跟scikit-learn的KNeighborsClassifier比較速度"""
+    from sklearn.datasets import make_classification
+    from sklearn.neighbors import KNeighborsClassifier
+
+    X, y = make_classification(
+        n_samples=n_train + n_test, n_features=n_features,
+        n_informative=10, n_classes=3, random_state=3
+    )
+    X_train, y_train, X_test = X[:n_train], y[:n_train], X[n_train:]
+    for dtype in (np.float64, np.float32):
+        start = time.perf_counter()
+        y_pred = KNNClassifier(k, dtype=dtype).fit(X_train, y_train).predict(X_test)
+        elapsed = time.perf_counter() - start
+        print(f'KNNClassifier({dtype.__name__}): {elapsed:.3f}秒')
+    start = time.perf_counter()
+    model = KNeighborsClassifier(k, algorithm='brute').fit(X_train, y_train)
+    y_pred_sk = model.predict(X_test)
+    elapsed = time.perf_counter() - start
+    print(f'KNeighborsClassifier: {elapsed:.3f}秒')
+    print(f'預測結果一致的比例: {np.mean(y_pred == y_pred_sk):.4f}')
+
+
+if __name__ == '__main__':
+    benchmark()
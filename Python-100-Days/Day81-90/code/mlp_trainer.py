@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+神經網路模型的訓練工具（對應 88.神經網路模型 中的 IrisNN 和 MLPRegressor）
+
+原來的範例每一輪都用全部訓練資料做一次梯度更新，固定訓練256輪，而且每次執行都要從UCI重新下載資料。
+這裡的做法是：
+- load_prep_data：下載的CSV檔案快取在本機磁碟上，只有第一次執行需要連網
+- make_loaders：用 DataLoader 打亂資料、按小批次訓練，並劃分出驗證集
+- Trainer：驗證集損失連續 patience 輪沒有改善就提前停止，保留驗證集損失最小時的參數；
+  用 torch.set_num_threads 控制CPU執行緒數量，並統計每秒處理的樣本數量
+- export_model / predict_batched：匯出成 TorchScript 或 ONNX，推論時按批次執行
+"""
+import copy
+import os
+import time
+
+from urllib.request import urlopen
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from torch.utils.data import DataLoader, TensorDataset
+
+AUTO_MPG_URL = 'https://archive.ics.uci.edu/static/public/9/data.csv'
+
+
+class IrisNN(nn.Module):
+    """鳶尾花神經網路模型"""
+
+    def __init__(self, n_features=4, n_hidden=32, n_classes=3):
+        super().__init__()
+        self.fc1 = nn.Linear(n_features, n_hidden)
+        self.fc2 = nn.Linear(n_hidden, n_classes)
+
+    def forward(self, x):
+        return self.fc2(torch.relu(self.fc1(x)))
+
+
+class MLPRegressor(nn.Module):
+    """神經網路迴歸模型"""
+
+    def __init__(self, n):
+        super().__init__()
+        self.fc1 = nn.Linear(n, 64)
+        self.fc2 = nn.Linear(64, 64)
+        self.fc3 = nn.Linear(64, 1)
+
+    def forward(self, x):
+        x = torch.relu(self.fc1(x))
+        x = torch.relu(self.fc2(x))
+        return self.fc3(x)
+
+
+def cached_download(url, cache_dir='data'):
+    """
+    下載檔案並快取到本機（檔案已經存在就直接傳回路徑）
+    :param url: 檔案的網址
+    :param cache_dir: 快取目錄
+    :return: 本機檔案的路徑
+    """
+    path = os.path.join(cache_dir, os.path.basename(url))
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        with urlopen(url) as resp:
+            content = resp.read()
+        # 先寫入暫存檔再改名，下載中斷時不會留下不完整的快取
+        with open(f'{path}.part', 'wb') as file:
+            file.write(content)
+        os.replace(f'{path}.part', path)
+    return path
+
+
+def load_prep_data(cache_dir='data'):
+    """
+    載入準備汽車油耗資料（auto-mpg）
+    :param cache_dir: 快取目錄
+    :return: 二元組 - (特徵, 目標值)，特徵尚未縮放
+    """
+    import pandas as pd
+
+    df = pd.read_csv(cached_download(AUTO_MPG_URL, cache_dir))
+    df = df.drop(columns=['car_name']).dropna()
+    df['origin'] = df['origin'].astype('category')
+    df = pd.get_dummies(df, columns=['origin'], drop_first=True).astype('f8')
+    return df.drop(columns='mpg').values, df['mpg'].values
+
+
+def make_loaders(X, y, *, batch_size=32, val_size=0.2, regression=False, random_state=None):
+    """
+    劃分訓練集和驗證集，建立對應的DataLoader
+    :param X: 特徵
+    :param y: 標籤（分類）或目標值（迴歸）
+    :param batch_size: 小批次的樣本數量
+    :param val_size: 驗證集所佔的比例（大於0時驗證集至少有一個樣本，為0時不劃分驗證集）
+    :param regression: 是否為迴歸問題（目標值會轉成形狀為(n, 1)的浮點數張量）
+    :param random_state: 隨機數種子
+    :return: 二元組 - (訓練集的DataLoader, 驗證集的DataLoader)，不劃分驗證集時後者為None
+    """
+    if len(X) < (2 if val_size > 0 else 1):
+        raise ValueError('樣本數量太少，無法劃分訓練集和驗證集')
+    X_tensor = torch.as_tensor(np.asarray(X), dtype=torch.float32)
+    if regression:
+        y_tensor = torch.as_tensor(np.asarray(y), dtype=torch.float32).view(-1, 1)
+    else:
+        y_tensor = torch.as_tensor(np.asarray(y), dtype=torch.long)
+    generator = torch.Generator()
+    if random_state is not None:
+        generator.manual_seed(random_state)
+    order = torch.randperm(len(X_tensor), generator=generator)
+    # 樣本很少時int(len * val_size)可能是0，這時至少保留一個驗證樣本（訓練集也至少保留一個樣本）
+    n_val = min(max(int(len(X_tensor) * val_size), 1), len(X_tensor) - 1) if val_size > 0 else 0
+    val_index, train_index = order[:n_val], order[n_val:]
+    train_loader = DataLoader(
+        TensorDataset(X_tensor[train_index], y_tensor[train_index]),
+        batch_size=batch_size, shuffle=True, generator=generator
+    )
+    if n_val == 0:
+        return train_loader, None
+    # 驗證集不需要打亂，用較大的批次減少迴圈次數
+    val_loader = DataLoader(
+        TensorDataset(X_tensor[val_index], y_tensor[val_index]), batch_size=batch_size * 8
+    )
+    return train_loader, val_loader
+
+
+class Trainer:
+    """帶提前停止的小批次訓練器"""
+
+    def __init__(self, model, loss_fn, *, lr=0.001, max_epochs=500, patience=20,
+                 num_threads=None, verbose=True):
+        """
+        :param model: 神經網路模型
+        :param loss_fn: 損失函式
+        :param lr: 學習率
+        :param max_epochs: 最大訓練輪數
+        :param patience: 驗證集損失連續多少輪沒有改善就停止訓練
+        :param num_threads: PyTorch在CPU上使用的執行緒數量（預設不修改）
+        :param verbose: 是否輸出每一輪的損失
+        """
+        self.model = model
+        self.loss_fn = loss_fn
+        self.optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+        self.max_epochs = max_epochs
+        self.patience = patience
+        self.verbose = verbose
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.history = []
+
+    def train_epoch(self, loader):
+        """訓練一輪，傳回(平均損失, 樣本數量)"""
+        self.model.train()
+        total_loss, total = 0.0, 0
+        for X_batch, y_batch in loader:
+            self.optimizer.zero_grad()
+            loss = self.loss_fn(self.model(X_batch), y_batch)
+            loss.backward()
+            self.optimizer.step()
+            total_loss += loss.item() * len(X_batch)
+            total += len(X_batch)
+        return total_loss / total, total
+
+    def evaluate(self, loader):
+        """計算模型在資料集上的平均損失"""
+        self.model.eval()
+        total_loss, total = 0.0, 0
+        with torch.inference_mode():
+            for X_batch, y_batch in loader:
+                total_loss += self.loss_fn(self.model(X_batch), y_batch).item() * len(X_batch)
+                total += len(X_batch)
+        if total == 0:
+            raise ValueError('資料集中沒有樣本')
+        return total_loss / total
+
+    def fit(self, train_loader, val_loader):
+        """
+        訓練模型，結束後模型的參數是驗證集損失最小的那一輪的參數
+        :param train_loader: 訓練集的DataLoader
+        :param val_loader: 驗證集的DataLoader（為None時用訓練集的損失決定是否提前停止）
+        :return: 訓練器本身
+        """
+        best_loss, best_state, waited = float('inf'), None, 0
+        samples, train_time = 0, 0.0
+        for epoch in range(1, self.max_epochs + 1):
+            start = time.perf_counter()
+            train_loss, n = self.train_epoch(train_loader)
+            train_time += time.perf_counter() - start
+            samples += n
+            val_loss = self.evaluate(val_loader) if val_loader is not None else train_loss
+            self.history.append((train_loss, val_loss))
+            if self.verbose and epoch % 16 == 0:
+                print(f'Epoch [{epoch} / {self.max_epochs}], Loss: {train_loss:.4f}, Val Loss: {val_loss:.4f}')
+            if val_loss < best_loss:
+                best_loss, best_state, waited = val_loss, copy.deepcopy(self.model.state_dict()), 0
+            else:
+                waited += 1
+                if waited >= self.patience:
+                    break
+        # 損失一直沒有改善（例如一直是NaN）時保留最後一輪的參數
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        self.best_loss = best_loss
+        self.epochs = epoch
+        self.train_throughput = samples / train_time
+        if self.verbose:
+            print(f'訓練了{epoch}輪, 最佳驗證集損失: {best_loss:.4f}, 訓練速度: {self.train_throughput:.0f}個樣本/秒')
+        return self
+
+
+def export_model(model, example, path, fmt='torchscript'):
+    """
+    匯出模型用於推論
+    :param model: 訓練好的模型
+    :param example: 一個批次的輸入樣本（用於追蹤計算圖）
+    :param path: 匯出的檔案路徑
+    :param fmt: 匯出格式 - torchscript或onnx
+    :return: 匯出的檔案路徑
+    """
+    model.eval()
+    if fmt == 'torchscript':
+        # inference_mode產生的張量不能被追蹤器保存，這裡只能用no_grad
+        with torch.no_grad():
+            torch.jit.trace(model, example).save(path)
+    elif fmt == 'onnx':
+        # 第0維（批次大小）設定為動態的，推論時可以使用任意大小的批次
+        with torch.no_grad():
+            torch.onnx.export(
+                model, (example, ), path, input_names=['x'], output_names=['y'],
+                dynamic_axes={'x': {0: 'batch'}, 'y': {0: 'batch'}}
+            )
+    else:
+        raise ValueError(f'不支援的匯出格式: {fmt}')
+    return path
+
+
+def load_exported(path):
+    """
+    載入匯出的模型，傳回一個接受NumPy陣列、傳回NumPy陣列的函式
+    :param path: TorchScript（.pt）或ONNX（.onnx）檔案的路徑
+    :return: 推論函式
+    """
+    if path.endswith('.onnx'):
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+        return lambda X: session.run(None, {'x': X.astype(np.float32, copy=False)})[0]
+    module = torch.jit.optimize_for_inference(torch.jit.load(path).eval())
+
+    def run(X):
+        with torch.inference_mode():
+            return module(torch.from_numpy(X.astype(np.float32, copy=False))).numpy()
+
+    return run
+
+
+def predict_batched(infer, X, batch_size=4096):
+    """
+    按批次推論
+    :param infer: load_exported傳回的推論函式
+    :param X: 樣本特徵
+    :param batch_size: 每批的樣本數量
+    :return: 二元組 - (模型輸出, 每秒處理的樣本數量)
+    """
+    X = np.asarray(X, dtype=np.float32)
+    start = time.perf_counter()
+    outputs = np.concatenate([infer(X[i:i + batch_size]) for i in range(0, len(X), batch_size)])
+    return outputs, len(X) / (time.perf_counter() - start)
+
+
+def main():
+    import tempfile
+
+    from sklearn.datasets import load_iris
+    from sklearn.metrics import accuracy_score, r2_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    torch.manual_seed(3)
+    # 鳶尾花分類
+    X, y = load_iris(return_X_y=True)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, train_size=0.8, random_state=3)
+    scaler = StandardScaler().fit(X_train)
+    X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    train_loader, val_loader = make_loaders(X_train, y_train, batch_size=16, random_state=3)
+    trainer = Trainer(IrisNN(), nn.CrossEntropyLoss(), lr=0.01, num_threads=1, verbose=False)
+    trainer.fit(train_loader, val_loader)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        example = torch.as_tensor(X_test[:1], dtype=torch.float32)
+        infer = load_exported(export_model(trainer.model, example, os.path.join(tmpdir, 'iris.pt')))
+        outputs, throughput = predict_batched(infer, X_test)
+    print(f'Accuracy: {accuracy_score(y_test, outputs.argmax(axis=1)):.2%}, '
+          f'訓練了{trainer.epochs}輪, 訓練速度: {trainer.train_throughput:.0f}個樣本/秒')
+
+    # 汽車油耗迴歸
+    X, y = load_prep_data()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, train_size=0.8, random_state=3)
+    scaler = StandardScaler().fit(X_train)
+    X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    train_loader, val_loader = make_loaders(X_train, y_train, regression=True, random_state=3)
+    trainer = Trainer(MLPRegressor(X_train.shape[1]), nn.MSELoss(), num_threads=1)
+    trainer.fit(train_loader, val_loader)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        example = torch.as_tensor(X_test[:1], dtype=torch.float32)
+        infer = load_exported(export_model(trainer.model, example, os.path.join(tmpdir, 'mpg.pt')))
+        y_pred, _ = predict_batched(infer, X_test)
+        # 用重複的樣本測試大批次推論的速度
+        _, throughput = predict_batched(infer, np.tile(X_test, (2500, 1)))
+    print(f'Test R2: {r2_score(y_test, y_pred.ravel()):.4f}, 推論速度: {throughput:.0f}個樣本/秒')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+查表式的樸素貝葉斯分類器（對應 84.樸素貝葉斯演算法 中的 naive_bayes_fit / naive_bayes_predict）
+
+- 分箱：訓練時記下每個特徵的等寬分箱邊界，預測時用同一組邊界（原來的程式碼對測試集重新 pd.cut，
+  訓練集和測試集的同一個箱子對應的其實是不同的取值範圍）
+- 似然性：用 bincount 一次統計出 [類別, 特徵, 箱子] 三維的頻次陣列，加上拉普拉斯平滑後取對數
+- 預測：用花式索引一次取出所有樣本每個特徵對應的對數似然性，沿特徵方向求和再加上對數先驗機率
+  對數機率相加代替機率相乘，不會因為連乘很多很小的機率而下溢成0
+- partial_fit：頻次可以累加，所以能一批一批的訓練流式資料
+"""
+import numpy as np
+
+
+class NaiveBayes:
+    """基於等寬分箱的樸素貝葉斯分類器"""
+
+    def __init__(self, bins=5, alpha=1.0):
+        """
+        :param bins: 每個特徵的分箱數量
+        :param alpha: 拉普拉斯平滑的參數
+        """
+        self.bins = bins
+        self.alpha = alpha
+
+    def _init_state(self, X, classes, ranges=None):
+        """根據第一批資料確定類別和分箱邊界"""
+        self.classes_ = np.unique(classes)
+        if ranges is None:
+            lows, highs = X.min(axis=0), X.max(axis=0)
+        else:
+            lows, highs = np.asarray(ranges, dtype=np.float64).T
+        self.lows_ = lows
+        self.widths_ = np.where(highs > lows, (highs - lows) / self.bins, 1.0)
+        n_classes, n_features = self.classes_.size, X.shape[1]
+        self.class_counts_ = np.zeros(n_classes)
+        self.feature_counts_ = np.zeros((n_classes, n_features, self.bins))
+
+    @property
+    def bin_edges_(self):
+        """每個特徵的分箱邊界，形狀為(n_features, bins + 1)"""
+        return self.lows_[:, np.newaxis] + np.outer(self.widths_, np.arange(self.bins + 1))
+
+    def discretize(self, X):
+        """
+        用訓練時得到的邊界對特徵分箱（超出訓練範圍的值放進兩端的箱子）
+        :param X: 樣本特徵
+        :return: 每個特徵值所在箱子的序號（0到bins-1）
+        """
+        X = np.asarray(X, dtype=np.float64)
+        index = np.floor((X - self.lows_) / self.widths_).astype(np.intp)
+        return np.clip(index, 0, self.bins - 1)
+
+    def partial_fit(self, X, y, classes=None, ranges=None):
+        """
+        用一批資料增量訓練模型
+        :param X: 樣本特徵
+        :param y: 樣本標籤
+        :param classes: 所有可能的類別（第一次呼叫時指定，預設取y中出現的類別）
+        :param ranges: 每個特徵的(最小值, 最大值)（第一次呼叫時指定，預設取X的範圍）
+        :return: 模型本身
+        """
+        X, y = np.asarray(X, dtype=np.float64), np.asarray(y)
+        if not hasattr(self, 'classes_'):
+            self._init_state(X, np.unique(y) if classes is None else classes, ranges)
+        n_classes, n_features = self.classes_.size, X.shape[1]
+        if not np.isin(y, self.classes_).all():
+            raise ValueError('y中有第一次訓練時沒有指定的類別')
+        class_index = np.searchsorted(self.classes_, y)
+        self.class_counts_ += np.bincount(class_index, minlength=n_classes)
+        # 將(類別, 特徵, 箱子)三元組編碼成一個整數，用一次bincount完成所有計數
+        flat = (class_index[:, np.newaxis] * n_features + np.arange(n_features)) * self.bins
+        flat += self.discretize(X)
+        self.feature_counts_ += np.bincount(
+            flat.ravel(), minlength=self.feature_counts_.size
+        ).reshape(self.feature_counts_.shape)
+        self._update_log_probs()
+        return self
+
+    def fit(self, X, y, ranges=None):
+        """
+        訓練模型
+        :param X: 樣本特徵
+        :param y: 樣本標籤
+        :param ranges: 每個特徵的(最小值, 最大值)（預設取X的範圍）
+        :return: 模型本身
+        """
+        for attr in ('classes_', 'class_counts_', 'feature_counts_'):
+            self.__dict__.pop(attr, None)
+        return self.partial_fit(X, y, ranges=ranges)
+
+    def _update_log_probs(self):
+        """根據頻次計算（平滑後的）對數先驗機率和對數似然性"""
+        # 增量訓練時可能還沒有見過某個類別，它的對數先驗機率是負無窮
+        with np.errstate(divide='ignore'):
+            self.log_prior_ = np.log(self.class_counts_ / self.class_counts_.sum())
+        smoothed = self.feature_counts_ + self.alpha
+        self.log_likelihood_ = np.log(smoothed / smoothed.sum(axis=2, keepdims=True))
+
+    def predict_log_joint(self, X):
+        """
+        計算每個樣本屬於每個類別的對數聯合機率
+        :param X: 樣本特徵
+        :return: 形狀為(n_samples, n_classes)的陣列
+        """
+        bins = self.discretize(X)
+        # 花式索引：結果的形狀是(n_classes, n_samples, n_features)
+        gathered = self.log_likelihood_[:, np.arange(bins.shape[1]), bins]
+        return gathered.sum(axis=2).T + self.log_prior_
+
+    def predict_proba(self, X):
+        """計算後驗機率"""
+        joint = self.predict_log_joint(X)
+        joint -= joint.max(axis=1, keepdims=True)
+        probs = np.exp(joint)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        """預測標籤"""
+        return self.classes_[self.predict_log_joint(X).argmax(axis=1)]
+
+
+def naive_bayes_fit(X, y, bins=5, alpha=1.0):
+    """
+    訓練樸素貝葉斯分類器
+    :param X: 樣本特徵
+    :param y: 樣本標籤
+    :param bins: 每個特徵的分箱數量
+    :param alpha: 拉普拉斯平滑的參數
+    :return: 訓練好的模型
+    """
+    return NaiveBayes(bins, alpha).fit(X, y)
+
+
+def naive_bayes_predict(X, model):
+    """
+    樸素貝葉斯分類器預測
+    :param X: 樣本特徵
+    :param model: naive_bayes_fit傳回的模型
+    :return: 預測的標籤
+    """
+    return model.predict(X)
+
+
+if __name__ == '__main__':
+    from sklearn.datasets import load_iris
+    from sklearn.model_selection import train_test_split
+
+    iris = load_iris()
+    X, y = iris.data, iris.target
+    X_train, X_test, y_train, y_test = train_test_split(X, y, train_size=0.8, random_state=3)
+    model = naive_bayes_fit(X_train, y_train)
+    print('準確率:', np.mean(naive_bayes_predict(X_test, model) == y_test))
+    # 分成三批增量訓練得到的模型跟一次訓練的結果相同
+    stream_model = NaiveBayes()
+    ranges = np.column_stack((X_train.min(axis=0), X_train.max(axis=0)))
+    for X_batch, y_batch in zip(np.array_split(X_train, 3), np.array_split(y_train, 3)):
+        stream_model.partial_fit(X_batch, y_batch, classes=[0, 1, 2], ranges=ranges)
+    print('增量訓練準確率:', np.mean(stream_model.predict(X_test) == y_test))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+predict_server 的壓力測試
+
+訓練一個小模型存成 model.pkl，在本機背景執行緒中啟動預測服務，
+用多個執行緒併發送出請求，最後印出客戶端看到的吞吐量以及服務端 /metrics 的統計資料。
+用法：python3 predict_load_test.py [請求數量] [併發數量]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+import joblib
+import numpy as np
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from predict_server import create_app
+
+
+def make_model(path):
+    """訓練一個邏輯回歸模型並存到指定的路徑，傳回(特徵的名字, 樣本)"""
+    import pandas as pd
+    from sklearn.datasets import load_breast_cancer
+    from sklearn.linear_model import LogisticRegression
+
+    data = load_breast_cancer()
+    columns = [f'f{i}' for i in range(data.data.shape[1])]
+    model = LogisticRegression(max_iter=5000)
+    model.fit(pd.DataFrame(data.data, columns=columns), data.target)
+    joblib.dump(model, path)
+    return columns, data.data
+
+
+class QuietHandler(WSGIRequestHandler):
+    """不輸出每個請求的日誌（否則終端輸出會拖慢測試）"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_server(app, host='127.0.0.1'):
+    """在背景執行緒中啟動服務（埠號由作業系統分配），傳回(服務, 網址)"""
+    server = make_server(host, 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def post(url, payload):
+    """送出一個JSON請求並傳回解析後的回應"""
+    req = Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    with urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'model.pkl')
+        columns, X = make_model(path)
+        server, base_url = start_server(create_app(path))
+        rng = np.random.default_rng(3)
+        payloads = [
+            [dict(zip(columns, row)) for row in X[rng.integers(len(X), size=2)].tolist()]
+            for _ in range(total)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda payload: post(f'{base_url}/predict', payload), payloads))
+        elapsed = time.perf_counter() - start
+        assert all(len(result['result']) == 2 for result in results)
+        print(f'{total}個請求, {concurrency}個併發, 耗時{elapsed:.3f}秒, {total / elapsed:.1f}個請求/秒')
+        with urlopen(f'{base_url}/metrics') as resp:
+            print(json.loads(resp.read()))
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
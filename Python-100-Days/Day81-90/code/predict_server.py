@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+模型預測服務（對應 90.機器學習實戰 中的 Flask 應用）
+
+原來的 /predict 每次請求都要 joblib.load 反序列化模型，再建立一個 DataFrame 和 DMatrix，
+延遲主要花在載入模型上。這裡的做法是：
+- ModelHolder：模型只載入一次，檔案的修改時間變了才重新載入（熱更新）
+- MicroBatcher：把一小段時間視窗內同時到達的請求合併成一個批次，只建立一次 DataFrame、
+  只呼叫一次 predict，再把結果分給各個請求
+- LatencyStats：記錄最近的請求延遲，/metrics 傳回 p50、p99 延遲和吞吐量
+啟動服務：python3 predict_server.py model.pkl
+壓力測試：python3 predict_load_test.py
+"""
+import os
+import queue
+import sys
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from flask import Flask, jsonify, request
+
+
+class ModelHolder:
+    """持有模型並在檔案更新時重新載入"""
+
+    def __init__(self, path, check_interval=1.0):
+        """
+        :param path: 模型檔案的路徑
+        :param check_interval: 檢查檔案修改時間的間隔（秒）
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.model, self.mtime, self.checked = None, None, 0.0
+        self.reloads, self.reload_errors = 0, 0
+        self._reload_if_changed()
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime != self.mtime:
+                self.model, self.mtime = joblib.load(self.path), mtime
+                self.reloads += 1
+        except Exception:
+            # 第一次載入失敗時直接拋出異常；熱更新時檔案可能還沒寫完，繼續使用原來的模型，下次檢查時再重新載入
+            if self.model is None:
+                raise
+            self.reload_errors += 1
+        self.checked = time.monotonic()
+
+    def get(self):
+        """取得模型（每隔check_interval秒檢查一次檔案是否更新）"""
+        if time.monotonic() - self.checked >= self.check_interval:
+            with self.lock:
+                if time.monotonic() - self.checked >= self.check_interval:
+                    self._reload_if_changed()
+        return self.model
+
+
+def default_predict(model, frame):
+    """
+    用模型預測一個批次
+    :param model: scikit-learn的模型或XGBoost的Booster
+    :param frame: 批次中所有樣本構成的DataFrame
+    :return: 預測結果構成的列表
+    """
+    if type(model).__name__ == 'Booster':
+        import xgboost as xgb
+        return (model.predict(xgb.DMatrix(frame)) > 0.5).tolist()
+    columns = getattr(model, 'feature_names_in_', None)
+    if columns is not None:
+        frame = frame[list(columns)]
+    return np.asarray(model.predict(frame)).tolist()
+
+
+def to_records(payload):
+    """把請求的JSON（記錄的列表或列名到值列表的字典）轉換成記錄的列表"""
+    if isinstance(payload, dict):
+        columns = list(payload)
+        return [dict(zip(columns, values)) for values in zip(*payload.values())]
+    return list(payload)
+
+
+class MicroBatcher:
+    """把併發的請求合併成批次執行"""
+
+    def __init__(self, holder, predict_fn=default_predict, max_batch=256, max_wait=0.005):
+        """
+        :param holder: ModelHolder物件
+        :param predict_fn: 用模型預測一個批次的函式
+        :param max_batch: 一個批次最多包含的樣本數量
+        :param max_wait: 收到第一個請求之後最多等待多久湊成一個批次（秒）
+        """
+        self.holder = holder
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.batches, self.batched_rows = 0, 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, records):
+        """提交一個請求的樣本，傳回Future物件"""
+        future = Future()
+        self.requests.put((records, future))
+        return future
+
+    def _collect(self):
+        """等待第一個請求，然後在時間視窗內盡量多收集一些請求"""
+        pending = [self.requests.get()]
+        rows = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            records = [record for item, _ in pending for record in item]
+            try:
+                model = self.holder.get()
+            except Exception as err:
+                # 任何異常都不能結束這個迴圈，否則之後所有的請求都會一直等待
+                for _, future in pending:
+                    future.set_exception(err)
+                continue
+            try:
+                results = self.predict_fn(model, pd.DataFrame.from_records(records))
+            except Exception as err:
+                if len(pending) == 1:
+                    pending[0][1].set_exception(err)
+                else:
+                    # 不知道是哪個請求的資料有問題，逐個重新預測，只讓有問題的請求失敗
+                    self._run_one_by_one(model, pending)
+                continue
+            self.batches += 1
+            self.batched_rows += len(records)
+            start = 0
+            for item, future in pending:
+                future.set_result(results[start:start + len(item)])
+                start += len(item)
+
+    def _run_one_by_one(self, model, pending):
+        for item, future in pending:
+            try:
+                future.set_result(self.predict_fn(model, pd.DataFrame.from_records(item)))
+            except Exception as err:
+                future.set_exception(err)
+            else:
+                self.batches += 1
+                self.batched_rows += len(item)
+
+
+class LatencyStats:
+    """記錄請求的延遲和吞吐量"""
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.count = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+            self.count += 1
+
+    def summary(self):
+        """傳回p50、p99延遲（毫秒）和平均每秒處理的請求數"""
+        with self.lock:
+            latencies = np.array(self.latencies)
+            count = self.count
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies.size else (0.0, 0.0)
+        return {
+            'requests': count,
+            'p50_ms': round(float(p50), 3),
+            'p99_ms': round(float(p99), 3),
+            'throughput': round(count / (time.monotonic() - self.started), 1),
+        }
+
+
+def create_app(model_path='model.pkl', predict_fn=default_predict, max_batch=256, max_wait=0.005, timeout=10.0):
+    """
+    建立Flask應用
+    :param model_path: 模型檔案的路徑
+    :param predict_fn: 用模型預測一個批次的函式
+    :param max_batch: 一個批次最多包含的樣本數量
+    :param max_wait: 湊成一個批次最多等待的時間（秒）
+    :param timeout: 每個請求等待預測結果的最長時間（秒），超時傳回504
+    :return: Flask應用
+    """
+    app = Flask(__name__)
+    holder = ModelHolder(model_path)
+    batcher = MicroBatcher(holder, predict_fn, max_batch, max_wait)
+    stats = LatencyStats()
+
+    @app.route('/predict', methods=['POST'])
+    def predict():
+        start = time.perf_counter()
+        try:
+            y_pred = batcher.submit(to_records(request.json)).result(timeout=timeout)
+        except FutureTimeoutError:
+            return jsonify({'message': 'prediction timed out'}), 504
+        stats.record(time.perf_counter() - start)
+        return jsonify({'message': 'OK', 'result': y_pred})
+
+    @app.route('/metrics')
+    def metrics():
+        summary = stats.summary()
+        summary['batches'] = batcher.batches
+        summary['avg_batch_size'] = round(batcher.batched_rows / max(batcher.batches, 1), 2)
+        summary['model_reloads'] = holder.reloads
+        summary['model_reload_errors'] = holder.reload_errors
+        return jsonify(summary)
+
+    return app
+
+
+if __name__ == '__main__':
+    create_app(sys.argv[1] if len(sys.argv) > 1 else 'model.pkl').run(threaded=True)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+回歸模型的數值工具（對應 81.淺談機器學習 中的範例5到範例8）
+
+- get_loss：斜率和截距可以是陣列，一次廣播就能算出一整組候選參數的均方誤差
+- random_search / grid_search：範例8的隨機搜尋以及網格搜尋，所有候選參數的損失按批次一次算完
+- least_squares：最小二乘法的閉式解，一次求出斜率和截距
+- gradient_descent：向量化的小批次梯度下降
+- predict_by_knn：一次回答多個查詢的kNN回歸
+"""
+import time
+
+import numpy as np
+
+
+def get_loss(X, y, a, b):
+    """
+    損失函式（支援一次計算多組參數）
+    :param X: 迴歸模型的自變數（一維）
+    :param y: 迴歸模型的因變數
+    :param a: 迴歸模型的斜率（純量或任意形狀的陣列）
+    :param b: 迴歸模型的截距（形狀要能跟a廣播）
+    :return: MSE（均方誤差），形狀跟a和b廣播後的形狀相同
+    """
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    # 在最後增加一個維度對應樣本，預測值的形狀是(..., n_samples)
+    y_hat = a[..., np.newaxis] * X + b[..., np.newaxis]
+    return np.mean((y - y_hat) ** 2, axis=-1)
+
+
+def _best_of(X, y, a, b, batch_size):
+    """按批次計算候選參數的損失，傳回最小損失對應的(a, b, loss)"""
+    best = (None, None, np.inf)
+    for start in range(0, a.size, batch_size):
+        losses = get_loss(X, y, a[start:start + batch_size], b[start:start + batch_size])
+        i = losses.argmin()
+        if losses[i] < best[2]:
+            best = (a[start + i], b[start + i], losses[i])
+    return best
+
+
+def random_search(X, y, n=100000, a_range=(0, 1), b_range=(-2000, 2000),
+                  batch_size=10000, random_state=None):
+    """
+    隨機產生斜率和截距，找出損失最小的一組
+    :param X: 迴歸模型的自變數
+    :param y: 迴歸模型的因變數
+    :param n: 候選參數的數量
+    :param a_range: 斜率的取值範圍
+    :param b_range: 截距的取值範圍
+    :param batch_size: 每批計算的候選參數數量（控制記憶體用量）
+    :param random_state: 隨機數種子
+    :return: 三元組 - (斜率, 截距, 最小損失)
+    """
+    rng = np.random.default_rng(random_state)
+    a = rng.uniform(*a_range, size=n)
+    b = rng.uniform(*b_range, size=n)
+    return _best_of(X, y, a, b, batch_size)
+
+
+def grid_search(X, y, a_values, b_values, batch_size=10000):
+    """
+    在斜率和截距構成的網格上找出損失最小的一組
+    :param X: 迴歸模型的自變數
+    :param y: 迴歸模型的因變數
+    :param a_values: 斜率的候選值
+    :param b_values: 截距的候選值
+    :param batch_size: 每批計算的候選參數數量（控制記憶體用量）
+    :return: 三元組 - (斜率, 截距, 最小損失)
+    """
+    a, b = np.meshgrid(a_values, b_values, indexing='ij')
+    return _best_of(X, y, a.ravel(), b.ravel(), batch_size)
+
+
+def least_squares(X, y):
+    """
+    最小二乘法的閉式解
+    :param X: 迴歸模型的自變數（一維時傳回的斜率是純量，二維時每一列是一個特徵）
+    :param y: 迴歸模型的因變數
+    :return: 二元組 - (斜率, 截距)
+    """
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    features = X.reshape(len(X), -1)
+    # 增加一列1對應截距，用lstsq求解（比直接求逆矩陣數值上更穩定）
+    design = np.column_stack((features, np.ones(len(X))))
+    coef, *_ = np.linalg.lstsq(design, y, rcond=None)
+    a, b = coef[:-1], coef[-1]
+    return (a[0] if X.ndim == 1 else a), b
+
+
+def gradient_descent(X, y, *, lr=0.1, epochs=100, batch_size=32, random_state=None):
+    """
+    小批次梯度下降
+    特徵和目標值會先標準化（否則收入這種數量級的特徵需要非常小的學習率），
+    求出的參數再換算回原始的尺度
+    :param X: 迴歸模型的自變數（一維或二維）
+    :param y: 迴歸模型的因變數
+    :param lr: 學習率
+    :param epochs: 遍歷資料的輪數
+    :param batch_size: 每個小批次的樣本數量
+    :param random_state: 隨機數種子
+    :return: 二元組 - (斜率, 截距)
+    """
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    features = X.reshape(len(X), -1)
+    X_mean, X_std = features.mean(axis=0), features.std(axis=0)
+    y_mean, y_std = y.mean(), y.std()
+    X_std[X_std == 0], y_std = 1, y_std or 1
+    Z, t = (features - X_mean) / X_std, (y - y_mean) / y_std
+    rng = np.random.default_rng(random_state)
+    w, c = np.zeros(Z.shape[1]), 0.0
+    for _ in range(epochs):
+        order = rng.permutation(len(Z))
+        for start in range(0, len(Z), batch_size):
+            batch = order[start:start + batch_size]
+            # 整個小批次的誤差和梯度都是一次陣列運算
+            error = Z[batch] @ w + c - t[batch]
+            w -= lr * 2 * Z[batch].T @ error / batch.size
+            c -= lr * 2 * error.mean()
+    a = w * y_std / X_std
+    b = y_mean + y_std * c - a @ X_mean
+    return (a[0] if X.ndim == 1 else a), b
+
+
+def predict_by_knn(X, y, queries, k=5, block_size=4096):
+    """
+    用kNN演算法做預測（一次處理多個查詢）
+    :param X: 歷史資料的自變數（一維）
+    :param y: 歷史資料的因變數
+    :param queries: 模型的輸入（純量或一維陣列）
+    :param k: 鄰居數量（預設值為5）
+    :param block_size: 每一塊查詢的數量（控制距離矩陣的記憶體用量）
+    :return: 模型的輸出（預測值），形狀跟queries相同
+    """
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    queries = np.asarray(queries, dtype=np.float64)
+    flat = queries.ravel()
+    results = np.empty(flat.size)
+    for start in range(0, flat.size, block_size):
+        block = flat[start:start + block_size]
+        dists = (block[:, np.newaxis] - X) ** 2
+        neighbors = np.argpartition(dists, k - 1, axis=1)[:, :k]
+        results[start:start + block_size] = y[neighbors].mean(axis=1)
+    return results.reshape(queries.shape)
+
+
+def main():
+    """用範例中的收入和網購支出資料比較幾種求解方式"""
+    x = np.array([
+        9558, 8835, 9313, 14990, 5564, 11227, 11806, 10242, 11999, 11630,
+        6906, 13850, 7483, 8090, 9465, 9938, 11414, 3200, 10731, 19880,
+        15500, 10343, 11100, 10020, 7587, 6120, 5386, 12038, 13360, 10885,
+        17010, 9247, 13050, 6691, 7890, 9070, 16899, 8975, 8650, 9100,
+        10990, 9184, 4811, 14890, 11313, 12547, 8300, 12400, 9853, 12890
+    ])
+    y = np.array([
+        3171, 2183, 3091, 5928, 182, 4373, 5297, 3788, 5282, 4166,
+        1674, 5045, 1617, 1707, 3096, 3407, 4674, 361, 3599, 6584,
+        6356, 3859, 4519, 3352, 1634, 1032, 1106, 4951, 5309, 3800,
+        5672, 2901, 5439, 1478, 1424, 2777, 5682, 2554, 2117, 2845,
+        3867, 2962, 882, 5435, 4174, 4948, 2376, 4987, 3329, 5002
+    ])
+    solvers = (
+        ('隨機搜尋', lambda: random_search(x, y, random_state=3)[:2]),
+        ('網格搜尋', lambda: grid_search(x, y, np.linspace(0, 1, 501), np.linspace(-2000, 2000, 801))[:2]),
+        ('最小二乘法', lambda: least_squares(x, y)),
+        ('梯度下降', lambda: gradient_descent(x, y, random_state=3)),
+    )
+    for name, solver in solvers:
+        start = time.perf_counter()
+        a, b = solver()
+        elapsed = time.perf_counter() - start
+        print(f'{name}: {a = :.4f}, {b = :.1f}, MSE = {get_loss(x, y, a, b):.1f}, 耗時{elapsed:.4f}秒')
+    incomes = np.array([1800, 3500, 5200, 6600, 13400, 17800, 20000, 30000])
+    for income, outcome in zip(incomes, predict_by_knn(x, y, incomes)):
+        print(f'月收入: {income:>5d}元, 月網購支出: {outcome:>6.1f}元')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+行程池共用的訓練資料（decision_tree.RandomForest 和 experiment.Experiment 使用）
+
+主行程用 to_shared 把陣列複製到共享記憶體，行程池以 attach 作為初始化函式，
+每個行程連接到同一塊共享記憶體，之後透過 shared['X'] 和 shared['y'] 取得陣列，不需要序列化整個資料集。
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 行程池中的每個行程從共享記憶體中取得的訓練資料：名字 -> (共享記憶體物件, 陣列)
+shared = {}
+
+
+def attach(X_spec, y_spec):
+    """行程池的初始化函式：連接到共享記憶體"""
+    for name, (shm_name, shape, dtype) in (('X', X_spec), ('y', y_spec)):
+        shm = shared_memory.SharedMemory(name=shm_name)
+        shared[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def to_shared(array):
+    """把陣列複製到共享記憶體，傳回(共享記憶體物件, 連接需要的資訊)"""
+    if array.dtype.hasobject:
+        # object陣列中存的是指標，其他行程拿到的只是無效的位址
+        raise ValueError('object型別的陣列不能放進共享記憶體，請先轉換成數值型別')
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype)
+
+
+def release(*shms):
+    """關閉並刪除共享記憶體"""
+    for shm in shms:
+        shm.close()
+        shm.unlink()
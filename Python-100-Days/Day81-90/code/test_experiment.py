@@ -0,0 +1,27 @@
+import tempfile
+
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from experiment import Experiment
+
+
+class TestExperiment(TestCase):
+    """測試模型實驗工具的測試用例"""
+
+    def test_split_cache_with_string_labels(self):
+        from sklearn.datasets import load_iris
+        from sklearn.preprocessing import StandardScaler
+
+        iris = load_iris()
+        X = pd.DataFrame(iris.data).astype(object)
+        y = pd.Series(iris.target_names[iris.target]).astype(object)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            first = Experiment(X, y, preprocessor=StandardScaler(), cache_dir=tmpdir).split()
+            # 第二次執行讀取磁碟上的快取
+            second = Experiment(X, y, preprocessor=StandardScaler(), cache_dir=tmpdir).split()
+        for expected, actual in zip(first, second):
+            np.testing.assert_array_equal(expected, actual)
+        self.assertEqual({'setosa', 'versicolor', 'virginica'}, set(second[2]))
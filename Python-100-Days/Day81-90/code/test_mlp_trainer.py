@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from mlp_trainer import IrisNN, Trainer, export_model, load_exported, make_loaders, predict_batched
+
+
+class TestMLPTrainer(TestCase):
+    """測試神經網路訓練工具的測試用例"""
+
+    def setUp(self):
+        torch.manual_seed(0)
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(60, 4)).astype(np.float32)
+        self.y = (self.X[:, 0] > 0).astype(np.int64) + (self.X[:, 1] > 0)
+
+    def test_fit_export_and_reload(self):
+        train_loader, val_loader = make_loaders(self.X, self.y, batch_size=8, random_state=0)
+        trainer = Trainer(IrisNN(), torch.nn.CrossEntropyLoss(), lr=0.01, max_epochs=30,
+                          patience=5, verbose=False)
+        trainer.fit(train_loader, val_loader)
+        self.assertLessEqual(trainer.epochs, 30)
+        self.assertEqual(trainer.epochs, len(trainer.history))
+        trainer.model.eval()
+        with torch.no_grad():
+            expected = trainer.model(torch.from_numpy(self.X)).numpy()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = export_model(trainer.model, torch.from_numpy(self.X[:1]), os.path.join(tmpdir, 'tiny.pt'))
+            outputs, _ = predict_batched(load_exported(path), self.X, batch_size=16)
+        np.testing.assert_allclose(expected, outputs, rtol=1e-4, atol=1e-5)
+
+    def test_small_validation_split(self):
+        # 樣本很少時驗證集至少有一個樣本，val_size為0時不劃分驗證集
+        _, val_loader = make_loaders(self.X[:3], self.y[:3], val_size=0.2)
+        self.assertEqual(1, len(val_loader.dataset))
+        train_loader, val_loader = make_loaders(self.X[:3], self.y[:3], val_size=0)
+        self.assertIsNone(val_loader)
+        trainer = Trainer(IrisNN(), torch.nn.CrossEntropyLoss(), max_epochs=3, verbose=False)
+        trainer.fit(train_loader, val_loader)
+        self.assertEqual(3, trainer.epochs)
+
+    def test_loss_never_improves(self):
+        # 損失一直是NaN時不會因為沒有最佳參數而出錯
+        train_loader, val_loader = make_loaders(self.X, self.y, random_state=0)
+        trainer = Trainer(IrisNN(), lambda output, target: output.sum() * float('nan'),
+                          max_epochs=10, patience=2, verbose=False)
+        trainer.fit(train_loader, val_loader)
+        self.assertEqual(2, trainer.epochs)
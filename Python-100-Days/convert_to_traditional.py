@@ -1,104 +1,244 @@
 #!/usr/bin/env python3
 """
 轉換腳本：將所有 .md 檔案從簡體中文轉成繁體中文，並提取 Python 代碼生成 .py 檔
+
+- 只走訪一次目錄樹，每個檔案只讀取一次，轉換和提取代碼在同一個步驟中完成
+- 轉換在行程池中進行，每個行程持有自己的 OpenCC 物件
+- 內容有變化才寫入檔案，先寫入暫存檔再改名（atomic write），中途失敗不會留下寫了一半的檔案
+- 清單檔案（manifest）記錄每個 .md 檔案處理後的大小、修改時間和 SHA-256，
+  再次執行時大小和修改時間沒變的檔案直接跳過，變了也會先比對雜湊值
+- 加上 --rename 參數時在同一次走訪中收集路徑，轉換完成後用 rename_to_traditional.RenamePlanner 重命名
 """
 
+import hashlib
+import json
 import os
 import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from opencc import OpenCC
-
-# 初始化 OpenCC 轉換器 (簡體轉繁體台灣標準)
-cc = OpenCC('s2twp')
 
+from opencc import OpenCC
 
-def convert_file_to_traditional(file_path: Path) -> None:
-    """將單一檔案轉換成繁體中文"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+MANIFEST_NAME = '.convert_manifest.json'
+CODE_PATTERN = re.compile(r'```python\s*\n(.*?)```', re.DOTALL)
 
-        # 轉換成繁體中文
-        traditional_content = cc.convert(content)
+# 每個行程自己的 OpenCC 轉換器 (簡體轉繁體台灣標準)
+cc = None
 
-        # 寫回原檔案
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(traditional_content)
 
-        print(f"已轉換: {file_path}")
-    except Exception as e:
-        print(f"轉換失敗 {file_path}: {e}")
+def init_converter() -> None:
+    """行程池的初始化函式：建立 OpenCC 轉換器"""
+    global cc
+    cc = OpenCC('s2twp')
 
 
-def extract_python_code(md_file_path: Path) -> None:
-    """從 markdown 檔案提取 Python 代碼並生成 .py 檔"""
-    try:
-        with open(md_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+def walk_files(base_dir: Path, suffix: str = '.md', visit=None):
+    """
+    走訪目錄樹（跳過 .git 目錄），產生指定副檔名的檔案路徑
+    :param visit: 每個檔案和資料夾的路徑都會傳給這個函式（例如 RenamePlanner.add）
+    """
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = [name for name in dirs if name != '.git']
+        if visit is not None:
+            for name in dirs + files:
+                visit(Path(root) / name)
+        for name in files:
+            if name.endswith(suffix):
+                yield Path(root) / name
 
-        # 找出所有 Python 代碼區塊
-        pattern = r'```python\s*\n(.*?)```'
-        matches = re.findall(pattern, content, re.DOTALL)
 
-        if not matches:
-            return
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-        # 生成 .py 檔案名稱
-        py_file_name = md_file_path.stem + '.py'
-        py_file_path = md_file_path.parent / py_file_name
 
-        # 合併所有 Python 代碼區塊
-        code_blocks = []
-        for i, code in enumerate(matches, 1):
-            code = code.strip()
-            if code:
-                code_blocks.append(f"# === 範例 {i} ===\n{code}")
-
-        if code_blocks:
-            full_code = f'''#!/usr/bin/env python3
+def write_if_changed(path: Path, content: str) -> bool:
+    """內容有變化時以原子操作寫入檔案，回傳是否寫入"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if path.exists():
+            os.chmod(temp_path, path.stat().st_mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+
+def extract_python_code(md_name: str, content: str) -> str | None:
+    """從 markdown 內容提取 Python 代碼，回傳 .py 檔的內容（沒有代碼時回傳 None）"""
+    code_blocks = []
+    for i, code in enumerate(CODE_PATTERN.findall(content), 1):
+        code = code.strip()
+        if code:
+            code_blocks.append(f"# === 範例 {i} ===\n{code}")
+
+    if not code_blocks:
+        return None
+
+    return f'''#!/usr/bin/env python3
 """
-從 {md_file_path.name} 提取的 Python 範例代碼
+從 {md_name} 提取的 Python 範例代碼
 """
 
 {chr(10).join(code_blocks)}
 '''
-            with open(py_file_path, 'w', encoding='utf-8') as f:
-                f.write(full_code)
 
-            print(f"已生成: {py_file_path}")
-    except Exception as e:
-        print(f"提取代碼失敗 {md_file_path}: {e}")
 
-
-def main():
-    """主程序"""
-    base_dir = Path(__file__).parent
-
-    # 找出所有 .md 檔案
-    md_files = list(base_dir.rglob('*.md'))
-    print(f"找到 {len(md_files)} 個 markdown 檔案\n")
-
-    print("=" * 50)
-    print("步驟 1: 轉換成繁體中文")
-    print("=" * 50)
-
-    for md_file in md_files:
-        # 跳過 .git 目錄
-        if '.git' in str(md_file):
+def convert_file(md_file_path: Path, content: str, rename: bool = False) -> dict:
+    """
+    轉換單一 .md 檔案並生成 .py 檔，回傳處理結果（寫入 manifest 的資訊）
+    :param rename: 檔案之後會被重命名（.py 檔開頭的說明使用轉換後的檔名）
+    """
+    # 轉換成繁體中文
+    traditional_content = cc.convert(content)
+    md_changed = write_if_changed(md_file_path, traditional_content)
+
+    md_name = cc.convert(md_file_path.name) if rename else md_file_path.name
+    py_content = extract_python_code(md_name, traditional_content)
+    py_changed = False
+    if py_content is not None:
+        py_changed = write_if_changed(md_file_path.with_suffix('.py'), py_content)
+
+    # 記錄的是轉換「之後」的大小、修改時間和雜湊值：s2twp 不是冪等的（轉換過的內容再轉一次可能還會變），
+    # 所以下次執行時只要檔案還是這次轉換的結果就直接跳過，不會再轉換一次
+    stat = md_file_path.stat()
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256(traditional_content),
+        'has_code': py_content is not None,
+        'md_changed': md_changed,
+        'py_changed': py_changed,
+    }
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def is_up_to_date(md_file_path: Path, entry: dict | None) -> tuple[bool, str | None]:
+    """
+    根據 manifest 判斷檔案是否已經處理過
+    回傳 (是否跳過, 檔案內容)，需要讀取內容才能判斷時順便回傳內容，避免再讀一次
+    """
+    if entry is None:
+        return False, None
+    if entry['has_code'] and not md_file_path.with_suffix('.py').exists():
+        return False, None
+    stat = md_file_path.stat()
+    if (stat.st_size, stat.st_mtime_ns) == (entry['size'], entry['mtime_ns']):
+        return True, None
+    with open(md_file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return sha256(content) == entry['sha256'], content
+
+
+def convert_tree(base_dir: Path, workers: int | None = None, force: bool = False,
+                 planner=None, dry_run: bool = False) -> dict:
+    """
+    轉換目錄樹中所有的 .md 檔案
+    :param base_dir: 根目錄
+    :param workers: 行程數量（預設為CPU核數）
+    :param force: 是否忽略 manifest 處理所有檔案
+    :param planner: rename_to_traditional.RenamePlanner 物件，轉換完成後按它的計畫重命名（None 表示不重命名）
+    :param dry_run: 只印出重命名計畫，不實際重命名
+    :return: 統計資訊
+    """
+    manifest_path = base_dir / MANIFEST_NAME
+    manifest = {} if force else load_manifest(manifest_path)
+    new_manifest, pending, failed = {}, [], 0
+    for md_file in walk_files(base_dir, visit=planner.add if planner is not None else None):
+        key = md_file.relative_to(base_dir).as_posix()
+        try:
+            skip, content = is_up_to_date(md_file, manifest.get(key))
+            if skip:
+                new_manifest[key] = manifest[key]
+                continue
+            if content is None:
+                with open(md_file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            # 無法讀取或不是 UTF-8 編碼的檔案只算這個檔案失敗，其他檔案照常處理
+            print(f"轉換失敗 {md_file}: {e}")
+            failed += 1
             continue
-        convert_file_to_traditional(md_file)
+        pending.append((key, md_file, content))
+
+    stats = {'total': len(new_manifest) + len(pending) + failed, 'skipped': len(new_manifest),
+             'converted': 0, 'generated': 0, 'failed': failed}
+    if pending:
+        # 沒有需要處理的檔案時不建立行程池
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_converter) as pool:
+            futures = [(key, md_file, pool.submit(convert_file, md_file, content, planner is not None))
+                       for key, md_file, content in pending]
+            for key, md_file, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"轉換失敗 {md_file}: {e}")
+                    stats['failed'] += 1
+                    continue
+                if result.pop('md_changed'):
+                    print(f"已轉換: {md_file}")
+                    stats['converted'] += 1
+                if result.pop('py_changed'):
+                    print(f"已生成: {md_file.with_suffix('.py')}")
+                    stats['generated'] += 1
+                new_manifest[key] = result
+
+    if planner is not None:
+        # 剛生成的 .py 檔也要重命名（跟 .md 檔同名）
+        for key, entry in new_manifest.items():
+            if entry['has_code']:
+                planner.add((base_dir / key).with_suffix('.py'))
+        from rename_to_traditional import apply_plan, report_collisions
+
+        plan = planner.plan()
+        report_collisions(planner)
+        stats['renamed'] = apply_plan(plan, dry_run)
+        if not dry_run:
+            # manifest 使用重命名之後的路徑，下次執行才能直接跳過
+            new_manifest = {
+                planner.resolve(base_dir / key).relative_to(base_dir).as_posix(): entry
+                for key, entry in new_manifest.items()
+            }
+
+    write_if_changed(manifest_path, json.dumps(new_manifest, ensure_ascii=False, indent=1, sort_keys=True))
+    return stats
 
-    print("\n" + "=" * 50)
-    print("步驟 2: 提取 Python 代碼")
-    print("=" * 50)
 
-    for md_file in md_files:
-        # 跳過 .git 目錄
-        if '.git' in str(md_file):
-            continue
-        extract_python_code(md_file)
+def main():
+    """主程序"""
+    import sys
 
-    print("\n完成!")
+    base_dir = Path(__file__).parent
+    planner = None
+    if '--rename' in sys.argv:
+        from rename_to_traditional import RenamePlanner
+
+        planner = RenamePlanner(base_dir)
+    start = time.perf_counter()
+    stats = convert_tree(base_dir, force='--force' in sys.argv, planner=planner,
+                         dry_run='--dry-run' in sys.argv)
+    print(f"\n共 {stats['total']} 個 markdown 檔案，跳過 {stats['skipped']} 個未變動的檔案，"
+          f"轉換 {stats['converted']} 個，生成 {stats['generated']} 個 .py 檔，失敗 {stats['failed']} 個")
+    if planner is not None:
+        print(f"重命名 {stats['renamed']} 個檔案/資料夾")
+    print(f"完成! 耗時 {time.perf_counter() - start:.3f} 秒")
 
 
 if __name__ == '__main__':
@@ -1,103 +1,144 @@
 #!/usr/bin/env python3
 """
 重命名腳本：將所有檔案和資料夾名稱從簡體中文轉成繁體中文
+
+- 走訪目錄樹時只收集路徑，所有名稱用分隔符號連接起來之後只呼叫一次 cc.convert
+- 先在記憶體中建立重命名計畫，同時檢查衝突（兩個名稱轉換後相同，或目標名稱已經存在）
+- 按深度從深到淺執行計畫（不會影響還沒有重命名的父路徑），可以只印出計畫不實際執行（dry run）
+- RenamePlanner 也可以交給 convert_to_traditional.convert_tree，轉換檔案內容和重命名只需要走訪一次目錄樹
 """
 
 import os
 from pathlib import Path
-from opencc import OpenCC
-
-# 初始化 OpenCC 轉換器 (簡體轉繁體台灣標準)
-cc = OpenCC('s2twp')
 
+from opencc import OpenCC
 
-def get_all_paths(base_dir: Path) -> list[Path]:
-    """取得所有檔案和資料夾路徑，按深度排序（最深的優先）"""
-    all_paths = []
-
-    for root, dirs, files in os.walk(base_dir):
-        root_path = Path(root)
-
-        # 跳過 .git 目錄
-        if '.git' in str(root_path):
+# 名稱中不會出現的分隔符號
+DELIMITER = '\n'
+SKIP_NAMES = ('rename_to_traditional.py', 'convert_to_traditional.py')
+
+
+def convert_names(names: list[str], cc: OpenCC) -> list[str]:
+    """把所有名稱連接起來只轉換一次，回傳轉換後的名稱"""
+    if not names:
+        return []
+    if not any(DELIMITER in name for name in names):
+        converted = cc.convert(DELIMITER.join(names)).split(DELIMITER)
+        if len(converted) == len(names):
+            return converted
+    # 名稱中有分隔符號（或轉換改變了分隔符號的數量）時逐一轉換
+    return [cc.convert(name) for name in names]
+
+
+class RenamePlanner:
+    """收集路徑並建立重命名計畫"""
+
+    def __init__(self, base_dir: Path, cc: OpenCC | None = None):
+        self.base_dir = Path(base_dir)
+        self.cc = cc
+        self.paths = {}
+        self.new_names = {}
+        self.collisions = []
+
+    def add(self, path: Path) -> None:
+        """加入一個檔案或資料夾的路徑（重複加入會被忽略）"""
+        if path.name not in SKIP_NAMES:
+            self.paths[path] = None
+
+    def collect(self) -> 'RenamePlanner':
+        """單獨使用時走訪目錄樹收集所有路徑（跳過 .git 目錄）"""
+        for root, dirs, files in os.walk(self.base_dir):
+            dirs[:] = [name for name in dirs if name != '.git']
+            root_path = Path(root)
+            for name in dirs + files:
+                self.add(root_path / name)
+        return self
+
+    def plan(self) -> list[tuple[Path, Path]]:
+        """
+        建立重命名計畫
+        :return: (原路徑, 新路徑) 構成的列表，按深度從深到淺排列；
+                 衝突的項目不會出現在計畫中，記錄在 self.collisions
+        """
+        cc = self.cc or OpenCC('s2twp')
+        paths = list(self.paths)
+        converted = convert_names([path.name for path in paths], cc)
+        self.new_names = {
+            path: new_name for path, new_name in zip(paths, converted) if new_name != path.name
+        }
+        self.collisions = []
+        targets = {}
+        for path, new_name in self.new_names.items():
+            target = path.parent / new_name
+            if target in targets:
+                self.collisions.append((path, target, f'跟 {targets[target].name} 轉換後的名稱相同'))
+            elif target in self.paths and target not in self.new_names:
+                self.collisions.append((path, target, '目標名稱已經存在'))
+            else:
+                targets[target] = path
+        for path, target, _ in self.collisions:
+            self.new_names.pop(path, None)
+        # 路徑深度大的排在前面，同一個資料夾中的項目在其本身被重命名之前處理
+        return sorted(((path, path.parent / name) for path, name in self.new_names.items()),
+                      key=lambda item: len(item[0].parts), reverse=True)
+
+    def resolve(self, path: Path) -> Path:
+        """計算路徑在重命名計畫執行之後的新路徑"""
+        relative = Path(path).relative_to(self.base_dir)
+        original, result = self.base_dir, self.base_dir
+        for part in relative.parts:
+            original = original / part
+            result = result / self.new_names.get(original, part)
+        return result
+
+
+def apply_plan(plan: list[tuple[Path, Path]], dry_run: bool = False) -> int:
+    """按計畫重命名，回傳成功的數量"""
+    renamed_count = 0
+    for path, new_path in plan:
+        if dry_run:
+            print(f"將重命名: {path.name} -> {new_path.name}")
+            renamed_count += 1
             continue
-
-        # 加入檔案
-        for file in files:
-            file_path = root_path / file
-            all_paths.append(file_path)
-
-        # 加入資料夾
-        for dir_name in dirs:
-            if dir_name == '.git':
-                continue
-            dir_path = root_path / dir_name
-            all_paths.append(dir_path)
-
-    # 按路徑深度排序，最深的優先（這樣重命名時不會影響父路徑）
-    all_paths.sort(key=lambda p: len(p.parts), reverse=True)
-
-    return all_paths
+        try:
+            # 目標已經存在時 rename 在某些平臺上會直接覆蓋，所以再檢查一次
+            if new_path.exists() and not path.samefile(new_path):
+                raise FileExistsError(new_path)
+            path.rename(new_path)
+            print(f"重命名: {path.name} -> {new_path.name}")
+            renamed_count += 1
+        except Exception as e:
+            print(f"重命名失敗 {path}: {e}")
+    return renamed_count
 
 
-def needs_conversion(text: str) -> bool:
-    """檢查文字是否需要轉換（包含簡體中文字符）"""
-    converted = cc.convert(text)
-    return converted != text
-
-
-def rename_path(path: Path) -> Path | None:
-    """重命名單一路徑，回傳新路徑或 None（如果不需要轉換）"""
-    name = path.name
-    new_name = cc.convert(name)
-
-    if new_name == name:
-        return None
-
-    new_path = path.parent / new_name
-
-    try:
-        path.rename(new_path)
-        print(f"重命名: {name} -> {new_name}")
-        return new_path
-    except Exception as e:
-        print(f"重命名失敗 {path}: {e}")
-        return None
+def report_collisions(planner: RenamePlanner) -> None:
+    for path, target, reason in planner.collisions:
+        print(f"衝突，不重命名: {path} -> {target.name}（{reason}）")
 
 
 def main():
     """主程序"""
+    import sys
+
     base_dir = Path(__file__).parent
+    dry_run = '--dry-run' in sys.argv
 
     print("=" * 60)
     print("開始將檔案和資料夾名稱從簡體中文轉換為繁體中文")
     print("=" * 60)
     print()
 
-    # 取得所有路徑
-    all_paths = get_all_paths(base_dir)
-    print(f"找到 {len(all_paths)} 個檔案和資料夾\n")
-
-    # 統計
-    renamed_count = 0
-    skipped_count = 0
-
-    for path in all_paths:
-        # 跳過此腳本自己
-        if path.name in ('rename_to_traditional.py', 'convert_to_traditional.py'):
-            continue
-
-        if path.exists():
-            result = rename_path(path)
-            if result:
-                renamed_count += 1
-            else:
-                skipped_count += 1
+    planner = RenamePlanner(base_dir).collect()
+    plan = planner.plan()
+    print(f"找到 {len(planner.paths)} 個檔案和資料夾，其中 {len(plan)} 個需要重命名\n")
+    report_collisions(planner)
+    renamed_count = apply_plan(plan, dry_run)
 
     print()
     print("=" * 60)
-    print(f"完成！已重命名 {renamed_count} 個檔案/資料夾")
-    print(f"跳過 {skipped_count} 個（無需轉換）")
+    print(f"完成！{'將' if dry_run else '已'}重命名 {renamed_count} 個檔案/資料夾")
+    print(f"跳過 {len(planner.paths) - len(plan)} 個（無需轉換或有衝突）")
     print("=" * 60)
 
 